@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Text extractor benchmark.
+Runs every text extractor over a sample corpus of PDFs and reports throughput
+(chars/second) and how closely each engine's words agree with a reference engine.
+
+Usage: python benchmark_extractors.py [paths ...] [--limit 50] [--reference pdfplumber]
+       [--extractors pdfplumber,pdfminer,pypdf,pdfium]
+"""
+
+import argparse
+import os
+import re
+import time
+import logging
+from collections import Counter
+
+from config import settings
+from services.page_source import PDFPageSource
+from services.pdf_processor import PDFProcessor
+from services.text_extractors import TEXT_EXTRACTORS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r"\w+")
+
+def find_pdfs(paths: list, limit: int) -> list:
+    """Collect up to limit PDF files from the given files and directories."""
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            found.append(path)
+            continue
+        for root, _, files in os.walk(path):
+            found.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(".pdf"))
+    return found[:limit]
+
+def word_counts(text: str) -> Counter:
+    return Counter(word.lower() for word in WORD_PATTERN.findall(text))
+
+def agreement(words: Counter, reference: Counter) -> float:
+    """Dice overlap of the two word multisets: 1.0 when both engines read the same words."""
+    total = sum(words.values()) + sum(reference.values())
+    if not total:
+        return 1.0
+    return 2 * sum((words & reference).values()) / total
+
+def extract_document(name: str, pdf_path: str) -> tuple:
+    """Extract every page of a PDF with one engine: (seconds, text, meaningful pages, pages)."""
+    start = time.perf_counter()
+    with PDFPageSource(pdf_path) as source:
+        extractor = source.text_extractor(name)
+        texts = [extractor.extract_page(number) for number in range(1, source.page_count + 1)]
+    elapsed = time.perf_counter() - start
+
+    meaningful = sum(1 for text in texts if PDFProcessor._has_meaningful_text(text))
+    return elapsed, "\n".join(texts), meaningful, len(texts)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare text extractor throughput and agreement")
+    parser.add_argument("paths", nargs="*", default=[settings.UPLOAD_FOLDER])
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--extractors", default=",".join(TEXT_EXTRACTORS))
+    parser.add_argument("--reference", default="pdfplumber")
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    args = parser.parse_args()
+
+    pdfs = find_pdfs(args.paths, args.limit)
+    if not pdfs:
+        logger.error(f"No PDFs found in {', '.join(args.paths)}")
+        return
+    names = [name.strip() for name in args.extractors.split(",")]
+    if args.reference not in names:
+        names.insert(0, args.reference)
+    logger.info(f"Benchmarking {', '.join(names)} on {len(pdfs)} PDFs...")
+
+    totals = {
+        name: {"seconds": 0.0, "chars": 0, "meaningful": 0, "pages": 0, "agreement": [], "errors": 0}
+        for name in names
+    }
+    for pdf_path in pdfs:
+        words = {}
+        for name in names:
+            try:
+                seconds, text, meaningful, pages = extract_document(name, pdf_path)
+            except Exception as e:
+                logger.error(f"❌ {name} failed on {pdf_path}: {e}")
+                totals[name]["errors"] += 1
+                continue
+            totals[name]["seconds"] += seconds
+            totals[name]["chars"] += len(text)
+            totals[name]["meaningful"] += meaningful
+            totals[name]["pages"] += pages
+            words[name] = word_counts(text)
+
+        if args.reference in words:
+            for name, counts in words.items():
+                totals[name]["agreement"].append(agreement(counts, words[args.reference]))
+
+    print(f"\n{'extractor':<12}{'seconds':>10}{'chars/s':>12}{'agreement':>11}{'meaningful':>12}{'errors':>8}")
+    candidates = []
+    for name, total in totals.items():
+        chars_per_second = total["chars"] / total["seconds"] if total["seconds"] else 0.0
+        mean_agreement = sum(total["agreement"]) / len(total["agreement"]) if total["agreement"] else 0.0
+        meaningful = total["meaningful"] / total["pages"] if total["pages"] else 0.0
+        print(
+            f"{name:<12}{total['seconds']:>10.2f}{chars_per_second:>12.0f}"
+            f"{mean_agreement:>11.1%}{meaningful:>12.1%}{total['errors']:>8}"
+        )
+        if not total["errors"] and mean_agreement >= args.min_agreement:
+            candidates.append((chars_per_second, name))
+    print(f"\nagreement: word overlap with {args.reference}; meaningful: pages passing _has_meaningful_text")
+
+    if candidates:
+        _, best = max(candidates)
+        print(f"Recommended for this corpus: TEXT_EXTRACTOR={best} (fastest with >= {args.min_agreement:.0%} agreement)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+OCR engine benchmark.
+Builds a synthetic scanned PDF and compares pages/second for each OCR engine.
+
+Usage: python benchmark_ocr.py [--pages 20] [--dpi 300] [--engines tesserocr,pytesseract]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import logging
+
+from PIL import Image, ImageDraw, ImageFont
+
+from config import settings
+from services.page_source import PDFPageSource
+from services.pdf_processor import OCR_ENGINES, create_ocr_engine
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SAMPLE_LINES = [
+    "This agreement is entered into by and between the parties listed below.",
+    "The supplier shall deliver all goods within thirty days of the order date.",
+    "Payment terms are net sixty days from the date of a valid invoice.",
+    "Either party may terminate this agreement with ninety days written notice.",
+    "All disputes shall be resolved under the laws of the governing state.",
+]
+
+def build_scanned_pdf(path: str, pages: int, dpi: int):
+    """Write an image-only PDF that looks like a scanned letter-size document."""
+    width, height = int(8.5 * dpi), int(11 * dpi)
+    try:
+        font = ImageFont.load_default(size=dpi // 8)
+    except TypeError:  # Pillow without FreeType sizing support
+        font = ImageFont.load_default()
+
+    images = []
+    for page_number in range(1, pages + 1):
+        image = Image.new("L", (width, height), color=255)
+        draw = ImageDraw.Draw(image)
+        y = dpi
+        line_number = 0
+        while y < height - dpi:
+            line = f"{page_number}.{line_number} {SAMPLE_LINES[line_number % len(SAMPLE_LINES)]}"
+            draw.text((dpi, y), line, fill=0, font=font)
+            y += dpi // 4
+            line_number += 1
+        images.append(image)
+
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=dpi)
+    for image in images:
+        image.close()
+
+def benchmark_engine(name: str, images: list) -> dict:
+    """OCR every rendered page with one engine and time it."""
+    init_start = time.perf_counter()
+    engine = create_ocr_engine(name, settings.OCR_LANGUAGE)
+    init_seconds = time.perf_counter() - init_start
+    if engine.name != name:
+        engine.close()
+        raise RuntimeError(f"{name} is not available in this environment")
+
+    chars = 0
+    start = time.perf_counter()
+    for image in images:
+        chars += len(engine.image_to_string(image))
+    elapsed = time.perf_counter() - start
+    engine.close()
+
+    return {
+        "engine": engine.name,
+        "init_seconds": init_seconds,
+        "seconds": elapsed,
+        "pages_per_second": len(images) / elapsed if elapsed else 0.0,
+        "chars": chars
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare OCR engine throughput")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--dpi", type=int, default=settings.OCR_DPI)
+    parser.add_argument("--engines", default=",".join(OCR_ENGINES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        pdf_path = os.path.join(tmpdir, "synthetic_scan.pdf")
+        logger.info(f"Building {args.pages}-page synthetic scan at {args.dpi} DPI...")
+        build_scanned_pdf(pdf_path, args.pages, args.dpi)
+
+        # Render once up front so only OCR time is measured
+        with PDFPageSource(pdf_path) as source:
+            images = [source.render(page_number, args.dpi) for page_number in range(1, source.page_count + 1)]
+
+        results = []
+        for name in args.engines.split(","):
+            logger.info(f"Benchmarking {name}...")
+            try:
+                results.append(benchmark_engine(name.strip(), images))
+            except Exception as e:
+                logger.error(f"❌ {name} failed: {e}")
+
+        for image in images:
+            image.close()
+
+    print(f"\n{'engine':<14}{'init (s)':>10}{'total (s)':>12}{'pages/s':>10}{'chars':>10}")
+    for result in results:
+        print(
+            f"{result['engine']:<14}{result['init_seconds']:>10.2f}{result['seconds']:>12.2f}"
+            f"{result['pages_per_second']:>10.2f}{result['chars']:>10}"
+        )
+
+    if len(results) > 1:
+        baseline = next((r for r in results if r["engine"] == "pytesseract"), results[-1])
+        for result in results:
+            if result is not baseline and baseline["pages_per_second"]:
+                speedup = result["pages_per_second"] / baseline["pages_per_second"]
+                print(f"\n{result['engine']} is {speedup:.2f}x {baseline['engine']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+Offline bulk ingestion.
+Loads a directory of PDFs straight into Postgres and the vector store, without
+going through main-api uploads or the Redis ingest queue. Files are hashed,
+stored and registered in batches; extraction runs in a pool of sandbox
+processes (as in the ingest pipeline) while the previous batch is chunked,
+embedded and written to ChromaDB in large batches. Every finished batch is
+appended to a checkpoint file, so an interrupted run resumes where it stopped.
+
+Chunks, chunk IDs, page text artifacts and PDF rows come out as online
+ingestion would produce them. Summaries and key topics are not generated
+(no Ollama calls); duplicates of already known content are linked, not
+processed again.
+
+Usage: python bulk_ingest.py <directory> [--batch-size 200] [--workers 4]
+       [--embed-batch 512] [--checkpoint bulk_ingest.checkpoint.jsonl]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import MetaData, Table, create_engine, select
+
+from config import settings
+from services.extraction_sandbox import ExtractionState, SandboxFailure, SandboxWorker
+from services.page_text import PageTextWriter
+from services.pdf_processor import PDFProcessor
+from services.rag_service import RAGService, assign_chunk_ids
+from shared.content import LINKED_FIELDS, source_conditions
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger("bulk_ingest")
+logger.setLevel(logging.INFO)
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+class BulkItem:
+    """One file of the corpus on its way into the catalog."""
+
+    def __init__(self, path: str, relpath: str):
+        self.path = path
+        self.relpath = relpath
+        self.digest = None
+        self.size = 0
+        self.filepath = None  # Stored copy under UPLOAD_FOLDER
+        self.pdf_id = None
+        self.source = None  # Item or row dict whose results a duplicate links to
+        self.started = None
+        self.future = None  # Extraction, for the documents processed rather than linked
+        self.result = None
+        self.error = None
+
+class Checkpoint:
+    """Append-only JSON lines of {"path", "status", "pdf_id"}; the last line per path wins.
+
+    "registered" marks a row created but not finished; a resumed run
+    processes it again under the same pdf_id instead of registering anew.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line of an interrupted run
+                    self.entries[entry["path"]] = entry
+
+    def finished(self, relpath: str) -> bool:
+        entry = self.entries.get(relpath)
+        return entry is not None and entry["status"] != "registered"
+
+    def registered_id(self, relpath: str):
+        entry = self.entries.get(relpath)
+        return entry["pdf_id"] if entry is not None and entry["status"] == "registered" else None
+
+    def record(self, items, status: str = None):
+        with open(self.path, "a") as f:
+            for item in items:
+                entry = {"path": item.relpath, "status": status or item_status(item), "pdf_id": item.pdf_id}
+                self.entries[item.relpath] = entry
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+def item_status(item: BulkItem) -> str:
+    if item.error:
+        return "failed"
+    return "duplicate" if item.source is not None else "completed"
+
+class Progress:
+    """Single-line progress bar on stderr."""
+
+    def __init__(self, total: int, done: int = 0):
+        self.total = total
+        self.done = done
+        self.start_done = done
+        self.failed = 0
+        self.started = time.monotonic()
+
+    def update(self, count: int, failed: int = 0):
+        self.done += count
+        self.failed += failed
+        elapsed = time.monotonic() - self.started
+        rate = (self.done - self.start_done) / elapsed if elapsed else 0.0
+        eta = (self.total - self.done) / rate if rate else 0.0
+        filled = int(30 * self.done / self.total) if self.total else 30
+        sys.stderr.write(
+            f"\r[{'#' * filled}{'.' * (30 - filled)}] {self.done}/{self.total} PDFs "
+            f"{rate:.1f}/s, {self.failed} failed, ETA {eta / 60:.0f} min "
+        )
+        sys.stderr.flush()
+
+    def finish(self):
+        sys.stderr.write("\n")
+
+class ExtractorPool:
+    """Extraction processes shared by worker threads, one document each at a time.
+
+    Uses the ingest pipeline's sandbox processes (limits, crash isolation and
+    recycling included), or in-process extraction when SANDBOX_ENABLED is off.
+    """
+
+    def __init__(self, processor: PDFProcessor, workers: int):
+        self.workers = max(1, workers)
+        self._idle = queue.Queue()
+        for _ in range(self.workers):
+            self._idle.put(SandboxWorker() if settings.SANDBOX_ENABLED else ExtractionState(processor))
+        self.threads = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bulk-extract")
+
+    def submit(self, item: BulkItem):
+        return self.threads.submit(self._extract, item)
+
+    def _extract(self, item: BulkItem):
+        extraction = self._idle.get()
+        try:
+            return extract_document(extraction, item)
+        finally:
+            if isinstance(extraction, SandboxWorker):
+                extraction.jobs += 1
+                if extraction.alive and extraction.jobs >= settings.SANDBOX_MAX_JOBS_PER_WORKER:
+                    extraction.stop()
+                if not extraction.alive:
+                    extraction.jobs = 0
+            self._idle.put(extraction)
+
+    def shutdown(self):
+        self.threads.shutdown(wait=True)
+        while not self._idle.empty():
+            extraction = self._idle.get()
+            if isinstance(extraction, SandboxWorker):
+                extraction.stop()
+            else:
+                extraction.close()
+
+def extract_document(extraction, item: BulkItem) -> dict:
+    """Text of a stored PDF, a window at a time for large ones, as the ingest pipeline reads it.
+
+    Also writes the document's page text artifact, so it can be re-indexed later.
+    """
+    file_size, page_count = extraction.open(item.filepath)
+    writer = PageTextWriter(item.filepath, file_size, page_count) if settings.PAGE_TEXT_ARTIFACTS else None
+    streamed = page_count > settings.STREAMING_PAGE_THRESHOLD
+    window = max(1, settings.STREAMING_WINDOW_PAGES) if streamed else max(1, page_count)
+    texts, page_details = [], []
+    try:
+        for first_page in range(1, page_count + 1, window):
+            last_page = min(first_page + window - 1, page_count)
+            if streamed:
+                text, _, details = extraction.extract(first_page, last_page)
+            else:
+                text, _, details = extraction.extract()
+            if writer is not None:
+                writer.write_pages(first_page, details)
+            for detail in details:
+                detail.pop("text", None)
+            page_details.extend(details)
+            texts.append(text)
+        if writer is not None and any(text.strip() for text in texts):
+            writer.commit()
+            writer = None
+    finally:
+        if writer is not None:
+            writer.abort()
+        try:
+            extraction.close()
+        except Exception as e:
+            logger.warning(f"Could not close {item.relpath} in its extraction process: {e}")
+    return {
+        "file_size": file_size,
+        "page_count": page_count,
+        "streamed": streamed,
+        "texts": texts,
+        "page_details": page_details
+    }
+
+def find_pdfs(root: str) -> list:
+    found = []
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        found.extend(os.path.join(directory, name) for name in sorted(files) if name.lower().endswith(".pdf"))
+    return found
+
+def hash_file(path: str) -> tuple:
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(HASH_BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+            size += len(block)
+    return digest.hexdigest(), size
+
+def store_file(path: str, digest: str) -> str:
+    """Copy a file to UPLOAD_FOLDER under its SHA-256, as main-api stores uploads."""
+    stored = os.path.join(settings.UPLOAD_FOLDER, f"{digest}.pdf")
+    if not os.path.exists(stored):
+        fd, tmp_path = tempfile.mkstemp(dir=settings.UPLOAD_FOLDER, suffix=".part")
+        os.close(fd)
+        try:
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, stored)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    return stored
+
+class Catalog:
+    """The pdfs table, written directly in batches."""
+
+    def __init__(self):
+        self.engine = create_engine(settings.DATABASE_URL)
+        self.pdfs = Table("pdfs", MetaData(), autoload_with=self.engine)
+
+    def find_sources(self, digests) -> dict:
+        """Completed rows already serving each content hash.
+
+        A row still processing may have been registered by a run interrupted
+        before its checkpoint was written; it stays "processing" for good, and
+        so would every duplicate linked to it.
+        """
+        pdfs = self.pdfs
+        columns = [pdfs.c.id, pdfs.c.content_hash] + [pdfs.c[field] for field in LINKED_FIELDS]
+        query = select(*columns).where(
+            pdfs.c.content_hash.in_(list(digests)),
+            *source_conditions(pdfs.c, completed_only=True)
+        ).order_by(pdfs.c.id)
+        sources = {}
+        with self.engine.connect() as conn:
+            for row in conn.execute(query).mappings():
+                sources.setdefault(row["content_hash"], dict(row))
+        return sources
+
+    def register(self, items):
+        """Insert rows for new documents in one statement, marked as processing."""
+        now = datetime.utcnow()
+        for item in items:
+            item.started = now
+        rows = [
+            {
+                "filename": os.path.basename(item.path),
+                "filepath": item.filepath,
+                "content_hash": item.digest,
+                "file_size": item.size,
+                "upload_time": now,
+                "processed": False,
+                "chunk_count": 0,
+                "processing_status": "processing",
+                "processing_start_time": now
+            }
+            for item in items
+        ]
+        statement = self.pdfs.insert().returning(self.pdfs.c.id, sort_by_parameter_order=True)
+        with self.engine.begin() as conn:
+            ids = [row.id for row in conn.execute(statement, rows)]
+        for item, pdf_id in zip(items, ids):
+            item.pdf_id = pdf_id
+
+    def finish(self, processed, duplicates):
+        """Record the batch's results and insert its duplicates, in one transaction."""
+        pdfs = self.pdfs
+        now = datetime.utcnow()
+        with self.engine.begin() as conn:
+            for item in processed:
+                conn.execute(pdfs.update().where(pdfs.c.id == item.pdf_id).values(
+                    processing_end_time=now,
+                    processing_duration=(now - item.started).total_seconds(),
+                    **item.result
+                ))
+            if duplicates:
+                rows = []
+                for item in duplicates:
+                    source = item.source.result if isinstance(item.source, BulkItem) else item.source
+                    row = {field: source.get(field) for field in LINKED_FIELDS}
+                    row.update({
+                        "filename": os.path.basename(item.path),
+                        "filepath": item.filepath,
+                        "content_hash": item.digest,
+                        "file_size": item.size,
+                        "upload_time": now,
+                        "source_pdf_id": item.source.pdf_id if isinstance(item.source, BulkItem) else item.source["id"]
+                    })
+                    rows.append(row)
+                statement = pdfs.insert().returning(pdfs.c.id, sort_by_parameter_order=True)
+                for item, row in zip(duplicates, conn.execute(statement, rows)):
+                    item.pdf_id = row.id
+
+class BulkIngest:
+    def __init__(self, args):
+        self.args = args
+        self.processor = PDFProcessor(load_services=False)
+        self.rag_service = RAGService()
+        self.catalog = Catalog()
+        self.checkpoint = Checkpoint(args.checkpoint)
+        self.extractors = ExtractorPool(self.processor, args.workers)
+        self.pending = []  # Batch whose extraction has been submitted but not finished
+        self.chunks_stored = 0
+
+    def prepare(self, paths) -> list:
+        """Hash, store and register one batch; returns its items, those to process already submitted for extraction."""
+        items = [BulkItem(path, os.path.relpath(path, self.args.directory)) for path in paths]
+        for item in items:
+            try:
+                item.digest, item.size = hash_file(item.path)
+                item.filepath = store_file(item.path, item.digest)
+            except OSError as e:
+                item.error = f"Could not read file: {e}"
+
+        readable = [item for item in items if item.error is None]
+        sources = self.catalog.find_sources({item.digest for item in readable})
+        # Documents of the batch still being embedded are linked to as they finish, not as they stand
+        owners = {item.digest: item for item in self.pending if item.future is not None}
+        resumed, new = [], []
+        for item in readable:
+            item.pdf_id = self.checkpoint.registered_id(item.relpath)
+            if item.pdf_id is not None:
+                # Registered by an interrupted run: process it again as itself
+                resumed.append(item)
+                owners[item.digest] = item
+                sources.pop(item.digest, None)
+        for item in readable:
+            if item.pdf_id is not None:
+                continue
+            if item.digest in owners:
+                item.source = owners[item.digest]
+            elif item.digest in sources:
+                item.source = sources[item.digest]
+            else:
+                owners[item.digest] = item
+                new.append(item)
+        if new:
+            self.catalog.register(new)
+            self.checkpoint.record(new, "registered")
+
+        for item in resumed + new:
+            item.started = item.started or datetime.utcnow()
+            item.future = self.extractors.submit(item)
+        return items
+
+    def finish(self, items):
+        """Chunk, embed and store a batch whose extraction has been submitted; then record it."""
+        processed = [item for item in items if item.future is not None]
+        chunk_ids, chunks, metadatas, results = [], [], [], []
+        for item in processed:
+            try:
+                extracted = item.future.result()
+            except SandboxFailure as e:
+                item.error = str(e)
+                continue
+            except Exception as e:
+                item.error = f"Extraction failed: {e}"
+                continue
+            text = "".join(extracted["texts"])
+            method = self.processor._document_method(extracted["page_details"])
+            if not extracted["streamed"] and not text.strip():
+                item.error = f"No text could be extracted (method: {method})"
+                continue
+            # The chunks the ingest pipeline makes from the same text
+            if extracted["streamed"]:
+                document_chunks = self.processor.chunk_windows(extracted["texts"])
+            else:
+                document_chunks = self.processor.chunk_text(text)
+            if not document_chunks:
+                item.error = (
+                    "No text could be extracted (method: streaming)" if extracted["streamed"]
+                    else "No chunks could be created from extracted text"
+                )
+                continue
+            filename = os.path.basename(item.path)
+            chunk_ids.extend(assign_chunk_ids(item.pdf_id, document_chunks))
+            chunks.extend(document_chunks)
+            metadatas.extend(
+                RAGService._chunk_metadata(item.pdf_id, filename, chunk, index)
+                for index, chunk in enumerate(document_chunks)
+            )
+            item.result = {
+                "processed": True,
+                "processing_status": "completed",
+                "processing_error": None,
+                "chunk_count": len(document_chunks),
+                "extraction_method": method,
+                "page_count": extracted["page_count"],
+                "file_size": extracted["file_size"],
+                "text_length": len(text),
+                "content_preview": text[:500] + "..." if len(text) > 500 else text,
+                **self.processor._page_detail_fields(extracted["page_details"])
+            }
+
+        # Vectors of many documents per write
+        for start in range(0, len(chunks), self.args.embed_batch):
+            end = start + self.args.embed_batch
+            embeddings = self.rag_service.embed_chunks(chunks[start:end])
+            self.rag_service.upsert_chunks(chunk_ids[start:end], chunks[start:end], embeddings, metadatas[start:end])
+        self.chunks_stored += len(chunks)
+
+        for item in processed:
+            if item.error:
+                logger.warning(f"Failed {item.relpath}: {item.error}")
+                item.result = {
+                    "processed": False,
+                    "processing_status": "failed",
+                    "processing_error": item.error
+                }
+        duplicates = [
+            item for item in items
+            if item.source is not None and (not isinstance(item.source, BulkItem) or not item.source.error)
+        ]
+        for item in items:
+            if isinstance(item.source, BulkItem) and item.source.error:
+                item.source, item.error = None, f"Same content as {item.source.relpath}, which failed"
+        self.catalog.finish(processed, duplicates)
+        self.checkpoint.record(items)
+        return sum(1 for item in items if item.error)
+
+    def run(self):
+        paths = find_pdfs(self.args.directory)
+        todo = [path for path in paths if not self.checkpoint.finished(os.path.relpath(path, self.args.directory))]
+        logger.info(
+            f"{len(paths)} PDFs in {self.args.directory}, {len(paths) - len(todo)} already ingested; "
+            f"{self.extractors.workers} extraction workers"
+        )
+        progress = Progress(len(paths), len(paths) - len(todo))
+        batch_size = max(1, self.args.batch_size)
+        try:
+            for start in range(0, len(todo), batch_size):
+                # Extraction of this batch runs while the previous one is embedded
+                items = self.prepare(todo[start:start + batch_size])
+                if self.pending:
+                    progress.update(len(self.pending), self.finish(self.pending))
+                self.pending = items
+            if self.pending:
+                progress.update(len(self.pending), self.finish(self.pending))
+        finally:
+            progress.finish()
+            self.extractors.shutdown()
+            self.processor.shutdown()
+        logger.info(
+            f"Done: {progress.done - progress.start_done} PDFs, {progress.failed} failed, "
+            f"{self.chunks_stored} chunks stored"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a directory of PDFs without the upload API")
+    parser.add_argument("directory")
+    parser.add_argument("--batch-size", type=int, default=200, help="Files registered and recorded together")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Extraction processes")
+    parser.add_argument("--embed-batch", type=int, default=512, help="Chunks embedded and written per call")
+    parser.add_argument("--checkpoint", default="bulk_ingest.checkpoint.jsonl")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"Not a directory: {args.directory}")
+    os.makedirs(settings.UPLOAD_FOLDER, exist_ok=True)
+    BulkIngest(args).run()
+
+if __name__ == "__main__":
+    main()
@@ -24,9 +24,84 @@ class Settings(BaseSettings):
     MAX_CHUNKS: int = 1000
     MAX_CONTEXT_LENGTH: int = 32000
     
+    # Streaming ingestion for large documents (no MAX_CHUNKS cap)
+    STREAMING_PAGE_THRESHOLD: int = 200  # Documents with more pages are streamed
+    STREAMING_WINDOW_PAGES: int = 25
+    
+    # Keep each upload's extracted text per page (<upload>.pages.jsonl.gz) so it can be re-indexed
+    PAGE_TEXT_ARTIFACTS: bool = True
+    
+    # Redis job queue and workers (python worker.py)
+    REDIS_URL: str = "redis://redis:6379"
+    WORKER_ID: str = ""  # Defaults to <hostname>-<pid>; must be unique across hosts
+    WORKER_CONCURRENCY: int = 4  # Documents each worker keeps in its pipeline at once
+    WORKER_POLL_SECONDS: float = 1.0
+    JOB_LEASE_SECONDS: float = 60.0  # A worker that misses heartbeats this long loses its jobs
+    JOB_MAX_ATTEMPTS: int = 3  # Then the job goes to the dead-letter list
+    JOB_RETRY_BASE_SECONDS: float = 30.0  # Doubled after every failed attempt
+    JOB_RETRY_MAX_SECONDS: float = 900.0
+    SCHEDULER_AGING_RATE: float = 1.0  # Seconds of predicted run time forgiven per second waited
+    SCHEDULER_DEFAULT_SECONDS_PER_PAGE: float = 2.0  # Cost of jobs queued without a prediction
+    
+    # Admission control: uploads are turned away with 429 + Retry-After past these
+    ADMISSION_MAX_JOBS: int = 50  # Queued plus running documents; 0 disables the limit
+    ADMISSION_MAX_PAGES: int = 2000  # Pages across those documents; 0 disables the limit
+    ADMISSION_RETRY_AFTER_SECONDS: int = 30  # Floor when the drain time cannot be estimated
+    ADMISSION_MAX_RETRY_AFTER_SECONDS: int = 600
+    
+    # LLM summaries go through main-api's priority lanes in front of Ollama
+    LLM_PROXY_URL: str = "http://main-api:8000/internal/ollama/generate"
+    SUMMARY_LANE: str = "background"  # ingest or background
+    SUMMARY_TIMEOUT_SECONDS: float = 300.0  # Includes time queued behind interactive chat
+    
+    # Summaries are written after a document is searchable, map-reduce over all of its chunks
+    SUMMARY_SECTION_WORDS: int = 1500  # Text summarized per LLM call
+    SUMMARY_LEASE_SECONDS: float = 900.0  # A worker that dies mid-summary hands the document on after this
+    SUMMARY_RETRY_SECONDS: float = 300.0  # Wait before retrying a summary the LLM failed on
+    SUMMARY_CACHE_TTL_DAYS: float = 30.0  # Section summaries are reused by revisions for this long
+    
+    # Embedding yields to interactive chat between batches
+    EMBED_BATCH_SIZE: int = 32
+    EMBED_YIELD_MAX_SECONDS: float = 5.0  # Longest pause per batch; 0 disables yielding
+    EMBED_YIELD_POLL_SECONDS: float = 0.25
+    
+    # Extraction/OCR sandbox processes, one per extract worker
+    SANDBOX_ENABLED: bool = True
+    SANDBOX_MAX_RSS_MB: int = 2048  # Resident memory of the sandbox and its OCR processes; 0 disables
+    SANDBOX_TIMEOUT_SECONDS: float = 600.0  # Extraction time per document, all windows of a streamed one together
+    SANDBOX_MAX_JOBS_PER_WORKER: int = 25  # Then the process is replaced
+    SANDBOX_POLL_SECONDS: float = 0.5
+    
+    # Ingest pipeline: bounded queue between stages and worker threads per stage
+    PIPELINE_QUEUE_SIZE: int = 4  # Documents/windows waiting at each stage
+    PIPELINE_EXTRACT_WORKERS: int = 2  # Extraction + OCR (OCR itself may fan out to OCR_WORKERS)
+    PIPELINE_CHUNK_WORKERS: int = 1
+    PIPELINE_EMBED_WORKERS: int = 1
+    PIPELINE_STORE_WORKERS: int = 1
+    
+    # Selectable-text extraction
+    TEXT_EXTRACTOR: str = "pdfplumber"  # pdfplumber, pdfminer, pypdf, pdfium (see benchmark_extractors.py)
+    TEXT_EXTRACTOR_FALLBACK: bool = True  # Retry with pdfplumber when the extractor's text isn't meaningful
+    
     # OCR Configuration
     OCR_DPI: int = 300
     OCR_LANGUAGE: str = "eng"
+    OCR_ENGINE: str = "auto"  # auto, tesserocr (persistent in-process API), pytesseract (CLI per page)
+    OCR_WORKERS: int = 1  # >1 runs OCR in a process pool of this size
+    OCR_MAX_INFLIGHT_PAGES: int = 8  # Rendered pages held in memory / queued for OCR at once
+    OCR_MIN_IMAGE_AREA: float = 0.05  # Fraction of a text page an image must cover to trigger OCR
+    OCR_IMAGE_REGIONS: bool = True  # On text pages, OCR only the image boxes rather than the whole page
+    
+    # Adaptive OCR resolution: read at OCR_LOW_DPI, re-read low-confidence pages/regions at OCR_HIGH_DPI
+    OCR_ADAPTIVE: bool = False
+    OCR_LOW_DPI: int = 150
+    OCR_HIGH_DPI: int = 400
+    OCR_MIN_CONFIDENCE: float = 75.0  # Mean tesseract word confidence (0-100)
+    
+    # OCR result cache, keyed by rendered image + OCR settings, shared by all processes on a host
+    OCR_CACHE_ENABLED: bool = True
+    OCR_CACHE_DIR: str = "/app/ocr_cache"
+    OCR_CACHE_MAX_MB: int = 512  # Least recently used entries are evicted beyond this
     
     class Config:
         env_file = ".env"
@@ -1,4 +1,5 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import os
@@ -6,6 +7,8 @@ from contextlib import asynccontextmanager
 
 from config import settings
 from services.pdf_processor import PDFProcessor
+from services.job_queue import JobQueue
+from services.page_source import count_pages
 from services.database_client import DatabaseClient
 from schemas import ProcessRequest, ProcessResponse, HealthResponse
 import logging
@@ -16,6 +19,7 @@ logger = logging.getLogger(__name__)
 
 # Global services
 pdf_processor = PDFProcessor()
+job_queue = JobQueue()
 db_client = DatabaseClient()
 
 @asynccontextmanager
@@ -30,6 +34,8 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("PDF Processing Service shutting down...")
+    await job_queue.close()
+    pdf_processor.shutdown()
 
 app = FastAPI(
     title="PDF Processing Service",
@@ -52,30 +58,63 @@ async def health_check():
     """Health check endpoint."""
     return HealthResponse(status="healthy", service="pdf-processing")
 
+@app.get("/queue/stats")
+async def queue_stats():
+    """Job queue depth, dead letters and each worker's per-stage pipeline stats."""
+    return await job_queue.stats()
+
+@app.get("/queue/load")
+async def queue_load():
+    """Ingest load against the admission limits, for clients to back off on."""
+    return await job_queue.load()
+
+@app.get("/queue/dead")
+async def queue_dead_letters(limit: int = 100):
+    """Most recent jobs that ran out of attempts."""
+    return await job_queue.dead_letters(limit)
+
 @app.post("/process", response_model=ProcessResponse)
-async def process_pdf(
-    request: ProcessRequest,
-    background_tasks: BackgroundTasks
-):
-    """Queue a PDF for processing."""
+async def process_pdf(request: ProcessRequest):
+    """Queue a PDF for processing by the workers, unless the ingest queue is full."""
+    try:
+        pages = await run_in_threadpool(count_pages, request.filepath)
+    except Exception as e:
+        logger.error(f"Cannot open PDF {request.pdf_id}: {e}")
+        await db_client.update_pdf_status(request.pdf_id, "failed", error_message=str(e))
+        raise HTTPException(status_code=400, detail=f"Cannot open PDF: {e}")
+    
+    try:
+        load = await job_queue.load(pages)
+    except Exception as e:
+        logger.error(f"Ingest queue unavailable: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Ingest queue is not available",
+            headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)}
+        )
+    if not load["accepting"]:
+        # Refused before anything is queued; the caller keeps the PDF pending and retries
+        raise HTTPException(
+            status_code=429,
+            detail=load["reason"],
+            headers={"Retry-After": str(load["retry_after"])}
+        )
+    
     try:
-        # Add to background processing queue
-        background_tasks.add_task(
-            pdf_processor.process_pdf_background,
+        queued = await job_queue.enqueue(
             request.pdf_id,
             request.filepath,
-            request.filename
+            request.filename,
+            pages,
+            request.predicted_seconds
         )
         
-        # Update status to processing
-        await db_client.update_pdf_status(request.pdf_id, "processing")
-        
         return ProcessResponse(
             pdf_id=request.pdf_id,
-            status="processing",
-            message="PDF processing started"
+            status="pending",
+            message="PDF queued for processing" if queued else "PDF is already queued or processing"
         )
-        
+    
     except Exception as e:
         logger.error(f"Error queueing PDF {request.pdf_id}: {e}")
         await db_client.update_pdf_status(
@@ -95,6 +134,20 @@ async def delete_document(pdf_id: int):
         logger.error(f"Error deleting document {pdf_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/documents/{pdf_id}/reassign")
+async def reassign_document(pdf_id: int, request: dict):
+    """Hand a PDF's chunks to another PDF with the same content, e.g. when the original upload is deleted."""
+    try:
+        count = await run_in_threadpool(
+            pdf_processor.rag_service.reassign_document, pdf_id, request["pdf_id"], request["filename"]
+        )
+        return {"status": "success", "message": f"Reassigned {count} chunks to PDF {request['pdf_id']}"}
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=f"Missing field: {e}")
+    except Exception as e:
+        logger.error(f"Error reassigning document {pdf_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/admin/flush")
 async def admin_flush():
     """Flush all processed documents from vector database."""
@@ -106,31 +159,26 @@ async def admin_flush():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/admin/reprocess")
-async def admin_reprocess(
-    request: dict,
-    background_tasks: BackgroundTasks
-):
+async def admin_reprocess(request: dict):
     """Reprocess multiple PDFs."""
     try:
         pdfs = request.get("pdfs", [])
         
+        # Queued or running already: enqueue skips them and a worker owns their status
+        active = await job_queue.active([pdf_data["pdf_id"] for pdf_data in pdfs])
+        pdfs = [pdf_data for pdf_data in pdfs if pdf_data["pdf_id"] not in active]
         for pdf_data in pdfs:
-            background_tasks.add_task(
-                pdf_processor.process_pdf_background,
-                pdf_data["pdf_id"],
-                pdf_data["filepath"],
-                pdf_data["filename"]
-            )
-            
-            # Update status to processing
-            await db_client.update_pdf_status(pdf_data["pdf_id"], "processing")
+            # Back to pending until a worker picks it up
+            await db_client.update_pdf_status(pdf_data["pdf_id"], "pending")
+        
+        queued = await job_queue.enqueue_many(pdfs)
         
         return {
             "status": "success",
-            "message": f"Reprocessing started for {len(pdfs)} PDFs",
-            "count": len(pdfs)
+            "message": f"Reprocessing queued for {queued} PDFs",
+            "count": queued
         }
-        
+    
     except Exception as e:
         logger.error(f"Error in bulk reprocessing: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -5,6 +5,7 @@ class ProcessRequest(BaseModel):
     pdf_id: int
     filename: str
     filepath: str
+    predicted_seconds: Optional[float] = None  # Expected processing time, for scheduling
 
 class ProcessResponse(BaseModel):
     pdf_id: int
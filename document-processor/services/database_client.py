@@ -77,7 +77,9 @@ class DatabaseClient:
         text_length: Optional[int] = None,
         summary: Optional[str] = None,
         key_topics: Optional[str] = None,
-        content_preview: Optional[str] = None
+        content_preview: Optional[str] = None,
+        page_methods: Optional[str] = None,
+        page_ocr_stats: Optional[str] = None
     ):
         """Update PDF as completed with processing results."""
         try:
@@ -98,6 +100,10 @@ class DatabaseClient:
                 data["key_topics"] = key_topics
             if content_preview:
                 data["content_preview"] = content_preview
+            if page_methods:
+                data["page_methods"] = page_methods
+            if page_ocr_stats:
+                data["page_ocr_stats"] = page_ocr_stats
             
             async with httpx.AsyncClient() as client:
                 response = await client.patch(
@@ -112,6 +118,53 @@ class DatabaseClient:
         except Exception as e:
             logger.error(f"Error updating PDF completion: {e}")
     
+    async def update_pdf_summary(self, pdf_id: int, summary: str):
+        """Record a summary written after the PDF was marked searchable."""
+        async with httpx.AsyncClient() as client:
+            response = await client.patch(
+                f"{self.backend_url}/internal/pdfs/{pdf_id}/status",
+                json={"summary": summary},
+                timeout=30.0
+            )
+            response.raise_for_status()
+    
+    async def update_pdf_reindexed(self, pdf_id: int, chunk_count: int):
+        """Record the new chunk count of a re-indexed PDF, leaving its processing results alone."""
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await client.patch(
+                    f"{self.backend_url}/internal/pdfs/{pdf_id}/status",
+                    json={
+                        "processing_status": "completed",
+                        "processed": True,
+                        "chunk_count": chunk_count,
+                        "processing_error": None
+                    },
+                    timeout=30.0
+                )
+                
+                if response.status_code != 200:
+                    logger.error(f"Failed to update re-indexed PDF: {response.status_code}")
+                    
+        except Exception as e:
+            logger.error(f"Error updating re-indexed PDF: {e}")
+    
+    async def update_pdf_error(self, pdf_id: int, error_message: str):
+        """Record an error on a PDF without changing its processing status or results."""
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await client.patch(
+                    f"{self.backend_url}/internal/pdfs/{pdf_id}/status",
+                    json={"processing_error": error_message},
+                    timeout=30.0
+                )
+                
+                if response.status_code != 200:
+                    logger.error(f"Failed to record PDF error: {response.status_code}")
+                    
+        except Exception as e:
+            logger.error(f"Error recording PDF error: {e}")
+    
     async def update_pdf_failed(
         self,
         pdf_id: int,
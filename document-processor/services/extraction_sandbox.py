@@ -0,0 +1,264 @@
+import os
+import time
+import signal
+import asyncio
+import logging
+import multiprocessing
+from contextlib import asynccontextmanager
+from typing import List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; only the polled RSS limit applies
+    resource = None
+
+from .page_source import PDFPageSource
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class SandboxFailure(Exception):
+    """The extraction process broke a limit or died; the message is the failure reason."""
+
+class ExtractionState:
+    """One open document and the extraction steps run against it.
+    
+    Lives inside a sandbox process, or in-process when SANDBOX_ENABLED is off.
+    """
+    
+    def __init__(self, processor):
+        self.processor = processor
+        self.source: Optional[PDFPageSource] = None
+    
+    def open(self, filepath: str) -> Tuple[int, int]:
+        """Open the PDF; returns (file_size, page_count)."""
+        self.close()
+        self.source = PDFPageSource(filepath)
+        return self.source.file_size, self.source.page_count
+    
+    def extract(self, first_page: int = None, last_page: int = None) -> Tuple[str, str, List[dict]]:
+        """Text, extraction method and page details for the document or a window of it."""
+        result = self.processor.extract_text_from_pdf_with_method(self.source, first_page, last_page)
+        if first_page is not None:
+            # Windows of a streamed document: keep only one window's text layer alive
+            self.source.release_text_layer()
+        return result
+    
+    def close(self):
+        if self.source is not None:
+            self.source.close()
+            self.source = None
+
+def _sandbox_main(conn):
+    """Entry point of a sandbox process: serve extraction calls until told to stop."""
+    logging.basicConfig(level=logging.INFO)
+    # Own process group, so a kill also takes down any OCR pool it started
+    os.setsid()
+    if resource is not None and settings.SANDBOX_MAX_RSS_MB > 0:
+        # Backstop for allocation spikes between RSS polls. RLIMIT_DATA rather than
+        # RLIMIT_AS: pdfium reserves tens of GB of address space it never touches.
+        limit = 2 * settings.SANDBOX_MAX_RSS_MB * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+    
+    # The processor is created without the embedding model and vector store
+    from .pdf_processor import PDFProcessor
+    state = ExtractionState(PDFProcessor(load_services=False))
+    
+    while True:
+        try:
+            op, args = conn.recv()
+        except EOFError:
+            break
+        if op == "stop":
+            break
+        try:
+            conn.send(("ok", getattr(state, op)(*args)))
+        except MemoryError:
+            state.close()
+            conn.send(("memory", None))
+        except Exception as e:
+            conn.send(("error", str(e)))
+    state.close()
+
+def _process_tree_rss_mb(pid: int) -> float:
+    """Resident memory of a process and its descendants, from /proc (0 where unavailable)."""
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+            with open(f"/proc/{current}/task/{current}/children") as children:
+                pending.extend(int(child) for child in children.read().split())
+        except (OSError, ValueError):
+            continue
+    return total_kb / 1024
+
+class SandboxWorker:
+    """One extraction subprocess, watched for SANDBOX_MAX_RSS_MB and SANDBOX_TIMEOUT_SECONDS.
+    
+    The time limit is a budget per document: it starts when the document is
+    opened and every call spends from it, so a streamed document cannot take
+    SANDBOX_TIMEOUT_SECONDS per window. Time between calls (e.g. waiting on
+    the chunk queue) is not counted. Calls block until the process answers,
+    so run them on a worker thread.
+    """
+    
+    def __init__(self):
+        self.jobs = 0
+        self._process = None
+        self._conn = None
+        self._remaining: Optional[float] = None  # Seconds left for the open document
+    
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+    
+    def _start(self):
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe()
+        # Not a daemon: it may start its own OCR process pool (OCR_WORKERS > 1)
+        self._process = context.Process(target=_sandbox_main, args=(child_conn,), name="extraction-sandbox")
+        self._process.start()
+        child_conn.close()
+        logger.info(f"Started extraction sandbox (pid {self._process.pid})")
+    
+    def _call(self, op: str, *args):
+        if not self.alive:
+            self._start()
+        self._conn.send((op, args))
+        
+        limit = settings.SANDBOX_TIMEOUT_SECONDS if self._remaining is None else self._remaining
+        started = time.monotonic()
+        while not self._conn.poll(min(settings.SANDBOX_POLL_SECONDS, max(0.0, limit))):
+            if not self._process.is_alive():
+                raise self._crashed()
+            if time.monotonic() - started >= limit:
+                self.kill()
+                raise SandboxFailure(
+                    f"Extraction exceeded the {settings.SANDBOX_TIMEOUT_SECONDS:.0f}s time limit"
+                )
+            rss = _process_tree_rss_mb(self._process.pid)
+            if settings.SANDBOX_MAX_RSS_MB > 0 and rss > settings.SANDBOX_MAX_RSS_MB:
+                self.kill()
+                raise SandboxFailure(
+                    f"Extraction exceeded the {settings.SANDBOX_MAX_RSS_MB} MB memory limit ({rss:.0f} MB)"
+                )
+        if self._remaining is not None:
+            self._remaining -= time.monotonic() - started
+        
+        try:
+            status, value = self._conn.recv()
+        except EOFError:
+            raise self._crashed()
+        if status == "memory":
+            self.kill()
+            raise SandboxFailure(f"Extraction exceeded the {settings.SANDBOX_MAX_RSS_MB} MB memory limit")
+        if status == "error":
+            raise RuntimeError(value)
+        return value
+    
+    def _crashed(self) -> SandboxFailure:
+        self._process.join(timeout=5)
+        code = self._process.exitcode
+        self.kill()
+        if code is not None and code < 0:
+            # e.g. SIGSEGV in a native library, or SIGKILL from the kernel OOM killer
+            return SandboxFailure(f"Extraction process was killed by {signal.Signals(-code).name}")
+        return SandboxFailure(f"Extraction process exited unexpectedly (exit code {code})")
+    
+    def open(self, filepath: str) -> Tuple[int, int]:
+        self._remaining = settings.SANDBOX_TIMEOUT_SECONDS
+        return self._call("open", filepath)
+    
+    def extract(self, first_page: int = None, last_page: int = None) -> Tuple[str, str, List[dict]]:
+        return self._call("extract", first_page, last_page)
+    
+    def close(self):
+        # Closing gets a limit of its own, even when the document used up its budget
+        self._remaining = None
+        if self.alive:
+            self._call("close")
+    
+    def stop(self):
+        """Let the process exit on its own, killing it if it does not."""
+        if self.alive:
+            try:
+                self._conn.send(("stop", ()))
+                self._process.join(timeout=5)
+            except (OSError, ValueError):
+                pass
+        self.kill()
+    
+    def kill(self):
+        if self._process is None:
+            return
+        if self._process.is_alive():
+            try:
+                os.killpg(self._process.pid, signal.SIGKILL)
+            except (AttributeError, OSError):
+                self._process.kill()
+        self._process.join(timeout=5)
+        self._conn.close()
+        self._process = self._conn = None
+        self._remaining = None
+
+class ExtractionSandbox:
+    """Pool of sandbox processes that each run one document's extraction and OCR at a time.
+    
+    A PDF that blows up pdfium, pdfplumber or tesseract takes down only its
+    sandbox, never the service holding the embedding model; the failure is
+    reported as a SandboxFailure with the limit it broke. Each process is
+    replaced after SANDBOX_MAX_JOBS_PER_WORKER documents to shed fragmentation.
+    """
+    
+    def __init__(self, workers: int):
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._workers = [SandboxWorker() for _ in range(max(1, workers))]
+        for worker in self._workers:
+            self._idle.put_nowait(worker)
+        self.recycled = 0
+        self.failures = 0
+    
+    @asynccontextmanager
+    async def session(self, run):
+        """Borrow a sandbox for one document; `run` executes blocking calls off the event loop."""
+        worker = await self._idle.get()
+        failed = False
+        try:
+            yield worker
+        except SandboxFailure:
+            failed = True
+            self.failures += 1
+            raise
+        finally:
+            try:
+                if not failed:
+                    await run(worker.close)
+            except Exception as e:
+                logger.warning(f"Could not close document in extraction sandbox: {e}")
+            worker.jobs += 1
+            if not worker.alive:
+                # Killed or never started: the next call starts a fresh process anyway
+                worker.jobs = 0
+            elif worker.jobs >= settings.SANDBOX_MAX_JOBS_PER_WORKER:
+                # The next call starts a fresh process
+                await run(worker.stop)
+                worker.jobs = 0
+                self.recycled += 1
+            self._idle.put_nowait(worker)
+    
+    def shutdown(self):
+        for worker in self._workers:
+            worker.kill()
+    
+    def stats(self) -> dict:
+        return {
+            "processes": sum(1 for worker in self._workers if worker.alive),
+            "recycled": self.recycled,
+            "failures": self.failures
+        }
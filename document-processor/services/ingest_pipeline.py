@@ -0,0 +1,720 @@
+import os
+import json
+import asyncio
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from .extraction_sandbox import ExtractionSandbox, ExtractionState, SandboxFailure
+from .lanes import InteractiveSignal
+from .page_text import PageTextReader, PageTextWriter, page_text_path
+from .pdf_processor import PDFProcessor
+from .rag_service import assign_chunk_ids
+from .summarizer import SummaryQueue
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Window over which per-stage throughput is reported
+THROUGHPUT_WINDOW_SECONDS = 60.0
+
+def failure_message(mode: str, error: str) -> str:
+    """The error recorded on a document that a failed re-index or revision leaves as it was."""
+    return f"{'Re-indexing' if mode == 'reindex' else 'Revision'} failed: {error}"
+
+class PageTotals:
+    """How a streamed document's pages were extracted, reduced to counts.
+    
+    A document extracted in one go keeps one entry per page for the
+    page_methods / page_ocr_stats columns. A streamed document would grow
+    that list with its length, so it keeps the number of pages per method
+    and totals over its OCRed pages instead.
+    """
+    
+    def __init__(self):
+        self.methods: Dict[str, int] = {}
+        self.ocr_pages = 0
+        self.ocr_cached = 0  # OCRed pages served from the OCR cache
+        self.ocr_dpis: Dict[int, int] = {}
+        self._confidence_sum = 0.0
+        self._confidence_pages = 0
+    
+    def add(self, page_details: List[dict]):
+        for detail in page_details:
+            self.methods[detail["method"]] = self.methods.get(detail["method"], 0) + 1
+            ocr = detail["ocr"]
+            if not ocr:
+                continue
+            self.ocr_pages += 1
+            if ocr.get("cached"):
+                self.ocr_cached += 1
+            self.ocr_dpis[ocr["dpi"]] = self.ocr_dpis.get(ocr["dpi"], 0) + 1
+            if ocr.get("confidence") is not None:
+                self._confidence_sum += ocr["confidence"]
+                self._confidence_pages += 1
+    
+    @property
+    def method(self) -> str:
+        """The single label stored on the PDF row, as PDFProcessor._document_method collapses it."""
+        if not self.methods:
+            return "text"
+        return next(iter(self.methods)) if len(self.methods) == 1 else "mixed"
+    
+    def fields(self) -> dict:
+        """page_methods as {method: pages}, and page_ocr_stats as {"pages", "dpi": {dpi: pages}, "confidence"}."""
+        confidence = self._confidence_sum / self._confidence_pages if self._confidence_pages else None
+        return {
+            "page_methods": json.dumps(self.methods),
+            "page_ocr_stats": json.dumps({
+                "pages": self.ocr_pages,
+                "dpi": self.ocr_dpis,
+                "confidence": round(confidence, 1) if confidence is not None else None
+            })
+        }
+
+class IngestJob:
+    """One document moving through the pipeline."""
+    
+    def __init__(self, pdf_id: int, filepath: str, filename: str, mode: str = "process"):
+        self.pdf_id = pdf_id
+        self.filepath = filepath
+        self.filename = filename
+        # "process"; "reindex" to rebuild the chunks and vectors of a completed
+        # document, keeping its summary and status; or "revision" to process a
+        # replaced file while the document keeps its status until it succeeds
+        self.mode = mode
+        self.from_page_text = False  # Chunked from the stored page text instead of the PDF
+        self.start_time = datetime.utcnow()
+        self.file_size: Optional[int] = None
+        self.page_count: Optional[int] = None
+        self.streamed = False
+        
+        self.head_text = ""
+        self.text_length = 0
+        self.page_details: List[dict] = []
+        self.page_totals = PageTotals()  # Instead of page_details when streamed
+        
+        # Batches are chunked strictly in extraction order (carry-over words and
+        # chunk indexes depend on it); embedding and storing may overlap freely
+        self.carry: List[str] = []
+        self.next_chunk_seq = 0
+        self.planned_chunks = 0
+        self.chunk_turn = asyncio.Condition()
+        
+        # Chunk IDs derive from chunk text, so a revision only embeds chunks it
+        # does not already have stored (reusable_ids) and drops the ones it lost
+        self.existing_ids: Set[str] = set()
+        self.reusable_ids: Set[str] = set()
+        self.seen_ids: Set[str] = set()
+        self.added_ids: Set[str] = set()  # Stored by this run; removed again if it fails
+        self.id_occurrences: Dict[str, int] = {}
+        self.reused_chunks = 0
+        
+        self.stored_chunks = 0
+        self.outstanding = 0
+        self.extracted = False
+        self.failed = False
+        self.abandoned = False  # Another worker took the job over; leave its chunks and status alone
+        self.error: Optional[str] = None
+        self.retryable = True  # False when retrying cannot help (e.g. no extractable text)
+        self.done: asyncio.Future = asyncio.get_running_loop().create_future()
+
+class IngestBatch:
+    """A slice of a job's text (the whole document, or one streaming window) and its chunks."""
+    
+    def __init__(self, job: IngestJob, seq: int, text: str, final: bool):
+        self.job = job
+        self.seq = seq
+        self.text = text
+        self.final = final
+        self.chunks: List[str] = []
+        self.chunk_ids: List[str] = []
+        self.start_index = 0
+        self.new: List[int] = []  # Positions of chunks that need embedding
+        self.embeddings: List[List[float]] = []  # For the chunks at `new`
+
+class StageStats:
+    """Counters for one stage: busy workers, items handled and recent throughput."""
+    
+    def __init__(self, name: str, workers: int, queue: asyncio.Queue, unit: str):
+        self.name = name
+        self.workers = workers
+        self.queue = queue
+        self.unit = unit
+        self.busy = 0
+        self.processed = 0
+        self.failed = 0
+        self.units = 0
+        self.busy_seconds = 0.0
+        self._recent = deque()  # (finished_at, units)
+    
+    def record(self, started: float, units: int, ok: bool = True):
+        finished = time.monotonic()
+        self.busy_seconds += finished - started
+        if ok:
+            self.processed += 1
+            self.units += units
+        else:
+            self.failed += 1
+        self._recent.append((finished, units))
+    
+    def snapshot(self) -> dict:
+        cutoff = time.monotonic() - THROUGHPUT_WINDOW_SECONDS
+        while self._recent and self._recent[0][0] < cutoff:
+            self._recent.popleft()
+        recent_units = sum(units for _, units in self._recent)
+        handled = self.processed + self.failed
+        return {
+            "workers": self.workers,
+            "busy": self.busy,
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "processed": self.processed,
+            "failed": self.failed,
+            "unit": self.unit,
+            "units_total": self.units,
+            "items_per_minute": len(self._recent) * 60.0 / THROUGHPUT_WINDOW_SECONDS,
+            "units_per_second": recent_units / THROUGHPUT_WINDOW_SECONDS,
+            "avg_seconds": self.busy_seconds / handled if handled else 0.0
+        }
+
+class IngestPipeline:
+    """Staged ingestion: extract/OCR → chunk → embed → store, each with its own pool.
+    
+    Stages are connected by bounded queues, so different documents overlap across
+    stages and a full queue stalls the stage feeding it: backpressure comes from
+    the slowest stage. A document is marked completed (searchable) as soon as
+    its chunks are stored; its LLM summary is queued for the Summarizer and
+    written later, so it never holds up ingestion. Embedding
+    runs in EMBED_BATCH_SIZE pieces and yields to interactive chat between them.
+    Extraction and OCR run in sandbox processes (SANDBOX_ENABLED), so a
+    pathological PDF cannot take the embedding model down with it.
+    """
+    
+    def __init__(self, processor: PDFProcessor):
+        self.processor = processor
+        self.rag_service = processor.rag_service
+        self.db_client = processor.db_client
+        self.interactive = InteractiveSignal()
+        self.summaries = SummaryQueue()
+        
+        size = max(1, settings.PIPELINE_QUEUE_SIZE)
+        self._intake: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self._chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self._embed_queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self._store_queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        
+        workers = {
+            "extract": max(1, settings.PIPELINE_EXTRACT_WORKERS),
+            "chunk": max(1, settings.PIPELINE_CHUNK_WORKERS),
+            "embed": max(1, settings.PIPELINE_EMBED_WORKERS),
+            "store": max(1, settings.PIPELINE_STORE_WORKERS)
+        }
+        self._pools: Dict[str, ThreadPoolExecutor] = {
+            stage: ThreadPoolExecutor(max_workers=count, thread_name_prefix=f"ingest-{stage}")
+            for stage, count in workers.items()
+        }
+        self._stats = {
+            "extract": StageStats("extract", workers["extract"], self._intake, "pages"),
+            "chunk": StageStats("chunk", workers["chunk"], self._chunk_queue, "chunks"),
+            "embed": StageStats("embed", workers["embed"], self._embed_queue, "chunks"),
+            "store": StageStats("store", workers["store"], self._store_queue, "chunks")
+        }
+        self.sandbox = ExtractionSandbox(workers["extract"]) if settings.SANDBOX_ENABLED else None
+        self._workers: List[asyncio.Task] = []
+        self._background: Set[asyncio.Task] = set()
+        self._active: Dict[int, IngestJob] = {}
+        self.ocr_pages = {"cached": 0, "read": 0}  # OCRed pages served from the OCR cache / read afresh
+        self.chunks_reused = 0  # Kept with their embeddings from a document's previous revision
+    
+    def start(self):
+        """Start the stage workers on the running event loop."""
+        stages = {
+            "extract": self._extract_worker,
+            "chunk": self._chunk_worker,
+            "embed": self._embed_worker,
+            "store": self._store_worker
+        }
+        for stage, worker in stages.items():
+            for _ in range(self._stats[stage].workers):
+                self._workers.append(asyncio.create_task(worker()))
+        logger.info(
+            "Ingest pipeline started: "
+            + ", ".join(f"{stage}×{stats.workers}" for stage, stats in self._stats.items())
+        )
+    
+    async def shutdown(self):
+        for task in self._workers + list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._background, return_exceptions=True)
+        self._workers.clear()
+        if self.sandbox is not None:
+            self.sandbox.shutdown()
+        for pool in self._pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        await self.interactive.close()
+        await self.summaries.close()
+    
+    async def submit(self, pdf_id: int, filepath: str, filename: str, mode: str = "process") -> IngestJob:
+        """Queue a document, waiting while the intake queue is full.
+        
+        The job's done future resolves to True once the document is stored and
+        marked completed, or False once it has been marked failed (see job.error).
+        In "reindex" mode the document's page text artifact is chunked and
+        embedded again instead of the PDF being extracted (without an artifact
+        the PDF is extracted again). A "revision" job processes a PDF's new
+        file in full. In both modes a failure leaves the document as it was.
+        """
+        job = IngestJob(pdf_id, filepath, filename, mode)
+        await self._intake.put(job)
+        return job
+    
+    async def process(self, pdf_id: int, filepath: str, filename: str) -> IngestJob:
+        """Queue a document and wait for its outcome."""
+        job = await self.submit(pdf_id, filepath, filename)
+        await job.done
+        return job
+    
+    def abandon(self, job: IngestJob, reason: str):
+        """Stop working on a job without touching its stored chunks or database status."""
+        if job.failed:
+            return
+        job.failed = job.abandoned = True
+        job.error = reason
+        self._resolve(job, False)
+    
+    def stats(self) -> dict:
+        return {
+            "active_documents": len(self._active),
+            "embed_yielded_seconds": round(self.interactive.yielded_seconds, 1),
+            "sandbox": self.sandbox.stats() if self.sandbox is not None else None,
+            "ocr_pages": dict(self.ocr_pages),
+            "chunks_reused": self.chunks_reused,
+            "stages": {stage: stats.snapshot() for stage, stats in self._stats.items()}
+        }
+    
+    async def _run(self, stage: str, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._pools[stage], func, *args)
+    
+    # ----- extract / OCR -----
+    
+    async def _extract_worker(self):
+        stats = self._stats["extract"]
+        while True:
+            job = await self._intake.get()
+            stats.busy += 1
+            started = time.monotonic()
+            try:
+                ok = await self._extract(job)
+            except SandboxFailure as e:
+                # Broke a memory/time limit or crashed: the same file would do it again
+                logger.error(f"Extraction sandbox failed on PDF {job.pdf_id}: {e}")
+                await self._fail(job, str(e), retryable=False)
+                ok = False
+            except Exception as e:
+                logger.error(f"Background processing error for PDF {job.pdf_id}: {e}")
+                await self._fail(job, str(e))
+                ok = False
+            finally:
+                stats.busy -= 1
+                self._intake.task_done()
+            stats.record(started, job.page_count or 0, ok)
+    
+    async def _extract(self, job: IngestJob) -> bool:
+        job.from_page_text = job.mode == "reindex" and os.path.exists(page_text_path(job.filepath))
+        if job.mode == "reindex" and not job.from_page_text:
+            logger.info(f"No stored page text for PDF {job.pdf_id}, extracting it again")
+        action = {"reindex": "re-indexing", "revision": "processing revision"}.get(job.mode, "processing")
+        logger.info(f"Starting {action} for PDF {job.pdf_id}: {job.filename}")
+        self._active[job.pdf_id] = job
+        job.existing_ids, job.reusable_ids = await self._run(
+            "store", self.rag_service.existing_chunk_ids, job.pdf_id
+        )
+        
+        # Open the file once; size, page count, text and renders all come from it
+        writer = None
+        try:
+            async with self._extraction(job) as extraction:
+                job.file_size, job.page_count = await self._run("extract", extraction.open, job.filepath)
+                if job.mode == "process":
+                    await self.db_client.update_pdf_processing_start(
+                        job.pdf_id, job.start_time, job.file_size, job.page_count
+                    )
+                if not job.from_page_text and settings.PAGE_TEXT_ARTIFACTS:
+                    writer = await self._run(
+                        "extract", PageTextWriter, job.filepath, job.file_size, job.page_count
+                    )
+                
+                if job.page_count > settings.STREAMING_PAGE_THRESHOLD:
+                    ok = await self._extract_windows(job, extraction, writer)
+                    if ok and writer is not None:
+                        await self._run("extract", writer.commit)
+                        writer = None
+                    return ok
+                
+                text, extraction_method, page_details = await self._run("extract", extraction.extract)
+                await self._record_pages(job, writer, 1, page_details)
+                if writer is not None and text.strip():
+                    await self._run("extract", writer.commit)
+                    writer = None
+        finally:
+            if writer is not None:
+                await self._run("extract", writer.abort)
+        
+        if not text.strip():
+            logger.warning(f"No text extracted from {job.filename}")
+            await self._fail(
+                job, f"No text could be extracted (method: {extraction_method})", retryable=False
+            )
+            return False
+        
+        logger.info(f"Extracted {len(text)} characters from {job.filename}")
+        job.text_length = len(text)
+        job.head_text = text[:2000]
+        await self._emit(IngestBatch(job, 0, text, final=True))
+        self._finish_extraction(job)
+        return True
+    
+    @asynccontextmanager
+    async def _extraction(self, job: IngestJob):
+        """The document's stored page text when re-indexing, else a sandbox process
+        for it, or in-process extraction when sandboxing is off."""
+        if job.from_page_text:
+            reader = PageTextReader(self.processor)
+            try:
+                yield reader
+            finally:
+                await self._run("extract", reader.close)
+            return
+        
+        if self.sandbox is not None:
+            async with self.sandbox.session(partial(self._run, "extract")) as extraction:
+                yield extraction
+            return
+        
+        extraction = ExtractionState(self.processor)
+        try:
+            yield extraction
+        finally:
+            await self._run("extract", extraction.close)
+    
+    async def _extract_windows(self, job: IngestJob, extraction, writer: Optional[PageTextWriter]) -> bool:
+        """Extract a large document STREAMING_WINDOW_PAGES at a time, emitting each window.
+        
+        Only the current window's text is held; the intake of later windows waits
+        on the chunk queue like any other batch, and the MAX_CHUNKS cap does not apply.
+        """
+        job.streamed = True
+        window = max(1, settings.STREAMING_WINDOW_PAGES)
+        logger.info(f"Streaming {job.page_count} pages of {job.filename} in windows of {window}")
+        
+        seq = 0
+        for first_page in range(1, job.page_count + 1, window):
+            if job.failed:
+                return False
+            last_page = min(first_page + window - 1, job.page_count)
+            text, _, window_details = await self._run("extract", extraction.extract, first_page, last_page)
+            await self._record_pages(job, writer, first_page, window_details)
+            if not text.strip():
+                continue
+            
+            job.text_length += len(text)
+            if len(job.head_text) < 2000:
+                job.head_text += text[:2000 - len(job.head_text)]
+            await self._emit(IngestBatch(job, seq, text, final=False))
+            seq += 1
+        
+        # Flushes the carried-over words as the last chunks
+        await self._emit(IngestBatch(job, seq, "", final=True))
+        self._finish_extraction(job)
+        return True
+    
+    async def _record_pages(
+        self, job: IngestJob, writer: Optional[PageTextWriter], first_page: int, page_details: List[dict]
+    ):
+        """Append pages to the text artifact, keeping only their method and OCR stats on the job."""
+        if writer is not None:
+            await self._run("extract", writer.write_pages, first_page, page_details)
+        for detail in page_details:
+            detail.pop("text", None)
+        if job.streamed:
+            job.page_totals.add(page_details)
+        else:
+            job.page_details.extend(page_details)
+    
+    async def _emit(self, batch: IngestBatch):
+        batch.job.outstanding += 1
+        await self._chunk_queue.put(batch)
+    
+    def _finish_extraction(self, job: IngestJob):
+        job.extracted = True
+        # A job chunked from stored page text OCRs nothing
+        if not job.from_page_text:
+            self._count_ocr_pages(job)
+        if job.outstanding == 0:
+            self._spawn(self._finalize(job))
+    
+    def _count_ocr_pages(self, job: IngestJob):
+        totals = job.page_totals
+        if not job.streamed:
+            totals = PageTotals()
+            totals.add(job.page_details)
+        self.ocr_pages["cached"] += totals.ocr_cached
+        self.ocr_pages["read"] += totals.ocr_pages - totals.ocr_cached
+        if totals.ocr_cached:
+            logger.info(f"Reused cached OCR for {totals.ocr_cached} of {totals.ocr_pages} pages of {job.filename}")
+    
+    # ----- chunk -----
+    
+    async def _chunk_worker(self):
+        stats = self._stats["chunk"]
+        while True:
+            batch = await self._chunk_queue.get()
+            job = batch.job
+            stats.busy += 1
+            started = time.monotonic()
+            ok = True
+            try:
+                async with job.chunk_turn:
+                    await job.chunk_turn.wait_for(lambda: job.next_chunk_seq == batch.seq)
+                    try:
+                        if not job.failed:
+                            batch.chunks = await self._run("chunk", self._chunk_batch, batch)
+                            batch.start_index = job.planned_chunks
+                            job.planned_chunks += len(batch.chunks)
+                    finally:
+                        job.next_chunk_seq += 1
+                        job.chunk_turn.notify_all()
+            except Exception as e:
+                ok = False
+                await self._fail(job, f"Chunking failed: {e}")
+            finally:
+                stats.busy -= 1
+                self._chunk_queue.task_done()
+            stats.record(started, len(batch.chunks), ok)
+            
+            if batch.chunks and not job.failed:
+                await self._embed_queue.put(batch)
+            else:
+                self._batch_done(batch)
+    
+    def _chunk_batch(self, batch: IngestBatch) -> List[str]:
+        chunks = self._split_batch(batch)
+        # In document order, so repeated chunk text is numbered the same way every run
+        batch.chunk_ids = assign_chunk_ids(batch.job.pdf_id, chunks, batch.job.id_occurrences)
+        batch.job.seen_ids.update(batch.chunk_ids)
+        return chunks
+    
+    def _split_batch(self, batch: IngestBatch) -> List[str]:
+        job = batch.job
+        batch.text, text = "", batch.text
+        if not job.streamed:
+            return self.processor.chunk_text(text)
+        chunks, job.carry = self.processor.chunk_window(text, job.carry, batch.final)
+        return chunks
+    
+    # ----- embed -----
+    
+    async def _embed_worker(self):
+        stats = self._stats["embed"]
+        while True:
+            batch = await self._embed_queue.get()
+            job = batch.job
+            stats.busy += 1
+            started = time.monotonic()
+            ok = True
+            try:
+                if not job.failed:
+                    batch.new = [
+                        i for i, chunk_id in enumerate(batch.chunk_ids) if chunk_id not in job.reusable_ids
+                    ]
+                    if batch.new:
+                        batch.embeddings = await self._embed([batch.chunks[i] for i in batch.new])
+            except Exception as e:
+                ok = False
+                logger.error(f"Error embedding chunks for PDF {job.pdf_id}: {e}")
+                await self._fail(job, "Failed to embed chunks")
+            finally:
+                stats.busy -= 1
+                self._embed_queue.task_done()
+            stats.record(started, len(batch.new), ok)
+            
+            if not job.failed:
+                await self._store_queue.put(batch)
+            else:
+                self._batch_done(batch)
+    
+    async def _embed(self, chunks: List[str]) -> List[List[float]]:
+        """Embed in EMBED_BATCH_SIZE pieces, pausing between them while chat is active."""
+        size = max(1, settings.EMBED_BATCH_SIZE)
+        embeddings = []
+        for start in range(0, len(chunks), size):
+            await self.interactive.wait_for_idle()
+            embeddings.extend(await self._run("embed", self.rag_service.embed_chunks, chunks[start:start + size]))
+        return embeddings
+    
+    # ----- store -----
+    
+    async def _store_worker(self):
+        stats = self._stats["store"]
+        while True:
+            batch = await self._store_queue.get()
+            job = batch.job
+            stats.busy += 1
+            started = time.monotonic()
+            ok = True
+            try:
+                if not job.failed:
+                    ok = await self._run("store", self._store_batch, batch)
+                    if ok:
+                        job.stored_chunks += len(batch.chunks)
+                    else:
+                        await self._fail(job, "Failed to store chunks in vector database")
+            except Exception as e:
+                ok = False
+                await self._fail(job, f"Failed to store chunks in vector database: {e}")
+            finally:
+                stats.busy -= 1
+                self._store_queue.task_done()
+            stats.record(started, len(batch.chunks), ok)
+            self._batch_done(batch)
+    
+    def _store_batch(self, batch: IngestBatch) -> bool:
+        """Upsert the newly embedded chunks; chunks kept from an earlier run only get fresh metadata."""
+        job = batch.job
+        new = set(batch.new)
+        added = [i for i in range(len(batch.chunks)) if i in new]
+        kept = [i for i in range(len(batch.chunks)) if i not in new]
+        
+        if added:
+            added_ids = [batch.chunk_ids[i] for i in added]
+            if not self.rag_service.add_chunks(
+                job.pdf_id, job.filename, added_ids, [batch.chunks[i] for i in added],
+                batch.embeddings, [batch.start_index + i for i in added]
+            ):
+                return False
+            job.added_ids.update(chunk_id for chunk_id in added_ids if chunk_id not in job.existing_ids)
+        if kept:
+            if not self.rag_service.relabel_chunks(
+                job.pdf_id, job.filename, [batch.chunk_ids[i] for i in kept],
+                [batch.chunks[i] for i in kept], [batch.start_index + i for i in kept]
+            ):
+                return False
+            job.reused_chunks += len(kept)
+        return True
+    
+    # ----- completion -----
+    
+    def _batch_done(self, batch: IngestBatch):
+        job = batch.job
+        batch.chunks = batch.chunk_ids = batch.embeddings = []
+        job.outstanding -= 1
+        if job.outstanding == 0 and (job.extracted or job.failed):
+            self._spawn(self._finalize(job))
+    
+    async def _finalize(self, job: IngestJob):
+        """Runs once all of a job's batches have drained from the pipeline."""
+        if job.failed:
+            # Chunks stored after the failure was recorded are removed here
+            if not job.abandoned:
+                await self._drop_added_chunks(job)
+            return
+        if job.stored_chunks == 0:
+            message = (
+                "No text could be extracted (method: streaming)" if job.streamed
+                else "No chunks could be created from extracted text"
+            )
+            await self._fail(job, message, retryable=False)
+            return
+        
+        # Chunks of the previous revision that this one no longer has
+        stale = list(job.existing_ids - job.seen_ids)
+        try:
+            await self._run("store", self.rag_service.delete_chunks, stale)
+        except Exception as e:
+            logger.warning(f"Could not delete stale chunks of PDF {job.pdf_id}: {e}")
+        if job.existing_ids:
+            logger.info(
+                f"Revised {job.filename}: {job.stored_chunks - job.reused_chunks} chunks embedded, "
+                f"{job.reused_chunks} reused, {len(stale)} removed"
+            )
+        self.chunks_reused += job.reused_chunks
+        if job.mode == "reindex":
+            await self.db_client.update_pdf_reindexed(job.pdf_id, job.stored_chunks)
+            logger.info(f"Re-indexed {job.filename}: {job.stored_chunks} chunks stored")
+            self._resolve(job, True)
+            return
+        
+        key_topics = await self.processor._extract_key_topics(job.head_text[:1000])
+        
+        if job.streamed:
+            extraction_method, page_fields = job.page_totals.method, job.page_totals.fields()
+        else:
+            extraction_method = self.processor._document_method(job.page_details)
+            page_fields = self.processor._page_detail_fields(job.page_details)
+        
+        end_time = datetime.utcnow()
+        content_preview = job.head_text[:500] + "..." if job.text_length > 500 else job.head_text
+        await self.db_client.update_pdf_completed(
+            pdf_id=job.pdf_id,
+            chunk_count=job.stored_chunks,
+            extraction_method=extraction_method,
+            processing_end_time=end_time,
+            processing_duration=(end_time - job.start_time).total_seconds(),
+            text_length=job.text_length,
+            key_topics=key_topics,
+            content_preview=content_preview,
+            **page_fields
+        )
+        logger.info(f"Successfully processed {job.filename}: {job.stored_chunks} chunks stored")
+        # The summary is written later, without holding the document back
+        try:
+            await self.summaries.enqueue(job.pdf_id)
+        except Exception as e:
+            logger.warning(f"Could not queue the summary of PDF {job.pdf_id}: {e}")
+        self._resolve(job, True)
+    
+    async def _fail(self, job: IngestJob, error_message: str, retryable: bool = True):
+        """Mark a job failed once and drop the chunks it added, now or when its batches drain.
+        
+        Chunks of the previous revision stay, so a failed revision or re-index
+        leaves the document searchable as it was.
+        """
+        if job.failed:
+            return
+        job.failed = True
+        job.error = error_message
+        job.retryable = retryable
+        if job.outstanding == 0:
+            await self._drop_added_chunks(job)
+        if job.mode != "process":
+            # The document keeps its status and stays searchable from its previous chunks
+            await self.db_client.update_pdf_error(job.pdf_id, failure_message(job.mode, error_message))
+            self._resolve(job, False)
+            return
+        await self.processor._mark_processing_failed(
+            job.pdf_id, job.start_time, error_message,
+            job.file_size, job.page_count, job.text_length or None
+        )
+        self._resolve(job, False)
+    
+    async def _drop_added_chunks(self, job: IngestJob):
+        if job.added_ids:
+            await self._run("store", self.rag_service.delete_chunks, list(job.added_ids))
+            job.added_ids.clear()
+    
+    def _resolve(self, job: IngestJob, ok: bool):
+        self._active.pop(job.pdf_id, None)
+        if not job.done.done():
+            job.done.set_result(ok)
+    
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
@@ -0,0 +1,318 @@
+import json
+import time
+import logging
+from typing import List, Optional, Set, Tuple
+
+import redis.asyncio as redis
+
+from config import settings
+# Key layout, enqueue script and scheduling rules shared with main-api, which enqueues uploads
+from shared.ingest_queue import (
+    QUEUE_KEY, DELAYED_KEY, PROCESSING_KEY, DEAD_LETTER_KEY, JOB_KEY, STATS_KEY, PAGES_KEY,
+    ENQUEUE_SCRIPT, enqueue_args, worker_stats, admission_load
+)
+
+logger = logging.getLogger(__name__)
+
+# Times claim() retries when other workers take the head of the queue first
+CLAIM_ATTEMPTS = 5
+
+# Finished job records are kept this long for inspection
+DONE_TTL_SECONDS = 24 * 3600
+
+# Make a retry that has become due runnable again, at its original priority
+PROMOTE_SCRIPT = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+redis.call('ZADD', KEYS[2], redis.call('HGET', KEYS[3], 'priority') or ARGV[2], ARGV[1])
+return 1
+"""
+
+# Claim a runnable job: move it from the queue to the processing set under a
+# lease that expires at ARGV[3] unless the worker heartbeats. Returns nothing
+# when another worker claimed it first.
+CLAIM_SCRIPT = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+    return nil
+end
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+redis.call('HSET', KEYS[3], 'status', 'running', 'claimed_at', ARGV[2], 'worker', ARGV[4])
+redis.call('HINCRBY', KEYS[3], 'attempts', 1)
+return redis.call('HGETALL', KEYS[3])
+"""
+
+# Extend a lease, only while this worker still holds it
+HEARTBEAT_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'worker') ~= ARGV[1] then
+    return 0
+end
+redis.call('ZADD', KEYS[2], 'XX', ARGV[2], ARGV[3])
+return 1
+"""
+
+# Settle a job this worker holds: done, retry at a later time, release back to
+# the queue untouched (keeping its priority), or dead-letter. A worker whose lease was reclaimed no
+# longer owns the job and changes nothing.
+FINISH_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'worker') ~= ARGV[1] then
+    return 0
+end
+local pdf_id = ARGV[2]
+local outcome = ARGV[3]
+redis.call('ZREM', KEYS[2], pdf_id)
+redis.call('HDEL', KEYS[1], 'worker')
+if outcome == 'done' or outcome == 'dead' then
+    redis.call('DECRBY', KEYS[5], tonumber(redis.call('HGET', KEYS[1], 'pages') or '0'))
+end
+if outcome == 'done' then
+    redis.call('HSET', KEYS[1], 'status', 'done', 'finished_at', ARGV[4])
+    redis.call('HDEL', KEYS[1], 'last_error')
+    redis.call('EXPIRE', KEYS[1], ARGV[6])
+elseif outcome == 'retry' then
+    redis.call('HSET', KEYS[1], 'status', 'queued', 'last_error', ARGV[5])
+    redis.call('ZADD', KEYS[6], ARGV[4], pdf_id)
+elseif outcome == 'release' then
+    redis.call('HSET', KEYS[1], 'status', 'queued')
+    redis.call('HINCRBY', KEYS[1], 'attempts', -1)
+    redis.call('ZADD', KEYS[3], redis.call('HGET', KEYS[1], 'priority') or ARGV[4], pdf_id)
+else
+    redis.call('HSET', KEYS[1], 'status', 'dead', 'last_error', ARGV[5])
+    redis.call('LPUSH', KEYS[4], ARGV[6])
+end
+return 1
+"""
+
+# Requeue a job whose lease ran out (its worker died or hung), or dead-letter
+# it once it has used up its attempts, e.g. a PDF that keeps killing workers.
+# Returns 0 if the lease is no longer expired, 1 if requeued, 2 if dead-lettered.
+RECLAIM_SCRIPT = """
+local expiry = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not expiry or tonumber(expiry) > tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[5], 'worker')
+local attempts = tonumber(redis.call('HGET', KEYS[5], 'attempts') or '0')
+if attempts >= tonumber(ARGV[3]) then
+    redis.call('DECRBY', KEYS[4], tonumber(redis.call('HGET', KEYS[5], 'pages') or '0'))
+    redis.call('HSET', KEYS[5], 'status', 'dead', 'last_error', 'Lease expired on the last attempt')
+    redis.call('LPUSH', KEYS[3], cjson.encode({
+        pdf_id = tonumber(ARGV[1]),
+        filename = redis.call('HGET', KEYS[5], 'filename'),
+        attempts = attempts,
+        error = 'Lease expired on the last attempt',
+        failed_at = tonumber(ARGV[2])
+    }))
+    return 2
+end
+redis.call('HSET', KEYS[5], 'status', 'queued', 'last_error', 'Lease expired; reclaimed')
+redis.call('ZADD', KEYS[2], redis.call('HGET', KEYS[5], 'priority') or ARGV[2], ARGV[1])
+return 1
+"""
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff before the next attempt, capped at JOB_RETRY_MAX_SECONDS."""
+    return min(settings.JOB_RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1), settings.JOB_RETRY_MAX_SECONDS)
+
+class JobQueue:
+    """Durable ingest job queue on Redis with retries, backoff and a dead-letter list.
+    
+    Any number of workers, on any host, claim jobs under time-limited leases.
+    A worker heartbeats its leases while it runs a job; if it dies, the lease
+    expires and the next reclaim_expired() call puts the job back on the queue.
+    """
+    
+    def __init__(self, redis_url: str = None):
+        self.redis = redis.Redis.from_url(redis_url or settings.REDIS_URL, decode_responses=True)
+        self._enqueue = self.redis.register_script(ENQUEUE_SCRIPT)
+        self._promote = self.redis.register_script(PROMOTE_SCRIPT)
+        self._claim = self.redis.register_script(CLAIM_SCRIPT)
+        self._heartbeat = self.redis.register_script(HEARTBEAT_SCRIPT)
+        self._finish = self.redis.register_script(FINISH_SCRIPT)
+        self._reclaim = self.redis.register_script(RECLAIM_SCRIPT)
+    
+    async def close(self):
+        await self.redis.close()
+    
+    async def enqueue(
+        self, pdf_id: int, filepath: str, filename: str, pages: int = 1, predicted: Optional[float] = None
+    ) -> bool:
+        """Queue a job; returns False when the PDF is already queued or running.
+        
+        `predicted` is the expected processing time in seconds (main-api's cost
+        model); without it the job is costed at SCHEDULER_DEFAULT_SECONDS_PER_PAGE.
+        """
+        added = await self._enqueue(
+            keys=[QUEUE_KEY, JOB_KEY.format(pdf_id), PAGES_KEY],
+            args=enqueue_args(settings, pdf_id, filepath, filename, pages, predicted, time.time())
+        )
+        return bool(added)
+    
+    async def enqueue_many(self, jobs: List[dict]) -> int:
+        """Queue several {"pdf_id", "filepath", "filename", "pages", "predicted", "mode"} jobs in one round trip.
+        
+        mode is "process" (the default), "reindex" or "revision"; see enqueue_args.
+        """
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for job in jobs:
+                await self._enqueue(
+                    keys=[QUEUE_KEY, JOB_KEY.format(job["pdf_id"]), PAGES_KEY],
+                    args=enqueue_args(
+                        settings, job["pdf_id"], job["filepath"], job["filename"],
+                        job.get("pages") or 1, job.get("predicted"), now, job.get("mode", "process")
+                    ),
+                    client=pipe
+                )
+            results = await pipe.execute()
+        return sum(1 for added in results if added)
+    
+    async def active(self, pdf_ids: List[int]) -> Set[int]:
+        """The subset of pdf_ids whose jobs are queued or running."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for pdf_id in pdf_ids:
+                pipe.hget(JOB_KEY.format(pdf_id), "status")
+            statuses = await pipe.execute()
+        return {pdf_id for pdf_id, status in zip(pdf_ids, statuses) if status in ("queued", "running")}
+    
+    async def claim(self, worker_id: str) -> Optional[dict]:
+        """Lease the highest-priority runnable job to worker_id, or None when nothing is due."""
+        now = time.time()
+        for pdf_id in await self.redis.zrangebyscore(DELAYED_KEY, "-inf", now):
+            await self._promote(keys=[DELAYED_KEY, QUEUE_KEY, JOB_KEY.format(pdf_id)], args=[pdf_id, now])
+        
+        # Every key a script touches is passed in KEYS, so the head of the queue
+        # is read first; if another worker claims it in between, try the next head
+        for _ in range(CLAIM_ATTEMPTS):
+            head = await self.redis.zrange(QUEUE_KEY, 0, 0)
+            if not head:
+                return None
+            fields = await self._claim(
+                keys=[QUEUE_KEY, PROCESSING_KEY, JOB_KEY.format(head[0])],
+                args=[head[0], now, now + settings.JOB_LEASE_SECONDS, worker_id]
+            )
+            if fields:
+                job = dict(zip(fields[::2], fields[1::2]))
+                job["pdf_id"] = int(job["pdf_id"])
+                job["attempts"] = int(job["attempts"])
+                return job
+        return None
+    
+    async def heartbeat(self, pdf_id: int, worker_id: str) -> bool:
+        """Extend worker_id's lease on a job; False means the lease was lost to another worker."""
+        renewed = await self._heartbeat(
+            keys=[JOB_KEY.format(pdf_id), PROCESSING_KEY],
+            args=[worker_id, time.time() + settings.JOB_LEASE_SECONDS, pdf_id]
+        )
+        return bool(renewed)
+    
+    async def _settle(
+        self, job: dict, worker_id: str, outcome: str, score: float = 0, error: str = "", extra=""
+    ) -> bool:
+        settled = await self._finish(
+            keys=[JOB_KEY.format(job["pdf_id"]), PROCESSING_KEY, QUEUE_KEY, DEAD_LETTER_KEY, PAGES_KEY, DELAYED_KEY],
+            args=[worker_id, job["pdf_id"], outcome, score, error, extra]
+        )
+        if not settled:
+            logger.warning(f"Lease on PDF {job['pdf_id']} was lost; leaving it to its new owner")
+        return bool(settled)
+    
+    async def complete(self, job: dict, worker_id: str) -> bool:
+        return await self._settle(job, worker_id, "done", time.time(), extra=DONE_TTL_SECONDS)
+    
+    async def release(self, job: dict, worker_id: str) -> bool:
+        """Hand a job back unfinished (e.g. on shutdown) without spending an attempt."""
+        return await self._settle(job, worker_id, "release", time.time())
+    
+    async def fail(self, job: dict, worker_id: str, error: str, retryable: bool = True) -> Optional[float]:
+        """Record a failed attempt: schedule a retry with backoff, or dead-letter the job.
+        
+        Returns the retry delay in seconds, or None if the job was dead-lettered
+        (or its lease had already been lost).
+        """
+        attempts = job["attempts"]
+        if retryable and attempts < settings.JOB_MAX_ATTEMPTS:
+            delay = retry_delay(attempts)
+            if await self._settle(job, worker_id, "retry", time.time() + delay, error):
+                return delay
+            return None
+        
+        record = {
+            "pdf_id": job["pdf_id"],
+            "filename": job.get("filename"),
+            "attempts": attempts,
+            "error": error,
+            "failed_at": time.time()
+        }
+        await self._settle(job, worker_id, "dead", error=error, extra=json.dumps(record))
+        return None
+    
+    async def reclaim_expired(self) -> Tuple[int, List[dict]]:
+        """Requeue (or dead-letter) jobs whose worker stopped renewing its lease.
+        
+        Returns the number requeued and the jobs dead-lettered, whose PDFs the
+        caller must mark failed.
+        """
+        now = time.time()
+        requeued, dead = 0, []
+        for pdf_id in await self.redis.zrangebyscore(PROCESSING_KEY, "-inf", now):
+            job_key = JOB_KEY.format(pdf_id)
+            outcome = await self._reclaim(
+                keys=[PROCESSING_KEY, QUEUE_KEY, DEAD_LETTER_KEY, PAGES_KEY, job_key],
+                args=[pdf_id, now, settings.JOB_MAX_ATTEMPTS]
+            )
+            if outcome == 1:
+                requeued += 1
+            elif outcome == 2:
+                job = await self.redis.hgetall(job_key)
+                dead.append({
+                    "pdf_id": int(pdf_id),
+                    "claimed_at": float(job.get("claimed_at") or now),
+                    "mode": job.get("mode", "process")
+                })
+        return requeued, dead
+    
+    async def dead_letters(self, limit: int = 100) -> List[dict]:
+        return [json.loads(record) for record in await self.redis.lrange(DEAD_LETTER_KEY, 0, limit - 1)]
+    
+    async def publish_stats(self, worker_id: str, stats: dict, ttl: int = 30):
+        await self.redis.set(STATS_KEY.format(worker_id), json.dumps(stats), ex=ttl)
+    
+    async def stats(self) -> dict:
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zcard(QUEUE_KEY)
+            pipe.zcard(DELAYED_KEY)
+            pipe.zcard(PROCESSING_KEY)
+            pipe.zcount(PROCESSING_KEY, "-inf", now)
+            pipe.llen(DEAD_LETTER_KEY)
+            runnable, delayed, processing, expired, dead = await pipe.execute()
+        
+        return {
+            "queued": runnable + delayed,
+            "runnable": runnable,
+            "retry_scheduled": delayed,
+            "processing": processing,
+            "expired_leases": expired,
+            "dead_letter": dead,
+            "load": await self.load(),
+            "workers": await worker_stats(self.redis)
+        }
+    
+    async def load(self, pages: int = 0) -> dict:
+        """Current ingest load against the admission limits.
+        
+        "accepting" says whether one more job of `pages` pages fits; when it
+        does not, "retry_after" estimates how long the workers need to drain
+        enough of the backlog, from the page throughput they last published.
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zcard(QUEUE_KEY)
+            pipe.zcard(DELAYED_KEY)
+            pipe.zcard(PROCESSING_KEY)
+            pipe.get(PAGES_KEY)
+            queued, delayed, processing, queued_pages = await pipe.execute()
+        return admission_load(
+            settings, queued + delayed + processing, max(0, int(queued_pages or 0)), pages, await worker_stats(self.redis)
+        )
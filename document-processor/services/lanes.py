@@ -0,0 +1,41 @@
+import time
+import asyncio
+import logging
+
+import redis.asyncio as redis
+
+from config import settings
+from shared.lanes import INTERACTIVE_SIGNAL_KEY
+
+logger = logging.getLogger(__name__)
+
+class InteractiveSignal:
+    """Lets bulk CPU work yield to interactive chat between units of work.
+    
+    Embedding shares the host's cores with the query path, so the embed stage
+    checks in here before each batch and holds back while chat is active, up
+    to EMBED_YIELD_MAX_SECONDS so ingest never stalls outright.
+    """
+    
+    def __init__(self):
+        self.redis = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        self.yielded_seconds = 0.0
+    
+    async def close(self):
+        await self.redis.close()
+    
+    async def wait_for_idle(self) -> float:
+        """Wait while interactive requests are active; returns the seconds waited."""
+        if settings.EMBED_YIELD_MAX_SECONDS <= 0:
+            return 0.0
+        started = time.monotonic()
+        deadline = started + settings.EMBED_YIELD_MAX_SECONDS
+        try:
+            while await self.redis.exists(INTERACTIVE_SIGNAL_KEY) and time.monotonic() < deadline:
+                await asyncio.sleep(settings.EMBED_YIELD_POLL_SECONDS)
+        except Exception as e:
+            # No signal, no yielding: carry on at full speed
+            logger.debug(f"Could not read interactive lane signal: {e}")
+        waited = time.monotonic() - started
+        self.yielded_seconds += waited
+        return waited
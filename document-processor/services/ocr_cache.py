@@ -0,0 +1,115 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Optional, Tuple
+
+from PIL import Image
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump when OCR output for the same image and settings would change
+CACHE_VERSION = 1
+
+class OCRCache:
+    """Disk cache of OCR results keyed by the rendered image and the OCR settings.
+    
+    A revised scan usually changes only a few pages, so reprocessing it (or a
+    near-duplicate upload) re-OCRs only the pages whose pixels changed. Entries
+    are small JSON files under OCR_CACHE_DIR, shared by every process on the
+    host; reads refresh an entry's mtime, and once the directory grows past
+    OCR_CACHE_MAX_MB the least recently used entries are removed. Hits are
+    counted per page by the ingest pipeline (its "ocr_pages" stats), which
+    sees every sandbox process's results.
+    """
+    
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None  # Estimated; recounted on eviction
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def key(image: Image.Image, engine: str, lang: str, dpi: int, with_confidence: bool) -> str:
+        """Hash of the image pixels and everything that changes how they are read.
+        
+        engine is the resolved engine name (never "auto"), so switching engines
+        does not serve one engine's output as the other's.
+        """
+        digest = hashlib.sha256(
+            f"{CACHE_VERSION}|{engine}|{lang}|{dpi}|{with_confidence}|"
+            f"{image.mode}|{image.width}x{image.height}|".encode()
+        )
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+    
+    def get(self, key: str) -> Optional[Tuple[str, Optional[float]]]:
+        """Cached (text, confidence), or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry["text"], entry.get("confidence")
+    
+    def put(self, key: str, text: str, confidence: Optional[float]):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"text": text, "confidence": confidence}, f)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write OCR cache entry: {e}")
+            return
+        
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan()[0]
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+    
+    def _scan(self) -> Tuple[int, list]:
+        """Total size of the cache and its entries as (mtime, size, path)."""
+        total, entries = 0, []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                total += stat.st_size
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return total, entries
+    
+    def _evict(self):
+        """Remove the least recently used entries until the cache is at 90% of its limit."""
+        total, entries = self._scan()
+        target = self.max_bytes * 0.9
+        entries.sort()
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue  # Already evicted by another process
+            total -= size
+            removed += 1
+        self._size = total
+        logger.info(f"Evicted {removed} OCR cache entries ({total / (1024 * 1024):.0f} MB left)")
@@ -0,0 +1,201 @@
+import os
+import logging
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pdfplumber
+import pypdfium2
+import pypdfium2.raw as pdfium_c
+from PIL import Image
+
+from .text_extractors import TextExtractor, create_text_extractor
+
+logger = logging.getLogger(__name__)
+
+# (x0, top, x1, bottom) in PDF points, origin at the top-left of the page
+BBox = Tuple[float, float, float, float]
+
+# pdfium is not thread-safe, even across documents, and pages are extracted
+# on several pipeline threads, so every pdfium call goes through this lock
+PDFIUM_LOCK = threading.RLock()
+
+def count_pages(pdf_path: str) -> int:
+    """Page count from the PDF's page tree, without loading any page."""
+    with PDFIUM_LOCK:
+        document = pypdfium2.PdfDocument(pdf_path)
+        try:
+            return len(document)
+        finally:
+            document.close()
+
+class PDFPage:
+    """One page of a PDFPageSource: text, image boxes and on-demand rasters."""
+    
+    def __init__(self, source: "PDFPageSource", plumber_page):
+        self._source = source
+        self._page = plumber_page
+        self.page_number = plumber_page.page_number
+        self.width = float(plumber_page.width)
+        self.height = float(plumber_page.height)
+    
+    def extract_text(self, extractor: str = "pdfplumber") -> str:
+        """Selectable text of the page, using the named TEXT_EXTRACTORS engine."""
+        if extractor == "pdfplumber":
+            return self._page.extract_text() or ""
+        return self._source.text_extractor(extractor).extract_page(self.page_number)
+    
+    def extract_text_lines(self) -> List[dict]:
+        """Text lines with their "top"/"bottom" positions, in reading order."""
+        return self._page.extract_text_lines(return_chars=False)
+    
+    @property
+    def image_boxes(self) -> List[BBox]:
+        """Bounding boxes of the images embedded in the page."""
+        return self._source.image_boxes(self.page_number)
+    
+    def render(self, dpi: int, bbox: Optional[BBox] = None) -> Image.Image:
+        return self._source.render(self.page_number, dpi, bbox)
+    
+    def close(self):
+        """Drop parsed layout objects so long documents don't accumulate them."""
+        self._page.flush_cache()
+
+class PDFPageSource:
+    """Opens a PDF once and serves page count, metadata, text and rasters from it.
+    
+    pdfplumber (text layer) and pdfium (page count and rendering) each open the
+    file once, instead of PyPDF2, pdfplumber and poppler each opening and
+    parsing it separately. Both read from the file on demand rather than
+    loading it into memory, so very large PDFs cost no more than their pages.
+    """
+    
+    pdfium_lock = PDFIUM_LOCK
+    
+    def __init__(self, pdf_path: str):
+        self.pdf_path = pdf_path
+        self._file_size = os.path.getsize(pdf_path)
+        with PDFIUM_LOCK:
+            self._pdfium = pypdfium2.PdfDocument(pdf_path)
+            self._page_count = len(self._pdfium)
+        self._plumber = None
+        self._extractors: Dict[str, TextExtractor] = {}
+    
+    def __enter__(self) -> "PDFPageSource":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    @property
+    def page_count(self) -> int:
+        return self._page_count
+    
+    @property
+    def file_size(self) -> int:
+        return self._file_size
+    
+    @property
+    def document(self) -> pypdfium2.PdfDocument:
+        return self._pdfium
+    
+    @property
+    def metadata(self) -> dict:
+        """Document info dictionary (title, author, producer, ...)."""
+        with PDFIUM_LOCK:
+            return self._pdfium.get_metadata_dict(skip_empty=True)
+    
+    def text_layer(self) -> pdfplumber.PDF:
+        """The pdfplumber view of the document, opened from the file on first use."""
+        if self._plumber is None:
+            self._plumber = pdfplumber.open(self.pdf_path)
+        return self._plumber
+    
+    def pages(self, first_page: int = None, last_page: int = None) -> Iterator[PDFPage]:
+        """Yield pages first_page..last_page (1-based, inclusive), flushing each after use."""
+        first_page = first_page or 1
+        last_page = min(last_page or self.page_count, self.page_count)
+        plumber = self.text_layer()
+        for index in range(first_page - 1, last_page):
+            page = PDFPage(self, plumber.pages[index])
+            try:
+                yield page
+            finally:
+                page.close()
+    
+    def text_extractor(self, name: str) -> TextExtractor:
+        """The named text extractor for this document, created on first use."""
+        if name not in self._extractors:
+            self._extractors[name] = create_text_extractor(name, self)
+        return self._extractors[name]
+    
+    def release_text_layer(self):
+        """Close the pdfplumber handle and text extractors; they are reopened from the file on next use.
+        
+        pdfminer caches every object it resolves for the life of the handle, so
+        callers walking a long document in windows release it between windows.
+        """
+        for extractor in self._extractors.values():
+            extractor.close()
+        self._extractors.clear()
+        if self._plumber is not None:
+            self._plumber.close()
+            self._plumber = None
+    
+    def image_boxes(self, page_number: int) -> List[BBox]:
+        """Bounding boxes of a page's images, read from pdfium without a layout pass.
+        
+        Images nested inside a form XObject are reported with the bounds of their
+        top-level form, since pdfium positions nested objects in form space.
+        """
+        with PDFIUM_LOCK:
+            return self._image_boxes(page_number)
+    
+    def _image_boxes(self, page_number: int) -> List[BBox]:
+        page = self._pdfium[page_number - 1]
+        try:
+            height = page.get_height()
+            boxes = []
+            form = None
+            for obj in page.get_objects(
+                filter=[pdfium_c.FPDF_PAGEOBJ_IMAGE, pdfium_c.FPDF_PAGEOBJ_FORM], max_depth=3
+            ):
+                if obj.level == 0:
+                    form = obj if obj.type == pdfium_c.FPDF_PAGEOBJ_FORM else None
+                    if form is not None:
+                        continue
+                elif obj.type != pdfium_c.FPDF_PAGEOBJ_IMAGE or form is None:
+                    continue
+                else:
+                    obj, form = form, None  # one box per form, however many images it holds
+                left, bottom, right, top = obj.get_pos()
+                boxes.append((left, height - top, right, height - bottom))
+            return boxes
+        finally:
+            page.close()
+    
+    def render(self, page_number: int, dpi: int, bbox: Optional[BBox] = None) -> Image.Image:
+        """Rasterize a page, or just the bbox region of it, to a grayscale image at dpi."""
+        with PDFIUM_LOCK:
+            return self._render(page_number, dpi, bbox)
+    
+    def _render(self, page_number: int, dpi: int, bbox: Optional[BBox] = None) -> Image.Image:
+        page = self._pdfium[page_number - 1]
+        try:
+            crop = (0, 0, 0, 0)
+            if bbox is not None:
+                width, height = page.get_size()
+                x0, top, x1, bottom = bbox
+                # pdfium crops are amounts cut off each side: (left, bottom, right, top)
+                crop = (max(0, x0), max(0, height - bottom), max(0, width - x1), max(0, top))
+            bitmap = page.render(scale=dpi / 72, crop=crop, grayscale=True)
+            # Copy out of pdfium's buffer so the image outlives the bitmap
+            image = bitmap.to_pil().copy()
+            bitmap.close()
+            return image
+        finally:
+            page.close()
+    
+    def close(self):
+        self.release_text_layer()
+        with PDFIUM_LOCK:
+            self._pdfium.close()
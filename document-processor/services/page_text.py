@@ -0,0 +1,96 @@
+import os
+import gzip
+import json
+import logging
+import tempfile
+from typing import List, Optional, Tuple
+
+# Shared with main-api, which removes the artifact along with its upload
+from shared.page_text import page_text_path
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT = 1
+
+class PageTextWriter:
+    """Writes a document's extracted text, page by page, as gzipped JSON lines.
+    
+    The first line is {"format", "file_size", "page_count"}; each following
+    line is one page's detail ({"page", "method", "ocr", "text"}). The file is
+    written under a temporary name and only replaces the previous artifact on
+    commit(), so a failed extraction never leaves a partial one behind.
+    """
+    
+    def __init__(self, filepath: str, file_size: int, page_count: int):
+        self.path = page_text_path(filepath)
+        fd, self._tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".part")
+        os.close(fd)
+        self._file = gzip.open(self._tmp_path, "wt", encoding="utf-8")
+        self._write({"format": ARTIFACT_FORMAT, "file_size": file_size, "page_count": page_count})
+    
+    def _write(self, record: dict):
+        self._file.write(json.dumps(record) + "\n")
+    
+    def write_pages(self, first_page: int, page_details: List[dict]):
+        for offset, detail in enumerate(page_details):
+            self._write({"page": first_page + offset, **detail})
+    
+    def commit(self):
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+    
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+class PageTextReader:
+    """Serves a document's extraction from its stored artifact instead of the PDF.
+    
+    Has the same open/extract/close interface as ExtractionState, so re-indexing
+    runs through the normal pipeline with pdfplumber, pdfium and OCR skipped.
+    Pages must be requested in increasing order, as the pipeline does.
+    """
+    
+    def __init__(self, processor):
+        self.processor = processor
+        self._file = None
+        self._pending: Optional[dict] = None  # Page read ahead of the current window
+    
+    def open(self, filepath: str) -> Tuple[int, int]:
+        """Open the artifact of the PDF at filepath; returns (file_size, page_count)."""
+        self.close()
+        self._file = gzip.open(page_text_path(filepath), "rt", encoding="utf-8")
+        header = json.loads(self._file.readline())
+        if header.get("format") != ARTIFACT_FORMAT:
+            raise ValueError(f"Unsupported page text artifact format: {header.get('format')}")
+        return header["file_size"], header["page_count"]
+    
+    def _next_page(self) -> Optional[dict]:
+        if self._pending is not None:
+            page, self._pending = self._pending, None
+            return page
+        line = self._file.readline()
+        return json.loads(line) if line else None
+    
+    def extract(self, first_page: int = None, last_page: int = None) -> Tuple[str, str, List[dict]]:
+        """Text, extraction method and page details, as extraction originally produced them."""
+        page_details = []
+        while True:
+            page = self._next_page()
+            if page is None:
+                break
+            if last_page is not None and page["page"] > last_page:
+                self._pending = page
+                break
+            if first_page is None or page["page"] >= first_page:
+                page_details.append({key: value for key, value in page.items() if key != "page"})
+        
+        text = "".join(detail["text"] for detail in page_details)
+        return text, self.processor._document_method(page_details), page_details
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._pending = None
@@ -1,78 +1,488 @@
 import os
 import asyncio
-import pdfplumber
 import pytesseract
 from PIL import Image
-from pdf2image import convert_from_path
-import PyPDF2
-from typing import List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import multiprocessing
+import threading
 from datetime import datetime
 import logging
 import httpx
 import json
 import re
 
-from .rag_service import RAGService
+try:
+    import tesserocr
+except ImportError:  # Optional: falls back to the pytesseract subprocess engine
+    tesserocr = None
+
+from .page_source import PDFPage, PDFPageSource
+from .ocr_cache import OCRCache
 from .database_client import DatabaseClient
 from config import settings
 
 logger = logging.getLogger(__name__)
 
+def _mean_confidence(confidences: List[float]) -> Optional[float]:
+    return sum(confidences) / len(confidences) if confidences else None
+
+class OCREngine:
+    """Turns an in-memory image into text."""
+    
+    name = "base"
+    
+    def __init__(self, lang: str):
+        self.lang = lang
+    
+    def image_to_string(self, image: Image.Image) -> str:
+        raise NotImplementedError
+    
+    def recognize(self, image: Image.Image) -> Tuple[str, Optional[float]]:
+        """Return (text, mean word confidence 0-100), confidence None when no words were found."""
+        raise NotImplementedError
+    
+    def close(self):
+        pass
+
+class PytesseractEngine(OCREngine):
+    """Runs the tesseract CLI per image: simple, but pays process start-up,
+    a temp-file round trip and a language-data load on every call."""
+    
+    name = "pytesseract"
+    
+    def image_to_string(self, image: Image.Image) -> str:
+        return pytesseract.image_to_string(image, lang=self.lang)
+    
+    def recognize(self, image: Image.Image) -> Tuple[str, Optional[float]]:
+        data = pytesseract.image_to_data(image, lang=self.lang, output_type=pytesseract.Output.DICT)
+        lines = {}
+        confidences = []
+        for i, word in enumerate(data["text"]):
+            confidence = float(data["conf"][i])
+            if confidence < 0 or not word.strip():
+                continue
+            line_key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            lines.setdefault(line_key, []).append(word)
+            confidences.append(confidence)
+        text = "\n".join(" ".join(words) for words in lines.values())
+        return text, _mean_confidence(confidences)
+
+class TesserocrEngine(OCREngine):
+    """Keeps one initialized libtesseract handle alive and feeds it images from memory."""
+    
+    name = "tesserocr"
+    
+    def __init__(self, lang: str):
+        super().__init__(lang)
+        self._api = tesserocr.PyTessBaseAPI(lang=lang)
+    
+    def image_to_string(self, image: Image.Image) -> str:
+        self._api.SetImage(image)
+        return self._api.GetUTF8Text()
+    
+    def recognize(self, image: Image.Image) -> Tuple[str, Optional[float]]:
+        self._api.SetImage(image)
+        text = self._api.GetUTF8Text()
+        return text, _mean_confidence(self._api.AllWordConfidences())
+    
+    def close(self):
+        self._api.End()
+
+OCR_ENGINES = {
+    PytesseractEngine.name: PytesseractEngine,
+    TesserocrEngine.name: TesserocrEngine,
+}
+
+# tesseract handles are not thread-safe, so each worker thread/process gets its own
+_engine_local = threading.local()
+
+def resolve_ocr_engine(name: str) -> str:
+    """The engine an OCR_ENGINE setting selects; "auto" prefers tesserocr when it is installed."""
+    if name == "auto" or name == TesserocrEngine.name:
+        return TesserocrEngine.name if tesserocr is not None else PytesseractEngine.name
+    return name
+
+def create_ocr_engine(name: str, lang: str) -> OCREngine:
+    """Create an OCR engine by name (see resolve_ocr_engine)."""
+    if name == TesserocrEngine.name and tesserocr is None:
+        logger.warning("tesserocr is not installed, falling back to pytesseract")
+    name = resolve_ocr_engine(name)
+    if name not in OCR_ENGINES:
+        raise ValueError(f"Unknown OCR engine '{name}'. Available: {', '.join(OCR_ENGINES)}")
+    
+    try:
+        return OCR_ENGINES[name](lang)
+    except Exception as e:
+        if name == PytesseractEngine.name:
+            raise
+        logger.warning(f"Could not initialize {name} OCR engine, falling back to pytesseract: {e}")
+        return PytesseractEngine(lang)
+
+def get_ocr_engine(lang: str) -> OCREngine:
+    """Return this worker's OCR engine, creating it on first use."""
+    engine = getattr(_engine_local, "engine", None)
+    if engine is None or engine.lang != lang:
+        if engine is not None:
+            engine.close()
+        engine = create_ocr_engine(settings.OCR_ENGINE, lang)
+        _engine_local.engine = engine
+        logger.info(f"Initialized {engine.name} OCR engine ({lang})")
+    return engine
+
+def _init_ocr_worker(lang: str):
+    """Process pool initializer: load the OCR engine once per worker."""
+    get_ocr_engine(lang)
+
+def _ocr_image(
+    image: Image.Image, lang: str, with_confidence: bool = False
+) -> Tuple[str, Optional[float]]:
+    """OCR a single rendered image. Module-level so it can run in a worker process.
+    
+    Returns (text, mean word confidence); confidence is only measured when asked for.
+    """
+    try:
+        engine = get_ocr_engine(lang)
+        if with_confidence:
+            return engine.recognize(image)
+        return engine.image_to_string(image), None
+    finally:
+        image.close()
+
+def _ocr_page_safely(
+    page_number: int, image: Image.Image, with_confidence: bool
+) -> Tuple[str, Optional[float]]:
+    """OCR a page in-process, returning an empty result on failure."""
+    try:
+        return _ocr_image(image, settings.OCR_LANGUAGE, with_confidence)
+    except Exception as e:
+        logger.error(f"OCR failed on page {page_number}: {e}")
+        return "", None
+
+def _collect_ocr_result(
+    page_number: int, future: Optional[Future], image: Optional[Image.Image]
+) -> Tuple[str, Optional[float]]:
+    """Wait for a pooled OCR job, returning an empty result on failure.
+    
+    The parent's copy of the image is closed once the job has finished
+    with it, as _ocr_image does in the worker.
+    """
+    if future is None:
+        return "", None
+    try:
+        return future.result()
+    except Exception as e:
+        logger.error(f"OCR failed on page {page_number}: {e}")
+        return "", None
+    finally:
+        image.close()
+
 class PDFProcessor:
-    def __init__(self):
-        self.rag_service = RAGService()
-        self.db_client = DatabaseClient()
+    def __init__(self, load_services: bool = True):
+        """load_services=False gives an extraction-only processor (no embedding model or DB client)."""
+        self.rag_service = None
+        self.db_client = None
+        if load_services:
+            # Imported here so extraction sandboxes never load torch/chromadb
+            from .rag_service import RAGService
+            self.rag_service = RAGService()
+            self.db_client = DatabaseClient()
+        self._ocr_pool: Optional[ProcessPoolExecutor] = None
+        self._ocr_pool_lock = threading.Lock()
+        self.ocr_cache = OCRCache(
+            settings.OCR_CACHE_DIR, settings.OCR_CACHE_MAX_MB * 1024 * 1024
+        ) if settings.OCR_CACHE_ENABLED else None
     
-    def _extract_selectable_text(self, pdf_path: str) -> str:
-        """Extract selectable text from PDF using pdfplumber."""
-        text = ""
+    def _extract_selectable_pages(
+        self, source: PDFPageSource, first_page: int = None, last_page: int = None
+    ) -> List[dict]:
+        """Extract selectable text per page and plan the OCR each page needs.
+        
+        Each page dict has "page_number", "text" and "ocr": None when the
+        selectable text is enough, "page" to OCR the whole rendered page, or
+        "regions" to OCR only the image boxes in "regions" and merge the results
+        between the text "lines" (top, text) at their vertical position.
+        """
+        pages = []
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
+            for page in source.pages(first_page, last_page):
+                page_text = self._extract_page_text(page)
+                info = {
+                    "page_number": page.page_number,
+                    "text": page_text,
+                    "ocr": None,
+                    "regions": [],
+                    "lines": []
+                }
+                
+                if not self._has_meaningful_text(page_text):
+                    info["ocr"] = "page"
+                else:
+                    regions = self._image_regions(page)
+                    if regions and settings.OCR_IMAGE_REGIONS:
+                        info["ocr"] = "regions"
+                        info["regions"] = regions
+                        info["lines"] = [
+                            (line["top"], line["text"]) for line in page.extract_text_lines()
+                        ]
+                    elif regions:
+                        info["ocr"] = "page"
+                
+                pages.append(info)
         except Exception as e:
             logger.error(f"Error with pdfplumber extraction: {e}")
-        return text
+        return pages
     
-    def _extract_text_with_ocr(self, pdf_path: str) -> str:
-        """Extract text from PDF using OCR for image-based content."""
-        text = ""
-        images = []
+    def _extract_page_text(self, page: PDFPage) -> str:
+        """Selectable text from the TEXT_EXTRACTOR engine, falling back to pdfplumber on poor output."""
+        extractor = settings.TEXT_EXTRACTOR
+        if extractor == "pdfplumber":
+            return page.extract_text()
+        
         try:
-            # Convert PDF pages to images
-            images = convert_from_path(pdf_path, dpi=settings.OCR_DPI)
-            
-            logger.info(f"Processing {len(images)} pages with OCR...")
-            
-            for i, image in enumerate(images):
-                try:
-                    # Use OCR to extract text from the image
-                    page_text = pytesseract.image_to_string(image, lang=settings.OCR_LANGUAGE)
-                    if page_text.strip():
-                        text += f"\n--- Page {i+1} (OCR) ---\n{page_text}\n"
-                        logger.info(f"Page {i+1}: Extracted {len(page_text)} characters via OCR")
-                except Exception as e:
-                    logger.error(f"OCR failed on page {i+1}: {e}")
-                finally:
-                    # Clean up image memory
-                    if hasattr(image, 'close'):
-                        image.close()
-                    
+            text = page.extract_text(extractor)
         except Exception as e:
-            logger.error(f"Error with OCR extraction: {e}")
-        finally:
-            # Ensure all images are cleaned up
-            for image in images:
-                try:
-                    if hasattr(image, 'close'):
-                        image.close()
-                except Exception:
-                    pass
+            logger.warning(f"{extractor} failed on page {page.page_number}: {e}")
+            text = ""
+        if settings.TEXT_EXTRACTOR_FALLBACK and not self._has_meaningful_text(text):
+            return page.extract_text()
         return text
     
-    def _has_meaningful_text(self, text: str) -> bool:
+    def _image_regions(self, page: PDFPage) -> List[Tuple[float, float, float, float]]:
+        """Bounding boxes (x0, top, x1, bottom) of images covering at least OCR_MIN_IMAGE_AREA of the page."""
+        page_area = page.width * page.height or 1.0
+        regions = []
+        for x0, top, x1, bottom in page.image_boxes:
+            if (x1 - x0) * (bottom - top) / page_area >= settings.OCR_MIN_IMAGE_AREA:
+                regions.append((x0, top, x1, bottom))
+        return sorted(regions, key=lambda region: region[1])
+    
+    def _merge_region_text(self, page: dict, region_texts: List[str]) -> str:
+        """Insert OCR text from image regions between the page's text lines by vertical position."""
+        blocks = [(top, 1, text) for top, text in page["lines"]]
+        for (_, top, _, _), region_text in zip(page["regions"], region_texts):
+            if region_text.strip():
+                # Sort an image ahead of a text line starting at the same height
+                blocks.append((top, 0, f"--- Image (OCR) ---\n{region_text.strip()}"))
+        blocks.sort(key=lambda block: (block[0], block[1]))
+        return "\n".join(text for _, _, text in blocks)
+    
+    def _get_ocr_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Return the shared OCR process pool, or None when OCR runs sequentially."""
+        if settings.OCR_WORKERS <= 1:
+            return None
+        with self._ocr_pool_lock:
+            return self._start_ocr_pool()
+    
+    def _start_ocr_pool(self) -> ProcessPoolExecutor:
+        if self._ocr_pool is None:
+            # Spawn rather than fork: the parent holds torch/chromadb threads
+            self._ocr_pool = ProcessPoolExecutor(
+                max_workers=settings.OCR_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_ocr_worker,
+                initargs=(settings.OCR_LANGUAGE,)
+            )
+            logger.info(f"Started OCR process pool with {settings.OCR_WORKERS} workers")
+        return self._ocr_pool
+    
+    def shutdown(self):
+        """Release the OCR process pool."""
+        if self._ocr_pool is not None:
+            self._ocr_pool.shutdown(wait=False, cancel_futures=True)
+            self._ocr_pool = None
+    
+    def _render_targets(
+        self, source: PDFPageSource, page: dict, dpi: int
+    ) -> List[Optional[Image.Image]]:
+        """Render what a page needs OCRed: the whole page, or only its image regions.
+        
+        Regions are rasterized directly instead of cropped out of a full-page
+        render; a region that cannot be rendered yields None.
+        """
+        if page["ocr"] != "regions":
+            return [source.render(page["page_number"], dpi)]
+        
+        targets = []
+        for region in page["regions"]:
+            try:
+                image = source.render(page["page_number"], dpi, bbox=region)
+                targets.append(image if image.width and image.height else None)
+            except Exception as e:
+                logger.warning(f"Could not render image region on page {page['page_number']}: {e}")
+                targets.append(None)
+        return targets
+    
+    def _cached_results(
+        self, targets: List[Optional[Image.Image]], dpi: int, with_confidence: bool
+    ) -> Tuple[List[Optional[str]], List[Optional[Tuple[str, Optional[float]]]]]:
+        """Cache keys and cached results for rendered targets; targets found in the cache are closed and set to None."""
+        keys = [None] * len(targets)
+        hits = [None] * len(targets)
+        if self.ocr_cache is None:
+            return keys, hits
+        engine = resolve_ocr_engine(settings.OCR_ENGINE)
+        for i, target in enumerate(targets):
+            if target is None:
+                continue
+            keys[i] = OCRCache.key(target, engine, settings.OCR_LANGUAGE, dpi, with_confidence)
+            hits[i] = self.ocr_cache.get(keys[i])
+            if hits[i] is not None:
+                target.close()
+                targets[i] = None
+        return keys, hits
+    
+    def _remember_results(self, keys: List[Optional[str]], results: List[Tuple[str, Optional[float]]]):
+        for key, (text, confidence) in zip(keys, results):
+            # An empty result without confidence may be a failed read; do not pin it
+            if key is not None and (text.strip() or confidence is not None):
+                self.ocr_cache.put(key, text, confidence)
+    
+    def _ocr_pages(
+        self, source: PDFPageSource, pages: List[dict], dpi: int, with_confidence: bool = False
+    ) -> Iterator[Tuple[int, List[Tuple[str, Optional[float]]], bool]]:
+        """Yield (page_number, results, cached) for the given pages rendered at dpi, in page order.
+        
+        results holds one (text, confidence) for a whole-page OCR, or one per image
+        region (in page["regions"] order) for region OCR; cached is True when all
+        of them came from the OCR cache. Pages are rendered one at a time from the
+        open source, and with a process pool at most OCR_MAX_INFLIGHT_PAGES images
+        are queued for OCR at any time.
+        """
+        pool = self._get_ocr_pool()
+        max_inflight = max(1, settings.OCR_MAX_INFLIGHT_PAGES)
+        pending = deque()
+        inflight = 0
+        
+        logger.info(
+            f"Processing {len(pages)} pages with OCR at {dpi} DPI "
+            f"({settings.OCR_WORKERS if pool else 1} worker(s))..."
+        )
+        
+        for page in sorted(pages, key=lambda page: page["page_number"]):
+            page_number = page["page_number"]
+            try:
+                targets = self._render_targets(source, page, dpi)
+            except Exception as e:
+                logger.error(f"Could not render page {page_number}: {e}")
+                targets = [None]
+            keys, hits = self._cached_results(targets, dpi, with_confidence)
+            cached = all(hit is not None for hit in hits)
+            
+            if pool is None:
+                results = [
+                    hit if hit is not None
+                    else _ocr_page_safely(page_number, target, with_confidence) if target is not None
+                    else ("", None)
+                    for target, hit in zip(targets, hits)
+                ]
+                self._remember_results(keys, results)
+                yield page_number, results, cached
+                continue
+            
+            while pending and inflight + len(targets) > max_inflight:
+                done = pending.popleft()
+                inflight -= len(done[1])
+                yield self._collect_page(*done)
+            futures = [
+                pool.submit(_ocr_image, target, settings.OCR_LANGUAGE, with_confidence)
+                if target is not None else None
+                for target in targets
+            ]
+            pending.append((page_number, futures, targets, keys, hits))
+            inflight += len(futures)
+        
+        while pending:
+            yield self._collect_page(*pending.popleft())
+    
+    def _collect_page(
+        self, page_number: int, futures: List[Optional[Future]], targets: List[Optional[Image.Image]],
+        keys: List[Optional[str]], hits: list
+    ) -> Tuple[int, List[Tuple[str, Optional[float]]], bool]:
+        """Wait for a page's pooled OCR jobs and merge them with its cached results."""
+        results = [
+            hit if hit is not None else _collect_ocr_result(page_number, future, target)
+            for future, target, hit in zip(futures, targets, hits)
+        ]
+        self._remember_results(keys, results)
+        return page_number, results, all(hit is not None for hit in hits)
+    
+    def _run_ocr(
+        self, source: PDFPageSource, pages: List[dict]
+    ) -> Tuple[Dict[int, List[str]], Dict[int, dict]]:
+        """OCR the given pages, returning (texts per page, {"dpi", "confidence", "cached"} per page).
+        
+        "cached" is True when the page's OCR was served entirely from the OCR cache.
+        With OCR_ADAPTIVE, every page is first read at OCR_LOW_DPI; only pages or
+        image regions whose mean word confidence falls below OCR_MIN_CONFIDENCE are
+        re-rendered and re-read at OCR_HIGH_DPI.
+        """
+        if not settings.OCR_ADAPTIVE:
+            texts = {}
+            stats = {}
+            for page_number, results, cached in self._ocr_pages(source, pages, settings.OCR_DPI):
+                texts[page_number] = [text for text, _ in results]
+                stats[page_number] = {"dpi": settings.OCR_DPI, "cached": cached}
+            return texts, stats
+        
+        results = {}
+        cached = {}
+        for page_number, page_results, page_cached in self._ocr_pages(
+            source, pages, settings.OCR_LOW_DPI, with_confidence=True
+        ):
+            results[page_number] = page_results
+            cached[page_number] = page_cached
+        dpis = {page_number: settings.OCR_LOW_DPI for page_number in results}
+        
+        # Second pass only over the low-confidence images
+        retry_pages = []
+        retry_indexes = {}
+        for page in pages:
+            page_number = page["page_number"]
+            low = [
+                i for i, (_, confidence) in enumerate(results.get(page_number, []))
+                if confidence is not None and confidence < settings.OCR_MIN_CONFIDENCE
+            ]
+            if not low:
+                continue
+            retry_indexes[page_number] = low
+            if page["ocr"] == "regions":
+                retry_pages.append(dict(page, regions=[page["regions"][i] for i in low]))
+            else:
+                retry_pages.append(page)
+        
+        if retry_pages:
+            logger.info(
+                f"Re-reading {len(retry_pages)} of {len(pages)} low-confidence pages "
+                f"at {settings.OCR_HIGH_DPI} DPI"
+            )
+            for page_number, retried, retried_cached in self._ocr_pages(
+                source, retry_pages, settings.OCR_HIGH_DPI, with_confidence=True
+            ):
+                cached[page_number] = cached[page_number] and retried_cached
+                for i, (text, confidence) in zip(retry_indexes[page_number], retried):
+                    previous = results[page_number][i][1]
+                    if confidence is not None and (previous is None or confidence >= previous):
+                        results[page_number][i] = (text, confidence)
+                dpis[page_number] = settings.OCR_HIGH_DPI
+        
+        texts = {}
+        stats = {}
+        for page_number, page_results in results.items():
+            texts[page_number] = [text for text, _ in page_results]
+            confidence = _mean_confidence(
+                [confidence for _, confidence in page_results if confidence is not None]
+            )
+            stats[page_number] = {
+                "dpi": dpis[page_number],
+                "confidence": round(confidence, 1) if confidence is not None else None,
+                "cached": cached[page_number]
+            }
+        return texts, stats
+    
+    @staticmethod
+    def _has_meaningful_text(text: str) -> bool:
         """Check if extracted text contains meaningful content."""
         if not text or len(text.strip()) < 50:
             return False
@@ -88,53 +498,102 @@ class PDFProcessor:
         alpha_ratio = alpha_chars / total_chars
         return alpha_ratio > 0.3
     
-    def _get_page_count(self, pdf_path: str) -> int:
-        """Get the number of pages in the PDF."""
-        try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                return len(pdf_reader.pages)
-        except Exception as e:
-            logger.error(f"Error getting page count: {e}")
-            return 0
-    
-    def extract_text_from_pdf_with_method(self, pdf_path: str) -> Tuple[str, str]:
-        """Extract text and return the method used."""
+    def extract_text_from_pdf_with_method(
+        self, source: PDFPageSource, first_page: int = None, last_page: int = None
+    ) -> Tuple[str, str, List[dict]]:
+        """Extract text (optionally for a page range), OCRing only the pages that need it.
+        
+        Returns (text, document method, page details). Each page detail has a
+        "method" of "text", "ocr" (no usable selectable text) or "mixed" (selectable
+        text plus OCR of its images, by default only of the image regions), and
+        "ocr" stats ({"dpi", "confidence", "cached"}) or None; its "text" is the
+        page's share of the document text. The document method is "mixed" when
+        pages differ.
+        """
         try:
-            # First, try standard text extraction
-            text_extracted = self._extract_selectable_text(pdf_path)
+            pages = self._extract_selectable_pages(source, first_page, last_page)
+            if not pages:
+                # pdfplumber could not parse the file; pdfium may still render it
+                logger.info("No selectable pages found, falling back to OCR for every page")
+                first = first_page or 1
+                last = min(last_page or source.page_count, source.page_count)
+                pages = [
+                    {"page_number": number, "text": "", "ocr": "page", "regions": [], "lines": []}
+                    for number in range(first, last + 1)
+                ]
             
-            # Check if we got meaningful text
-            meaningful_text = self._has_meaningful_text(text_extracted)
+            ocr_pages = [page for page in pages if page["ocr"]]
+            region_count = sum(1 for page in ocr_pages if page["ocr"] == "regions")
+            logger.info(
+                f"OCR needed on {len(ocr_pages)} of {len(pages)} pages "
+                f"({region_count} image-region only)"
+            )
             
-            if meaningful_text:
-                logger.info(f"Found selectable text in PDF: {len(text_extracted)} characters")
-                
-                # Check if there are also images with text
+            ocr_texts = {}
+            ocr_stats = {}
+            if ocr_pages:
                 try:
-                    ocr_text = self._extract_text_with_ocr(pdf_path)
-                    if self._has_meaningful_text(ocr_text):
-                        logger.info("PDF has both selectable text and images, combining both...")
-                        combined_text = f"{text_extracted}\n\n--- Text from Images ---\n{ocr_text}"
-                        return combined_text, "mixed"
-                    else:
-                        return text_extracted, "text"
+                    ocr_texts, ocr_stats = self._run_ocr(source, ocr_pages)
                 except Exception as e:
-                    logger.error(f"OCR check failed, using text only: {e}")
-                    return text_extracted, "text"
-            else:
-                logger.info("No meaningful selectable text found, trying OCR...")
-                ocr_text = self._extract_text_with_ocr(pdf_path)
-                return ocr_text, "ocr"
+                    logger.error(f"Error with OCR extraction, using selectable text only: {e}")
+            
+            page_details = []
+            for page in pages:
+                page_number = page["page_number"]
+                page_text = page["text"]
+                texts = ocr_texts.get(page_number, [])
+                ocr_text = "\n".join(texts)
+                piece = ""
+                if not page["ocr"]:
+                    method = "text"
+                    piece = page_text + "\n"
+                elif page["ocr"] == "regions":
+                    method = "mixed"
+                    piece = self._merge_region_text(page, texts) + "\n"
+                elif self._has_meaningful_text(page_text):
+                    method = "mixed"
+                    piece = page_text + "\n"
+                    if ocr_text.strip():
+                        piece += f"\n--- Page {page_number} images (OCR) ---\n{ocr_text}\n"
+                else:
+                    method = "ocr"
+                    if ocr_text.strip():
+                        piece = f"\n--- Page {page_number} (OCR) ---\n{ocr_text}\n"
+                    elif page_text.strip():
+                        piece = page_text + "\n"
+                page_details.append({"method": method, "ocr": ocr_stats.get(page_number), "text": piece})
+            
+            text = "".join(detail["text"] for detail in page_details)
+            return text, self._document_method(page_details), page_details
                 
         except Exception as e:
             logger.error(f"Error extracting text from PDF: {e}")
-            return "", "error"
+            return "", "error", []
+    
+    def _document_method(self, page_details: List[dict]) -> str:
+        """Collapse per-page methods into the single label stored on the PDF row."""
+        distinct = set(detail["method"] for detail in page_details)
+        if not distinct:
+            return "text"
+        return distinct.pop() if len(distinct) == 1 else "mixed"
     
-    def chunk_text(self, text: str, chunk_size: int = None, overlap: int = 50) -> List[str]:
+    def _page_detail_fields(self, page_details: List[dict]) -> dict:
+        """JSON columns recording how each page was extracted and, if OCRed, at what DPI/confidence."""
+        return {
+            "page_methods": json.dumps([detail["method"] for detail in page_details]),
+            "page_ocr_stats": json.dumps([detail["ocr"] for detail in page_details])
+        }
+    
+    def chunk_text(
+        self,
+        text: str,
+        chunk_size: int = None,
+        overlap: int = 50,
+        max_chunks: Optional[int] = settings.MAX_CHUNKS
+    ) -> List[str]:
+        """Split text into overlapping chunks. Pass max_chunks=None for no cap."""
         if chunk_size is None:
             chunk_size = settings.MAX_CHUNK_SIZE
-        """Split text into overlapping chunks."""
         if not text.strip():
             return []
         
@@ -148,8 +607,8 @@ class PDFProcessor:
         chunks = []
         
         for i in range(0, len(words), chunk_size - max_overlap):
-            if len(chunks) >= settings.MAX_CHUNKS:
-                logger.warning(f"Reached maximum chunk limit ({settings.MAX_CHUNKS}) for text processing")
+            if max_chunks is not None and len(chunks) >= max_chunks:
+                logger.warning(f"Reached maximum chunk limit ({max_chunks}) for text processing")
                 break
                 
             chunk = " ".join(words[i:i + chunk_size])
@@ -158,43 +617,72 @@ class PDFProcessor:
         
         return chunks
     
-    async def _generate_summary(self, text: str) -> str:
-        """Generate a summary using the LLM service."""
-        if not text.strip():
-            return "No content available for summary."
-            
+    def _chunk_complete_words(
+        self, words: List[str], chunk_size: int = None, overlap: int = 50
+    ) -> Tuple[List[str], List[str]]:
+        """Chunk only the windows that are already full, returning (chunks, carry-over words).
+        
+        Feeding the carry-over into the next call and finishing with chunk_text()
+        yields exactly the chunks chunk_text() would produce for the whole text.
+        """
+        if chunk_size is None:
+            chunk_size = settings.MAX_CHUNK_SIZE
+        chunk_size = min(chunk_size, settings.MAX_CHUNK_SIZE)
+        step = chunk_size - min(overlap, chunk_size // 2)
+        
+        chunks = []
+        i = 0
+        while i + chunk_size <= len(words):
+            chunks.append(" ".join(words[i:i + chunk_size]))
+            i += step
+        return chunks, words[i:]
+    
+    def chunk_window(self, text: str, carry: List[str], final: bool = False) -> Tuple[List[str], List[str]]:
+        """Chunks of the next window of a streamed document and the words carried into the one after.
+        
+        Feed the windows in order, then call once more with final=True to flush
+        the carry-over: together they give chunk_text()'s chunks for the whole
+        document, without the MAX_CHUNKS cap.
+        """
+        if final:
+            return self.chunk_text(" ".join(carry), max_chunks=None), []
+        return self._chunk_complete_words(carry + text.split())
+    
+    def chunk_windows(self, texts: List[str]) -> List[str]:
+        """chunk_window() over all the windows of a streamed document."""
+        chunks, carry = [], []
+        for text in texts:
+            window_chunks, carry = self.chunk_window(text, carry)
+            chunks.extend(window_chunks)
+        return chunks + self.chunk_window("", carry, final=True)[0]
+    
+    async def _generate(self, prompt: str, max_tokens: int = 150) -> Optional[str]:
+        """Ollama completion for a prompt, or None when it fails or comes back empty."""
         try:
-            # Use Ollama for summary generation
-            ollama_url = f"{settings.OLLAMA_URL}/api/generate"
-            prompt = f"""Please provide a concise 2-3 sentence summary of the following document content:
-
-{text}
-
-Summary:"""
-            
             payload = {
-                "model": settings.OLLAMA_MODEL,
                 "prompt": prompt,
                 "stream": False,
                 "options": {
                     "temperature": 0.3,
-                    "max_tokens": 150
+                    "max_tokens": max_tokens
                 }
             }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(ollama_url, json=payload)
+            # Through main-api's lane scheduler, so summaries queue behind user chat
+            async with httpx.AsyncClient(timeout=settings.SUMMARY_TIMEOUT_SECONDS) as client:
+                response = await client.post(
+                    settings.LLM_PROXY_URL, params={"lane": settings.SUMMARY_LANE}, json=payload
+                )
                 if response.status_code == 200:
                     data = response.json()
-                    summary = data.get("response", "").strip()
-                    return summary if summary else "Summary could not be generated."
+                    return data.get("response", "").strip() or None
                 else:
                     logger.warning(f"Failed to generate summary: {response.status_code}")
-                    return "Summary generation failed."
+                    return None
                     
         except Exception as e:
             logger.error(f"Error generating summary: {e}")
-            return "Summary could not be generated."
+            return None
     
     async def _extract_key_topics(self, text: str) -> str:
         """Extract key topics from text using simple keyword analysis."""
@@ -219,91 +707,6 @@ Summary:"""
             logger.error(f"Error extracting topics: {e}")
             return "[]"
     
-    async def process_pdf_background(self, pdf_id: int, filepath: str, filename: str):
-        """Process PDF in background with comprehensive error handling."""
-        start_time = datetime.utcnow()
-        file_size = None
-        page_count = None
-        text_length = None
-        
-        try:
-            logger.info(f"Starting processing for PDF {pdf_id}: {filename}")
-            
-            # Get file size and page count
-            file_size = os.path.getsize(filepath) if os.path.exists(filepath) else None
-            page_count = self._get_page_count(filepath)
-            
-            # Update database with processing start
-            await self.db_client.update_pdf_processing_start(
-                pdf_id, start_time, file_size, page_count
-            )
-            
-            # Extract text and determine method used
-            text, extraction_method = self.extract_text_from_pdf_with_method(filepath)
-            
-            if not text.strip():
-                logger.warning(f"No text extracted from {filename}")
-                await self._mark_processing_failed(
-                    pdf_id, start_time, 
-                    f"No text could be extracted (method: {extraction_method})",
-                    file_size, page_count
-                )
-                return
-            
-            text_length = len(text)
-            logger.info(f"Extracted {text_length} characters from {filename}")
-            
-            # Chunk text
-            chunks = self.chunk_text(text)
-            if not chunks:
-                logger.warning(f"No chunks created from {filename}")
-                await self._mark_processing_failed(
-                    pdf_id, start_time,
-                    f"No chunks could be created from extracted text",
-                    file_size, page_count, text_length
-                )
-                return
-            
-            logger.info(f"Created {len(chunks)} chunks from {filename}")
-            
-            # Generate content analysis
-            content_preview = text[:500] + "..." if len(text) > 500 else text
-            summary = await self._generate_summary(text[:2000])  # Use first 2000 chars for summary
-            key_topics = await self._extract_key_topics(text[:1000])  # Use first 1000 chars for topics
-            
-            # Store with embeddings
-            success = self.rag_service.store_document_chunks(pdf_id, filename, chunks)
-            
-            end_time = datetime.utcnow()
-            processing_duration = (end_time - start_time).total_seconds()
-            
-            if success:
-                # Mark as completed with content analysis
-                await self.db_client.update_pdf_completed(
-                    pdf_id=pdf_id,
-                    chunk_count=len(chunks),
-                    extraction_method=extraction_method,
-                    processing_end_time=end_time,
-                    processing_duration=processing_duration,
-                    text_length=text_length,
-                    summary=summary,
-                    key_topics=key_topics,
-                    content_preview=content_preview
-                )
-                logger.info(f"Successfully processed {filename}: {len(chunks)} chunks stored")
-            else:
-                await self._mark_processing_failed(
-                    pdf_id, start_time,
-                    f"Failed to store chunks in vector database",
-                    file_size, page_count, text_length
-                )
-            
-        except Exception as e:
-            logger.error(f"Background processing error for PDF {pdf_id}: {e}")
-            await self._mark_processing_failed(
-                pdf_id, start_time, str(e), file_size, page_count, text_length
-            )
-    
     async def _mark_processing_failed(
         self, 
         pdf_id: int, 
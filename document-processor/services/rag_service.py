@@ -1,6 +1,7 @@
 import chromadb
 from sentence_transformers import SentenceTransformer
-from typing import List
+from typing import Dict, List, Optional, Set, Tuple
+import hashlib
 import logging
 from datetime import datetime
 
@@ -8,10 +9,27 @@ from config import settings
 
 logger = logging.getLogger(__name__)
 
+EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+
+def assign_chunk_ids(pdf_id: int, chunks: List[str], occurrences: Optional[Dict[str, int]] = None) -> List[str]:
+    """Content-derived chunk IDs: the same text keeps its ID across revisions of a document.
+    
+    Repeated text within a document is told apart by its occurrence number;
+    pass the same `occurrences` dict for every batch of one document.
+    """
+    occurrences = {} if occurrences is None else occurrences
+    chunk_ids = []
+    for chunk in chunks:
+        digest = hashlib.sha256(chunk.encode("utf-8")).hexdigest()[:32]
+        occurrence = occurrences.get(digest, 0)
+        occurrences[digest] = occurrence + 1
+        chunk_ids.append(f"{pdf_id}_{digest}_{occurrence}")
+    return chunk_ids
+
 class RAGService:
     def __init__(self):
         """Initialize the RAG service with embedding model and vector database."""
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedding_model = SentenceTransformer(EMBEDDING_MODEL)
         self.chroma_client = chromadb.PersistentClient(path=settings.CHROMA_PERSIST_DIRECTORY)
         
         # Create or get collection
@@ -24,34 +42,39 @@ class RAGService:
             )
             logger.info("Created new ChromaDB collection 'documents'")
     
-    def store_document_chunks(self, pdf_id: int, filename: str, chunks: List[str]) -> bool:
-        """Store document chunks with embeddings in the vector database."""
+    def embed_chunks(self, chunks: List[str]) -> List[List[float]]:
+        """Encode chunks with the embedding model (CPU-bound; run it off the event loop)."""
+        return self.embedding_model.encode(chunks).tolist()
+    
+    @staticmethod
+    def _chunk_metadata(pdf_id: int, filename: str, chunk: str, index: int) -> dict:
+        return {
+            "pdf_id": pdf_id,
+            "filename": filename,
+            "chunk_index": index,
+            "timestamp": datetime.utcnow().isoformat(),
+            "chunk_length": len(chunk),
+            "embedding_model": EMBEDDING_MODEL
+        }
+    
+    def add_chunks(
+        self,
+        pdf_id: int,
+        filename: str,
+        chunk_ids: List[str],
+        chunks: List[str],
+        embeddings: List[List[float]],
+        indexes: List[int]
+    ) -> bool:
+        """Write already-embedded chunks to the vector database at their positions in the document."""
         try:
-            if not chunks:
-                return False
-            
-            logger.info(f"Generating embeddings for {len(chunks)} chunks from {filename}")
-            
-            # Generate embeddings
-            embeddings = self.embedding_model.encode(chunks).tolist()
-            
-            # Create unique IDs for each chunk
-            chunk_ids = [f"{pdf_id}_{i}" for i in range(len(chunks))]
-            
-            # Create metadata for each chunk
             metadatas = [
-                {
-                    "pdf_id": pdf_id,
-                    "filename": filename,
-                    "chunk_index": i,
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "chunk_length": len(chunk)
-                }
-                for i, chunk in enumerate(chunks)
+                self._chunk_metadata(pdf_id, filename, chunk, index)
+                for chunk, index in zip(chunks, indexes)
             ]
             
-            # Store in ChromaDB
-            self.collection.add(
+            # Store in ChromaDB, replacing chunks of an earlier run with the same IDs
+            self.collection.upsert(
                 embeddings=embeddings,
                 documents=chunks,
                 metadatas=metadatas,
@@ -65,6 +88,55 @@ class RAGService:
             logger.error(f"Error storing document chunks: {e}")
             return False
     
+    def upsert_chunks(
+        self, chunk_ids: List[str], chunks: List[str], embeddings: List[List[float]], metadatas: List[dict]
+    ):
+        """Write embedded chunks of any number of documents in one call; bulk ingestion batches across documents."""
+        self.collection.upsert(embeddings=embeddings, documents=chunks, metadatas=metadatas, ids=chunk_ids)
+    
+    def relabel_chunks(
+        self, pdf_id: int, filename: str, chunk_ids: List[str], chunks: List[str], indexes: List[int]
+    ) -> bool:
+        """Refresh the metadata of chunks kept from an earlier revision; their embeddings stay."""
+        try:
+            self.collection.update(
+                ids=chunk_ids,
+                metadatas=[
+                    self._chunk_metadata(pdf_id, filename, chunk, index)
+                    for chunk, index in zip(chunks, indexes)
+                ]
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error updating document chunks: {e}")
+            return False
+    
+    def existing_chunk_ids(self, pdf_id: int) -> Tuple[Set[str], Set[str]]:
+        """A PDF's stored chunk IDs, and those among them whose embedding can be reused.
+        
+        Chunks embedded by another model are overwritten rather than reused.
+        """
+        results = self.collection.get(where={"pdf_id": pdf_id}, include=["metadatas"])
+        existing = set(results['ids'])
+        reusable = {
+            chunk_id for chunk_id, metadata in zip(results['ids'], results['metadatas'])
+            if (metadata or {}).get("embedding_model") == EMBEDDING_MODEL
+        }
+        return existing, reusable
+    
+    def document_chunks(self, pdf_id: int) -> List[str]:
+        """A PDF's stored chunk texts in document order."""
+        results = self.collection.get(where={"pdf_id": pdf_id}, include=["documents", "metadatas"])
+        ordered = sorted(
+            zip(results['metadatas'], results['documents']),
+            key=lambda pair: (pair[0] or {}).get("chunk_index", 0)
+        )
+        return [document for _, document in ordered]
+    
+    def delete_chunks(self, chunk_ids: List[str]):
+        if chunk_ids:
+            self.collection.delete(ids=chunk_ids)
+    
     def delete_document(self, pdf_id: int):
         """Delete all chunks for a specific PDF."""
         try:
@@ -83,6 +155,41 @@ class RAGService:
         except Exception as e:
             logger.error(f"Error deleting document chunks: {e}")
     
+    def reassign_document(self, pdf_id: int, new_pdf_id: int, filename: str) -> int:
+        """Move a PDF's chunks to another PDF record with the same content; returns the chunk count.
+        
+        The chunks are re-keyed under the new PDF's id (see assign_chunk_ids), so
+        its next revision finds them as its own instead of embedding everything again.
+        """
+        results = self.collection.get(
+            where={"pdf_id": pdf_id}, include=["embeddings", "documents", "metadatas"]
+        )
+        if not results['ids']:
+            return 0
+        
+        old_prefix, new_prefix = f"{pdf_id}_", f"{new_pdf_id}_"
+        chunk_ids = [
+            new_prefix + chunk_id[len(old_prefix):] if chunk_id.startswith(old_prefix) else chunk_id
+            for chunk_id in results['ids']
+        ]
+        metadatas = [
+            {**metadata, "pdf_id": new_pdf_id, "filename": filename}
+            for metadata in results['metadatas']
+        ]
+        # Write the new IDs before dropping the old ones, so the chunks are never missing
+        self.collection.upsert(
+            ids=chunk_ids,
+            embeddings=results['embeddings'],
+            documents=results['documents'],
+            metadatas=metadatas
+        )
+        kept = set(chunk_ids)
+        stale = [chunk_id for chunk_id in results['ids'] if chunk_id not in kept]
+        if stale:
+            self.collection.delete(ids=stale)
+        logger.info(f"Reassigned {len(chunk_ids)} chunks from PDF {pdf_id} to PDF {new_pdf_id}")
+        return len(chunk_ids)
+    
     def count_chunks_for_pdf(self, pdf_id: int) -> int:
         """Count chunks for a specific PDF."""
         try:
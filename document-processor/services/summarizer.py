@@ -0,0 +1,204 @@
+import time
+import asyncio
+import hashlib
+import logging
+from typing import List, Optional
+
+import redis.asyncio as redis
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_QUEUE_KEY = "summary:queue"            # ZSET pdf_id -> time the summary is due
+SUMMARY_PROCESSING_KEY = "summary:processing"  # ZSET pdf_id -> lease expiry of the worker summarizing it
+PARTIAL_KEY = "summary:partial:{}"             # Cached LLM output per prompt hash
+
+# Bump when the prompts change, so cached partial summaries are not reused
+PROMPT_VERSION = 1
+
+SECTION_PROMPT = """Summarize this section of a document in 2-3 sentences. Keep names, figures and conclusions:
+
+{text}
+
+Summary:"""
+
+COMBINE_PROMPT = """These are summaries of consecutive sections of one document. Merge them into a single summary of at most 4 sentences:
+
+{text}
+
+Summary:"""
+
+DOCUMENT_PROMPT = """Please provide a concise 2-3 sentence summary of the following document content:
+
+{text}
+
+Summary:"""
+
+# Put expired leases back on the queue, then lease the earliest due summary
+CLAIM_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, pdf_id in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], pdf_id)
+    redis.call('ZADD', KEYS[1], 'NX', ARGV[1], pdf_id)
+end
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 1)
+if #ids == 0 then
+    return nil
+end
+redis.call('ZREM', KEYS[1], ids[1])
+redis.call('ZADD', KEYS[2], ARGV[2], ids[1])
+return ids[1]
+"""
+
+def sections(chunks: List[str], max_words: int) -> List[str]:
+    """Consecutive chunks joined into sections of at most max_words words; longer chunks are cut."""
+    grouped, current, words = [], [], 0
+    for chunk in chunks:
+        chunk_words = chunk.split()[:max_words]
+        if current and words + len(chunk_words) > max_words:
+            grouped.append(" ".join(current))
+            current, words = [], 0
+        current.extend(chunk_words)
+        words += len(chunk_words)
+    if current:
+        grouped.append(" ".join(current))
+    return grouped
+
+class SummaryQueue:
+    """Redis queue of documents waiting for their summary.
+    
+    Summaries are off the ingest path: a document is marked searchable first
+    and queued here afterwards. Queueing a document that is already waiting
+    is a no-op; one queued while it is being summarized is summarized again.
+    """
+    
+    def __init__(self, redis_url: str = None):
+        self.redis = redis.Redis.from_url(redis_url or settings.REDIS_URL, decode_responses=True)
+        self._claim = self.redis.register_script(CLAIM_SCRIPT)
+    
+    async def close(self):
+        await self.redis.close()
+    
+    async def enqueue(self, pdf_id: int):
+        await self.redis.zadd(SUMMARY_QUEUE_KEY, {pdf_id: time.time()}, nx=True)
+    
+    async def claim(self) -> Optional[int]:
+        now = time.time()
+        pdf_id = await self._claim(
+            keys=[SUMMARY_QUEUE_KEY, SUMMARY_PROCESSING_KEY],
+            args=[now, now + settings.SUMMARY_LEASE_SECONDS]
+        )
+        return int(pdf_id) if pdf_id is not None else None
+    
+    async def renew(self, pdf_id: int):
+        await self.redis.zadd(SUMMARY_PROCESSING_KEY, {pdf_id: time.time() + settings.SUMMARY_LEASE_SECONDS}, xx=True)
+    
+    async def finish(self, pdf_id: int, retry_at: Optional[float] = None):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(SUMMARY_PROCESSING_KEY, pdf_id)
+            if retry_at is not None:
+                pipe.zadd(SUMMARY_QUEUE_KEY, {pdf_id: retry_at}, nx=True)
+            await pipe.execute()
+    
+    async def depth(self) -> int:
+        return await self.redis.zcard(SUMMARY_QUEUE_KEY)
+
+class Summarizer:
+    """Map-reduce summaries of whole documents, one document at a time.
+    
+    A document's stored chunks are grouped into sections of up to
+    SUMMARY_SECTION_WORDS words; each section is summarized (map), and the
+    section summaries are merged, level by level, until they fit one prompt
+    for the document summary (reduce). Every LLM answer is cached in Redis by
+    the hash of its prompt, so a revised document only re-summarizes the
+    sections whose text changed. Requests go through main-api's SUMMARY_LANE
+    and so queue behind chat and ingest work.
+    """
+    
+    def __init__(self, processor, queue: SummaryQueue):
+        self.processor = processor
+        self.rag_service = processor.rag_service
+        self.db_client = processor.db_client
+        self.queue = queue
+        self.summarized = 0
+        self.failed = 0
+        self.llm_calls = 0
+        self.cached_calls = 0
+    
+    async def run(self):
+        """Summarize queued documents until cancelled."""
+        while True:
+            try:
+                pdf_id = await self.queue.claim()
+            except Exception as e:
+                logger.error(f"Error claiming summary job: {e}")
+                pdf_id = None
+            if pdf_id is None:
+                await asyncio.sleep(settings.WORKER_POLL_SECONDS)
+                continue
+            
+            retry_at = None
+            try:
+                summary = await self.summarize(pdf_id)
+                if summary is not None:
+                    await self.db_client.update_pdf_summary(pdf_id, summary)
+                    self.summarized += 1
+            except asyncio.CancelledError:
+                # The lease runs out and another worker picks the document up
+                raise
+            except Exception as e:
+                self.failed += 1
+                retry_at = time.time() + settings.SUMMARY_RETRY_SECONDS
+                logger.warning(f"Summary of PDF {pdf_id} failed, retrying in {settings.SUMMARY_RETRY_SECONDS:.0f}s: {e}")
+            try:
+                await self.queue.finish(pdf_id, retry_at)
+            except Exception as e:
+                logger.error(f"Error settling summary of PDF {pdf_id}: {e}")
+    
+    async def summarize(self, pdf_id: int) -> Optional[str]:
+        """The document summary, or None when the PDF has no chunks (e.g. deleted meanwhile)."""
+        chunks = await asyncio.to_thread(self.rag_service.document_chunks, pdf_id)
+        if not chunks:
+            return None
+        max_words = max(100, settings.SUMMARY_SECTION_WORDS)
+        parts = sections(chunks, max_words)
+        if len(parts) == 1:
+            return await self._complete(pdf_id, DOCUMENT_PROMPT, parts[0])
+        
+        # Map: one summary per section
+        parts = [await self._complete(pdf_id, SECTION_PROMPT, part) for part in parts]
+        # Reduce: merge until the section summaries fit a single prompt
+        while len(" ".join(parts).split()) > max_words:
+            merged = [await self._complete(pdf_id, COMBINE_PROMPT, group) for group in sections(parts, max_words)]
+            if len(merged) >= len(parts):
+                break  # Summaries that long cannot be merged any further; use what fits
+            parts = merged
+        text = "\n\n".join(parts)
+        return await self._complete(pdf_id, DOCUMENT_PROMPT, " ".join(text.split()[:max_words]))
+    
+    async def _complete(self, pdf_id: int, template: str, text: str) -> str:
+        """The LLM's answer to a prompt, from the cache when this exact prompt was answered before."""
+        prompt = template.format(text=text)
+        key = PARTIAL_KEY.format(hashlib.sha256(f"{PROMPT_VERSION}|{prompt}".encode("utf-8")).hexdigest())
+        cached = await self.queue.redis.get(key)
+        if cached is not None:
+            self.cached_calls += 1
+            return cached
+        
+        answer = await self.processor._generate(prompt)
+        if answer is None:
+            raise RuntimeError("LLM request failed")
+        self.llm_calls += 1
+        await self.queue.redis.set(key, answer, ex=int(settings.SUMMARY_CACHE_TTL_DAYS * 86400))
+        # Each call may have waited behind chat for a while; keep the document leased
+        await self.queue.renew(pdf_id)
+        return answer
+    
+    def stats(self) -> dict:
+        return {
+            "summarized": self.summarized,
+            "failed": self.failed,
+            "llm_calls": self.llm_calls,
+            "cached_calls": self.cached_calls
+        }
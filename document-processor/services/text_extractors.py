@@ -0,0 +1,126 @@
+import logging
+
+from pdfminer.converter import PDFPageAggregator
+from pdfminer.layout import LAParams, LTTextContainer
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage as MinerPage
+from pdfminer.pdfparser import PDFParser
+
+try:
+    import pypdf
+except ImportError:  # Optional: only needed for the "pypdf" extractor
+    pypdf = None
+
+logger = logging.getLogger(__name__)
+
+# Layout analysis tuned for throughput: boxes_flow=None skips pdfminer's
+# hierarchical text-box grouping, the most expensive part of its layout pass,
+# and vertical-text detection is off since our corpus is horizontal text.
+FAST_LAPARAMS = LAParams(
+    line_margin=0.5,
+    char_margin=2.0,
+    word_margin=0.1,
+    boxes_flow=None,
+    detect_vertical=False,
+    all_texts=False
+)
+
+class TextExtractor:
+    """Pulls the selectable text of one page out of an open PDFPageSource."""
+    
+    name = "base"
+    
+    def __init__(self, source):
+        self.source = source
+    
+    def extract_page(self, page_number: int) -> str:
+        raise NotImplementedError
+    
+    def close(self):
+        pass
+
+class PdfplumberExtractor(TextExtractor):
+    """pdfminer layout plus pdfplumber's character clustering: the most faithful, and the slowest."""
+    
+    name = "pdfplumber"
+    
+    def extract_page(self, page_number: int) -> str:
+        page = self.source.text_layer().pages[page_number - 1]
+        try:
+            return page.extract_text() or ""
+        finally:
+            page.flush_cache()
+
+class PdfminerExtractor(TextExtractor):
+    """pdfminer.six directly, with FAST_LAPARAMS."""
+    
+    name = "pdfminer"
+    
+    def __init__(self, source):
+        super().__init__(source)
+        # Read on demand from the file, which stays open while the extractor is in use
+        self._file = open(source.pdf_path, "rb")
+        document = PDFDocument(PDFParser(self._file))
+        self._pages = list(MinerPage.create_pages(document))
+        resources = PDFResourceManager(caching=True)
+        self._device = PDFPageAggregator(resources, laparams=FAST_LAPARAMS)
+        self._interpreter = PDFPageInterpreter(resources, self._device)
+    
+    def extract_page(self, page_number: int) -> str:
+        self._interpreter.process_page(self._pages[page_number - 1])
+        layout = self._device.get_result()
+        return "".join(item.get_text() for item in layout if isinstance(item, LTTextContainer))
+    
+    def close(self):
+        self._pages = []
+        self._file.close()
+
+class PypdfExtractor(TextExtractor):
+    """pypdf's content-stream text extraction: no layout analysis at all."""
+    
+    name = "pypdf"
+    
+    def __init__(self, source):
+        super().__init__(source)
+        if pypdf is None:
+            raise RuntimeError("pypdf is not installed")
+        # From an open file: given a path, pypdf reads the whole file into memory
+        self._file = open(source.pdf_path, "rb")
+        self._reader = pypdf.PdfReader(self._file)
+    
+    def extract_page(self, page_number: int) -> str:
+        return self._reader.pages[page_number - 1].extract_text() or ""
+    
+    def close(self):
+        self._file.close()
+
+class PdfiumExtractor(TextExtractor):
+    """pdfium's native text page, read from the handle the source already holds."""
+    
+    name = "pdfium"
+    
+    def extract_page(self, page_number: int) -> str:
+        with self.source.pdfium_lock:
+            page = self.source.document[page_number - 1]
+            try:
+                textpage = page.get_textpage()
+                try:
+                    return textpage.get_text_range().replace("\r\n", "\n")
+                finally:
+                    textpage.close()
+            finally:
+                page.close()
+
+TEXT_EXTRACTORS = {
+    PdfplumberExtractor.name: PdfplumberExtractor,
+    PdfminerExtractor.name: PdfminerExtractor,
+    PypdfExtractor.name: PypdfExtractor,
+    PdfiumExtractor.name: PdfiumExtractor,
+}
+
+def create_text_extractor(name: str, source) -> TextExtractor:
+    """Create a text extractor by name for an open PDFPageSource."""
+    if name not in TEXT_EXTRACTORS:
+        raise ValueError(f"Unknown text extractor '{name}'. Available: {', '.join(TEXT_EXTRACTORS)}")
+    return TEXT_EXTRACTORS[name](source)
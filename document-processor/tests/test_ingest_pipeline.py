@@ -0,0 +1,91 @@
+import json
+import asyncio
+
+from services.ingest_pipeline import IngestJob, IngestPipeline, PageTotals
+
+def page(method: str, dpi: int = None, confidence: float = None) -> dict:
+    return {"method": method, "ocr": {"dpi": dpi, "confidence": confidence} if dpi else None}
+
+def test_totals_count_pages_per_method():
+    totals = PageTotals()
+    totals.add([page("text"), page("text"), page("ocr", 200, 80.0)])
+    totals.add([page("text"), page("mixed", 300, 60.0), page("ocr", 200)])
+    
+    assert totals.methods == {"text": 3, "ocr": 2, "mixed": 1}
+    assert totals.method == "mixed"
+    fields = totals.fields()
+    assert json.loads(fields["page_methods"]) == {"text": 3, "ocr": 2, "mixed": 1}
+    assert json.loads(fields["page_ocr_stats"]) == {"pages": 3, "dpi": {"200": 2, "300": 1}, "confidence": 70.0}
+
+def test_totals_of_a_single_method():
+    totals = PageTotals()
+    totals.add([page("ocr", 200)] * 3)
+    assert totals.method == "ocr"
+    assert json.loads(totals.fields()["page_ocr_stats"])["confidence"] is None
+
+def test_totals_without_pages():
+    assert PageTotals().method == "text"
+
+class FakeDatabase:
+    def __init__(self):
+        self.calls = []
+    
+    async def update_pdf_error(self, pdf_id, error_message):
+        self.calls.append(("error", pdf_id, error_message))
+
+class FakeProcessor:
+    def __init__(self, db):
+        self.db = db
+    
+    async def _mark_processing_failed(self, pdf_id, *args):
+        self.db.calls.append(("failed", pdf_id))
+
+class FakeRag:
+    def __init__(self):
+        self.deleted = []
+    
+    def delete_chunks(self, chunk_ids):
+        self.deleted.extend(sorted(chunk_ids))
+
+def failing_pipeline() -> IngestPipeline:
+    pipeline = IngestPipeline.__new__(IngestPipeline)
+    pipeline.db_client = FakeDatabase()
+    pipeline.processor = FakeProcessor(pipeline.db_client)
+    pipeline.rag_service = FakeRag()
+    pipeline._active = {}
+    
+    async def run(stage, fn, *args):
+        return fn(*args)
+    pipeline._run = run
+    return pipeline
+
+def fail(mode: str):
+    async def scenario():
+        pipeline = failing_pipeline()
+        job = IngestJob(7, "/up/a.pdf", "a.pdf", mode)
+        job.existing_ids = {"7_old_0", "7_kept_0"}
+        job.added_ids = {"7_new_0", "7_new_1"}
+        job.stored_chunks = 3
+        await pipeline._fail(job, "embed timed out")
+        return pipeline, job, await job.done
+    return asyncio.run(scenario())
+
+def test_failed_processing_marks_failed_and_drops_added_chunks():
+    pipeline, job, ok = fail("process")
+    assert not ok
+    assert pipeline.db_client.calls == [("failed", 7)]
+    assert pipeline.rag_service.deleted == ["7_new_0", "7_new_1"]
+
+def test_failed_reindex_keeps_document_completed():
+    pipeline, job, ok = fail("reindex")
+    assert not ok
+    assert job.error == "embed timed out"
+    assert pipeline.db_client.calls == [("error", 7, "Re-indexing failed: embed timed out")]
+    assert pipeline.rag_service.deleted == ["7_new_0", "7_new_1"]
+
+def test_failed_revision_keeps_status_and_previous_chunks():
+    pipeline, job, ok = fail("revision")
+    assert not ok
+    # No status or chunk count change, only the error
+    assert pipeline.db_client.calls == [("error", 7, "Revision failed: embed timed out")]
+    assert pipeline.rag_service.deleted == ["7_new_0", "7_new_1"]
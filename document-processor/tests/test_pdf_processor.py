@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from config import settings
+from services.pdf_processor import PDFProcessor
+
+@pytest.fixture
+def processor(monkeypatch):
+    # Small chunks, so a few hundred words span many windows
+    monkeypatch.setattr(settings, "MAX_CHUNK_SIZE", 20)
+    # Chunking needs none of the services __init__ loads
+    return PDFProcessor.__new__(PDFProcessor)
+
+def words(count: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return " ".join(f"w{rng.randrange(50)}" for _ in range(count))
+
+def split_windows(text: str, sizes) -> list:
+    tokens, windows, i = text.split(), [], 0
+    for size in sizes:
+        windows.append(" ".join(tokens[i:i + size]))
+        i += size
+    return windows
+
+@pytest.mark.parametrize("total", [0, 5, 20, 21, 30, 257])
+@pytest.mark.parametrize("seed", range(5))
+def test_streamed_chunks_match_whole_text(processor, total, seed):
+    text = words(total, seed)
+    rng = random.Random(seed)
+    sizes, remaining = [], total
+    while remaining > 0:
+        sizes.append(min(remaining, rng.choice([0, 1, 7, 19, 20, 45])))
+        remaining -= sizes[-1]
+    windows = split_windows(text, sizes) + [""]
+    assert processor.chunk_windows(windows) == processor.chunk_text(text, max_chunks=None)
+
+def test_streamed_chunks_are_not_capped(processor):
+    text = words(400)
+    assert len(processor.chunk_text(text, max_chunks=3)) == 3
+    assert len(processor.chunk_windows(split_windows(text, [100] * 4))) > 3
+
+def test_complete_words_carries_partial_window(processor):
+    tokens = words(45).split()
+    # Windows of 20 words every 10: [0:20], [10:30], [20:40]; [30:45] is not full yet
+    chunks, carry = processor._chunk_complete_words(tokens)
+    assert chunks == [" ".join(tokens[i:i + 20]) for i in (0, 10, 20)]
+    assert carry == tokens[30:]
+
+def test_complete_words_short_input_is_all_carried(processor):
+    tokens = words(19).split()
+    assert processor._chunk_complete_words(tokens) == ([], tokens)
+
+def test_chunk_window_final_flushes_carry(processor):
+    chunks, carry = processor.chunk_window(words(25), [])
+    assert len(chunks) == 1
+    final, rest = processor.chunk_window("", carry, final=True)
+    assert final == processor.chunk_text(" ".join(carry), max_chunks=None)
+    assert final[0] == " ".join(carry)
+    assert rest == []
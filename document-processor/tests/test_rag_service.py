@@ -0,0 +1,25 @@
+from services.rag_service import assign_chunk_ids
+
+def test_ids_depend_on_document_and_text_only():
+    ids = assign_chunk_ids(7, ["alpha", "beta"])
+    assert ids == assign_chunk_ids(7, ["alpha", "beta"])
+    assert all(chunk_id.startswith("7_") for chunk_id in ids)
+    assert ids[0] != ids[1]
+    assert assign_chunk_ids(8, ["alpha"])[0] != ids[0]
+
+def test_unchanged_text_keeps_its_id_when_neighbours_change():
+    before = assign_chunk_ids(7, ["intro", "body", "outro"])
+    after = assign_chunk_ids(7, ["new intro", "body", "outro"])
+    assert before[1:] == after[1:]
+
+def test_repeated_text_is_numbered_by_occurrence():
+    ids = assign_chunk_ids(7, ["same", "other", "same", "same"])
+    assert len(set(ids)) == 4
+    assert [chunk_id.rsplit("_", 1)[1] for chunk_id in ids] == ["0", "0", "1", "2"]
+    assert ids[0].rsplit("_", 1)[0] == ids[2].rsplit("_", 1)[0]
+
+def test_occurrences_shared_across_batches():
+    chunks = ["same", "other", "same", "same", "last"]
+    occurrences = {}
+    batched = assign_chunk_ids(7, chunks[:2], occurrences) + assign_chunk_ids(7, chunks[2:], occurrences)
+    assert batched == assign_chunk_ids(7, chunks)
@@ -0,0 +1,27 @@
+from services.summarizer import sections
+
+def chunk(prefix: str, count: int) -> str:
+    return " ".join(f"{prefix}{i}" for i in range(count))
+
+def test_no_chunks_no_sections():
+    assert sections([], 100) == []
+
+def test_consecutive_chunks_share_a_section():
+    assert sections([chunk("a", 3), chunk("b", 4), chunk("c", 3)], 10) == [
+        " ".join([chunk("a", 3), chunk("b", 4), chunk("c", 3)])
+    ]
+
+def test_section_closes_before_it_overflows():
+    parts = sections([chunk("a", 6), chunk("b", 3), chunk("c", 2), chunk("d", 9)], 10)
+    assert parts == [" ".join([chunk("a", 6), chunk("b", 3)]), " ".join([chunk("c", 2)]), chunk("d", 9)]
+    assert all(len(part.split()) <= 10 for part in parts)
+
+def test_long_chunk_is_cut():
+    assert sections([chunk("a", 25), chunk("b", 2)], 10) == [chunk("a", 10), chunk("b", 2)]
+
+def test_order_and_text_preserved():
+    chunks = [chunk(letter, 4) for letter in "abcdefg"]
+    assert " ".join(sections(chunks, 9)).split() == " ".join(chunks).split()
+
+def test_whitespace_normalised():
+    assert sections(["  one\ntwo\t", "three  "], 10) == ["one two three"]
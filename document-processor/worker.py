@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Ingest worker.
+Claims PDF jobs from the shared Redis job queue under time-limited leases and
+runs them through the ingest pipeline, at most WORKER_CONCURRENCY documents at
+a time. Run as many workers, on as many hosts, as the queue needs.
+
+Usage: python worker.py
+"""
+
+import time
+import asyncio
+import os
+import signal
+import socket
+import logging
+from datetime import datetime
+
+from config import settings
+from services.pdf_processor import PDFProcessor
+from services.ingest_pipeline import IngestPipeline, failure_message
+from services.job_queue import JobQueue
+from services.summarizer import Summarizer, SummaryQueue
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STATS_INTERVAL_SECONDS = 10
+
+class Worker:
+    def __init__(self):
+        self.worker_id = settings.WORKER_ID or f"{socket.gethostname()}-{os.getpid()}"
+        self.queue = JobQueue()
+        self.processor = PDFProcessor()
+        self.db_client = self.processor.db_client
+        self.pipeline = None
+        self.summarizer = Summarizer(self.processor, SummaryQueue())
+        self.running = {}  # pdf_id -> claimed job
+
+    async def run(self):
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        self.pipeline = IngestPipeline(self.processor)
+        self.pipeline.start()
+        concurrency = max(1, settings.WORKER_CONCURRENCY)
+        slots = [asyncio.create_task(self._slot()) for _ in range(concurrency)]
+        housekeeping = [
+            asyncio.create_task(self._reclaim_expired()),
+            asyncio.create_task(self._publish_stats()),
+            # Deferred document summaries, one at a time in the background LLM lane
+            asyncio.create_task(self.summarizer.run())
+        ]
+        logger.info(f"Worker {self.worker_id} started with concurrency {concurrency}")
+
+        await stop.wait()
+        logger.info(f"Worker {self.worker_id} shutting down...")
+        for task in slots + housekeeping:
+            task.cancel()
+        await asyncio.gather(*slots, *housekeeping, return_exceptions=True)
+
+        # Hand unfinished jobs straight back instead of waiting for their leases to expire
+        for job in list(self.running.values()):
+            try:
+                await self.queue.release(job, self.worker_id)
+            except Exception as e:
+                logger.warning(f"Could not release PDF {job['pdf_id']}: {e}")
+        await self.pipeline.shutdown()
+        self.processor.shutdown()
+        await self.queue.close()
+        await self.summarizer.queue.close()
+
+    async def _slot(self):
+        """Claim and run one job at a time until cancelled."""
+        while True:
+            try:
+                job = await self.queue.claim(self.worker_id)
+            except Exception as e:
+                logger.error(f"Error claiming job: {e}")
+                job = None
+            if job is None:
+                await asyncio.sleep(settings.WORKER_POLL_SECONDS)
+                continue
+
+            self.running[job["pdf_id"]] = job
+            try:
+                await self._run_job(job)
+            except asyncio.CancelledError:
+                # Stays in self.running so shutdown can release it
+                raise
+            except Exception as e:
+                logger.error(f"Error settling PDF {job['pdf_id']}: {e}")
+            self.running.pop(job["pdf_id"], None)
+
+    async def _run_job(self, job: dict):
+        pdf_id = job["pdf_id"]
+        logger.info(f"Claimed PDF {pdf_id} ({job['filename']}), attempt {job['attempts']}")
+        ingest_job = None
+
+        def lease_lost():
+            if ingest_job is not None:
+                self.pipeline.abandon(ingest_job, "Lease lost to another worker")
+
+        # Heartbeat from the start: the pipeline intake may be full for a while
+        heartbeat = asyncio.create_task(self._heartbeat(job, lease_lost))
+        try:
+            ingest_job = await self.pipeline.submit(
+                pdf_id, job["filepath"], job["filename"], mode=job.get("mode", "process")
+            )
+            if heartbeat.done():
+                lease_lost()
+            if await ingest_job.done:
+                await self.queue.complete(job, self.worker_id)
+                return
+            if ingest_job.abandoned:
+                return
+            error, retryable = ingest_job.error or "Processing failed", ingest_job.retryable
+        except asyncio.CancelledError:
+            # Released on shutdown, or reclaimed once the lease runs out
+            raise
+        except Exception as e:
+            logger.error(f"Worker error on PDF {pdf_id}: {e}")
+            error, retryable = str(e), True
+        finally:
+            heartbeat.cancel()
+
+        delay = await self.queue.fail(job, self.worker_id, error, retryable)
+        if delay is None:
+            logger.error(f"PDF {pdf_id} did not complete after {job['attempts']} attempts: {error}")
+            return
+        logger.warning(f"PDF {pdf_id} attempt {job['attempts']} failed, retrying in {delay:.0f}s: {error}")
+        message = f"Attempt {job['attempts']} failed, retrying in {delay:.0f}s: {error}"
+        if job.get("mode", "process") == "process":
+            await self.db_client.update_pdf_status(pdf_id, "pending", error_message=message)
+        else:
+            # A re-index or revision leaves the document's status alone while it retries
+            await self.db_client.update_pdf_error(pdf_id, message)
+
+    async def _heartbeat(self, job: dict, lease_lost):
+        """Renew the job's lease until it finishes; call lease_lost() if another worker took it."""
+        interval = settings.JOB_LEASE_SECONDS / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await self.queue.heartbeat(job["pdf_id"], self.worker_id):
+                    logger.warning(f"Lost the lease on PDF {job['pdf_id']}, abandoning it")
+                    lease_lost()
+                    return
+            except Exception as e:
+                # Keep working; the lease survives a missed beat or two
+                logger.warning(f"Heartbeat failed for PDF {job['pdf_id']}: {e}")
+
+    async def _reclaim_expired(self):
+        """Every worker sweeps for expired leases, so a dead worker's jobs come back promptly."""
+        while True:
+            try:
+                reclaimed, dead = await self.queue.reclaim_expired()
+                if reclaimed:
+                    logger.info(f"Reclaimed {reclaimed} jobs with expired leases")
+                for job in dead:
+                    # The worker that held it is gone, so nobody else marks the PDF failed
+                    logger.error(f"PDF {job['pdf_id']} dead-lettered: lease expired on the last attempt")
+                    if job["mode"] != "process":
+                        await self.db_client.update_pdf_error(
+                            job["pdf_id"], failure_message(job["mode"], "lease expired on the last attempt")
+                        )
+                        continue
+                    await self.db_client.update_pdf_failed(
+                        pdf_id=job["pdf_id"],
+                        error_message="Lease expired on the last attempt",
+                        processing_end_time=datetime.utcnow(),
+                        processing_duration=max(0.0, time.time() - job["claimed_at"])
+                    )
+            except Exception as e:
+                logger.warning(f"Could not reclaim expired leases: {e}")
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 2)
+
+    async def _publish_stats(self):
+        while True:
+            try:
+                stats = self.pipeline.stats()
+                stats["running_jobs"] = len(self.running)
+                stats["concurrency"] = settings.WORKER_CONCURRENCY
+                stats["summaries"] = {**self.summarizer.stats(), "queued": await self.summarizer.queue.depth()}
+                await self.queue.publish_stats(self.worker_id, stats, ttl=STATS_INTERVAL_SECONDS * 3)
+            except Exception as e:
+                logger.warning(f"Could not publish worker stats: {e}")
+            await asyncio.sleep(STATS_INTERVAL_SECONDS)
+
+if __name__ == "__main__":
+    asyncio.run(Worker().run())
@@ -99,7 +99,17 @@ const UploadSection = ({ onUploadSuccess, onNotification }) => {
           
           onNotification({
             type: 'success',
-            message: 'PDF uploaded successfully! Processing will begin shortly.'
+            // Known content is linked to the copy already processed, not processed again
+            message: response.duplicate_of
+              ? `PDF uploaded successfully! ${response.message}`
+              : 'PDF uploaded successfully! Processing will begin shortly.'
+          });
+        } else if (xhr.status === 429 || xhr.status === 503) {
+          // Ingest queue is full or unavailable: back off for as long as the server asks
+          const retryAfter = parseInt(xhr.getResponseHeader('Retry-After'), 10) || 30;
+          onNotification({
+            type: 'error',
+            message: `The server is busy processing other documents. Please try again in ${retryAfter} seconds.`
           });
         } else {
           throw new Error(`Upload failed with status: ${xhr.status}`);
@@ -17,17 +17,51 @@ class Settings(BaseSettings):
     # File upload configuration
     UPLOAD_FOLDER: str = "/app/uploads"
     MAX_FILE_SIZE: int = 50 * 1024 * 1024  # 50MB
+    UPLOAD_BLOCK_SIZE: int = 1024 * 1024  # Uploads are streamed to disk, hashed and size-checked in blocks of this size
+    UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024  # Chunk size suggested to clients of resumable uploads
+    UPLOAD_SESSION_TTL_HOURS: float = 24.0  # Resumable uploads without new data for this long are removed
+    BATCH_MAX_FILES: int = 500  # PDFs per batch upload, counting those inside zip archives
+    BATCH_MAX_SIZE: int = 2 * 1024 * 1024 * 1024  # Bytes per batch upload, counting zip entries uncompressed
     
     # Ollama configuration
     OLLAMA_URL: str = "http://ollama:11434"
     OLLAMA_MODEL: str = "mistral:7b"  # Better quality, good balance of speed/accuracy
     
+    # Priority lanes in front of Ollama (interactive > ingest > background)
+    LLM_MAX_CONCURRENCY: int = 2  # Requests sent to Ollama at once; match OLLAMA_NUM_PARALLEL
+    LLM_INTERACTIVE_CONCURRENCY: int = 2  # User chat
+    LLM_INGEST_CONCURRENCY: int = 1  # Document summaries; below the total so chat always has a slot
+    LLM_BACKGROUND_CONCURRENCY: int = 1
+    LLM_PROXY_TIMEOUT_SECONDS: float = 120.0
+    LANE_SIGNAL_TTL_SECONDS: int = 180  # Tells document workers to pause embedding while chat runs
+    
     # PDF Service configuration
     PDF_SERVICE_URL: str = "http://document-processor:8001"
     
     # Redis configuration for queuing
     REDIS_URL: str = "redis://redis:6379"
     
+    # Admission control on uploads (same limits as the document-processor's)
+    ADMISSION_MAX_JOBS: int = 50  # Queued plus running documents; 0 disables the limit
+    ADMISSION_MAX_PAGES: int = 2000  # Pages across those documents; 0 disables the limit
+    ADMISSION_RETRY_AFTER_SECONDS: int = 30  # Floor when the drain time cannot be estimated
+    ADMISSION_MAX_RETRY_AFTER_SECONDS: int = 600
+    
+    # Shortest-expected-job-first ingest scheduling
+    SCHEDULER_AGING_RATE: float = 1.0  # Seconds of predicted run time forgiven per second waited
+    SCHEDULER_DEFAULT_SECONDS_PER_PAGE: float = 2.0  # Prediction until there is enough history
+    COST_MODEL_HISTORY: int = 500  # Most recent completed PDFs the model is fitted on
+    COST_MODEL_MIN_SAMPLES: int = 5  # Per extraction method, else the pooled fit is used
+    COST_MODEL_MIN_SECONDS: float = 1.0
+    COST_MODEL_REFIT_SECONDS: int = 600
+    REINDEX_SECONDS_PER_PAGE: float = 0.05  # Predicted cost of re-chunking/embedding stored page text
+    
+    # Reprocess and re-index jobs (POST /api/admin/reprocess, /api/admin/reindex): queued at a capped rate, checkpointed in Redis
+    REPROCESS_RATE_PER_MINUTE: float = 60.0  # Documents queued per minute; 0 means no cap
+    REPROCESS_PAGE_SIZE: int = 100  # Candidates read and queued per step at most
+    REPROCESS_POLL_SECONDS: float = 5.0
+    REPROCESS_LEASE_SECONDS: float = 30.0  # Another main-api process takes over a job whose dispatcher stopped
+    
     # ChromaDB configuration
     CHROMA_PERSIST_DIRECTORY: str = "/app/chroma_db"
     
@@ -1,6 +1,6 @@
-from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse
 import uvicorn
 import os
 from contextlib import asynccontextmanager
@@ -8,8 +8,12 @@ from contextlib import asynccontextmanager
 from database import engine, get_db
 from models import Base
 from routers import pdf_router, llm_router, analytics_router, admin_router, internal_router
+from services.reprocess_jobs import reprocess_jobs
 from config import settings
 
+# Room for the multipart boundaries and headers around an uploaded file
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
@@ -18,10 +22,13 @@ async def lifespan(app: FastAPI):
     # Create upload directory
     os.makedirs(settings.UPLOAD_FOLDER, exist_ok=True)
     
+    # Continue a reprocess job interrupted by a restart
+    reprocess_jobs.start()
+    
     yield
     
     # Shutdown
-    pass
+    await reprocess_jobs.stop()
 
 app = FastAPI(
     title="RAGnarok API",
@@ -43,6 +50,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Refuse an upload whose declared length is over the limit before any of its body is read.
+    
+    Uploads without a Content-Length are cut off by the routes once they cross MAX_FILE_SIZE.
+    """
+    length = request.headers.get("content-length", "")
+    limit = settings.BATCH_MAX_SIZE if request.url.path == "/api/pdfs/batch" else settings.MAX_FILE_SIZE
+    if (
+        request.url.path.startswith("/api/pdfs")
+        and length.isdigit()
+        and int(length) > limit + UPLOAD_FORM_OVERHEAD
+    ):
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Upload too large. Maximum size is {limit // (1024*1024)}MB"}
+        )
+    return await call_next(request)
+
 # Include routers
 app.include_router(pdf_router.router, prefix="/api", tags=["documents"])
 app.include_router(llm_router.router, prefix="/api", tags=["llm"])
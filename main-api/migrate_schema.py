@@ -31,6 +31,35 @@ def migrate_database():
                 conn.execute(text("ALTER TABLE llm_interactions ADD COLUMN response TEXT"))
                 conn.commit()
             
+            # Check if pdfs table has per-page extraction details
+            pdf_columns = [col['name'] for col in inspector.get_columns('pdfs')]
+            
+            if 'page_methods' not in pdf_columns:
+                logger.info("Adding 'page_methods' column to pdfs table...")
+                conn.execute(text("ALTER TABLE pdfs ADD COLUMN page_methods TEXT"))
+                conn.commit()
+            
+            if 'page_ocr_stats' not in pdf_columns:
+                logger.info("Adding 'page_ocr_stats' column to pdfs table...")
+                conn.execute(text("ALTER TABLE pdfs ADD COLUMN page_ocr_stats TEXT"))
+                conn.commit()
+            
+            if 'predicted_duration' not in pdf_columns:
+                logger.info("Adding 'predicted_duration' column to pdfs table...")
+                conn.execute(text("ALTER TABLE pdfs ADD COLUMN predicted_duration FLOAT"))
+                conn.commit()
+            
+            if 'content_hash' not in pdf_columns:
+                logger.info("Adding 'content_hash' column to pdfs table...")
+                conn.execute(text("ALTER TABLE pdfs ADD COLUMN content_hash VARCHAR(64)"))
+                conn.execute(text("CREATE INDEX IF NOT EXISTS ix_pdfs_content_hash ON pdfs (content_hash)"))
+                conn.commit()
+            
+            if 'source_pdf_id' not in pdf_columns:
+                logger.info("Adding 'source_pdf_id' column to pdfs table...")
+                conn.execute(text("ALTER TABLE pdfs ADD COLUMN source_pdf_id INTEGER"))
+                conn.commit()
+            
             logger.info("✅ Database schema migration completed!")
             
     except Exception as e:
@@ -9,17 +9,22 @@ class PDF(Base):
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(256), nullable=False)
     filepath = Column(String(512), nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the file; names its stored copy
+    source_pdf_id = Column(Integer, nullable=True)  # PDF whose chunks this duplicate upload reuses
     upload_time = Column(DateTime, default=func.now())
     processed = Column(Boolean, default=False)
     chunk_count = Column(Integer, default=0)
     processing_status = Column(String(50), default='pending')  # pending, processing, completed, failed
     processing_error = Column(Text, nullable=True)
     extraction_method = Column(String(50), nullable=True)  # text, ocr, mixed
+    page_methods = Column(Text, nullable=True)  # JSON array of per-page methods; {method: pages} for streamed documents
+    page_ocr_stats = Column(Text, nullable=True)  # JSON array of per-page {dpi, confidence} or null; OCR totals for streamed documents
     
     # Analytics fields for PDF processing
     processing_start_time = Column(DateTime, nullable=True)
     processing_end_time = Column(DateTime, nullable=True)
     processing_duration = Column(Float, nullable=True)  # in seconds
+    predicted_duration = Column(Float, nullable=True)  # cost model estimate when queued, in seconds
     file_size = Column(Integer, nullable=True)  # in bytes
     page_count = Column(Integer, nullable=True)
     text_length = Column(Integer, nullable=True)  # total characters extracted
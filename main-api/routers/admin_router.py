@@ -6,11 +6,15 @@ import logging
 import redis
 import json
 from datetime import datetime
+from typing import Optional
 
 from database import get_db
 from models import PDF, LLMInteraction, SystemMetrics, UserAnalytics
-from schemas import SystemStatus
+from schemas import SystemStatus, ReprocessJobCreate
 from services.rag_service import rag_service
+from services.cost_model import cost_model
+from services.lane_scheduler import lane_scheduler
+from services.reprocess_jobs import reprocess_jobs, ReprocessJobExists
 from config import settings
 
 router = APIRouter()
@@ -275,60 +279,87 @@ async def admin_flush(data_type: str, db: Session = Depends(get_db)):
         logger.error(f"Flush failed: {e}")
         raise HTTPException(status_code=500, detail=f"Flush failed: {str(e)}")
 
-@router.post("/admin/reprocess", response_model=dict)
-async def admin_reprocess(db: Session = Depends(get_db)):
-    """Reprocess all unprocessed PDFs by notifying the PDF service."""
+async def start_reprocess_job(db: Session, request: Optional[ReprocessJobCreate], mode: str) -> dict:
+    rate = request.rate_per_minute if request is not None else None
+    if rate is not None and rate < 0:
+        raise HTTPException(status_code=400, detail="rate_per_minute cannot be negative")
     try:
-        unprocessed_pdfs = db.query(PDF).filter(PDF.processed == False).all()
-        
-        if not unprocessed_pdfs:
-            return {
-                "status": "completed",
-                "message": "No unprocessed PDFs found",
-                "total_unprocessed": 0
-            }
-        
-        # Notify PDF service to reprocess all unprocessed PDFs
-        reprocess_requests = []
-        for pdf in unprocessed_pdfs:
-            reprocess_requests.append({
-                "pdf_id": pdf.id,
-                "filename": pdf.filename,
-                "filepath": pdf.filepath
-            })
-        
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{settings.PDF_SERVICE_URL}/admin/reprocess",
-                    json={"pdfs": reprocess_requests},
-                    timeout=60.0
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    return {
-                        "status": "initiated",
-                        "message": f"Reprocessing initiated for {len(unprocessed_pdfs)} PDFs",
-                        "total_unprocessed": len(unprocessed_pdfs),
-                        "pdf_service_response": result
-                    }
-                else:
-                    raise HTTPException(
-                        status_code=500, 
-                        detail=f"PDF service returned status {response.status_code}"
-                    )
-                    
-        except httpx.RequestError as e:
-            logger.error(f"Failed to communicate with PDF service: {e}")
-            raise HTTPException(
-                status_code=503, 
-                detail="PDF processing service is not available"
-            )
-        
-    except Exception as e:
-        logger.error(f"Reprocessing failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Reprocessing failed: {str(e)}")
+        return await reprocess_jobs.create(db, rate, mode)
+    except ReprocessJobExists as e:
+        raise HTTPException(status_code=409, detail=f"Reprocess job {e.job_id} is still active")
+    except redis.RedisError as e:
+        logger.error(f"Failed to create reprocess job: {e}")
+        raise HTTPException(status_code=503, detail="Ingest queue is not available")
+
+@router.post("/admin/reprocess", response_model=dict)
+async def admin_reprocess(request: Optional[ReprocessJobCreate] = None, db: Session = Depends(get_db)):
+    """Start a job that queues all unprocessed PDFs at a capped rate.
+    
+    Follow it at /admin/reprocess/jobs/{job_id}; only one job runs at a time.
+    """
+    job = await start_reprocess_job(db, request, "process")
+    return {
+        "status": "initiated",
+        "message": f"Reprocessing {job['total']} unprocessed PDFs",
+        "total_unprocessed": job["total"],
+        "job": reprocess_jobs.progress(db, job)
+    }
+
+@router.get("/admin/reprocess/jobs", response_model=dict)
+async def list_reprocess_jobs(db: Session = Depends(get_db)):
+    jobs = await reprocess_jobs.list_jobs()
+    return {"jobs": [reprocess_jobs.progress(db, job) for job in jobs]}
+
+@router.get("/admin/reprocess/jobs/{job_id}", response_model=dict)
+async def get_reprocess_job(job_id: str, db: Session = Depends(get_db)):
+    job = await reprocess_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Reprocess job not found")
+    return reprocess_jobs.progress(db, job)
+
+@router.post("/admin/reprocess/jobs/{job_id}/{action}", response_model=dict)
+async def control_reprocess_job(
+    job_id: str, action: str, rate_per_minute: Optional[float] = None, db: Session = Depends(get_db)
+):
+    """Pause, resume or cancel a reprocess job; resume also takes a new rate_per_minute.
+    
+    PDFs already queued are not taken back. A resumed job continues after the last PDF it queued.
+    """
+    if action not in ("pause", "resume", "cancel"):
+        raise HTTPException(status_code=400, detail="Action must be pause, resume or cancel")
+    if rate_per_minute is not None and (action != "resume" or rate_per_minute < 0):
+        raise HTTPException(status_code=400, detail="rate_per_minute must be non-negative and given on resume")
+    if action == "pause":
+        job = await reprocess_jobs.pause(job_id)
+    elif action == "resume":
+        job = await reprocess_jobs.resume(job_id, rate_per_minute)
+    else:
+        job = await reprocess_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Reprocess job not found")
+    
+    expected = {"pause": "paused", "resume": "running", "cancel": "cancelled"}[action]
+    if job["status"] != expected:
+        raise HTTPException(status_code=409, detail=f"Reprocess job is {job['status']}")
+    return reprocess_jobs.progress(db, job)
+
+@router.post("/admin/reindex", response_model=dict)
+async def admin_reindex(request: Optional[ReprocessJobCreate] = None, db: Session = Depends(get_db)):
+    """Start a job that rebuilds chunks and vectors of all processed PDFs from their stored page text.
+    
+    Run after changing the chunking settings or the embedding model. PDFs stay
+    searchable while their chunks are replaced; those without stored page text
+    are extracted again. This is a reprocess job in "reindex" mode, so it is
+    rate-capped, holds back while the ingest queue is full, and is followed,
+    paused and resumed under /admin/reprocess/jobs/{job_id}.
+    """
+    job = await start_reprocess_job(db, request, "reindex")
+    return {
+        "status": "initiated",
+        "message": f"Re-indexing {job['total']} processed PDFs",
+        "total_processed": job["total"],
+        "job": reprocess_jobs.progress(db, job)
+    }
 
 @router.get("/admin/status")
 async def admin_status(db: Session = Depends(get_db)):
@@ -339,6 +370,7 @@ async def admin_status(db: Session = Depends(get_db)):
         processed_pdfs = db.query(PDF).filter(PDF.processed == True).count()
         pending_pdfs = db.query(PDF).filter(PDF.processing_status == 'pending').count()
         failed_pdfs = db.query(PDF).filter(PDF.processing_status == 'failed').count()
+        duplicate_pdfs = db.query(PDF).filter(PDF.source_pdf_id.isnot(None)).count()
         
         # PDF Service status
         pdf_service_status = "unknown"
@@ -369,15 +401,20 @@ async def admin_status(db: Session = Depends(get_db)):
                 "total_pdfs": total_pdfs,
                 "processed_pdfs": processed_pdfs,
                 "pending_pdfs": pending_pdfs,
-                "failed_pdfs": failed_pdfs
+                "failed_pdfs": failed_pdfs,
+                "duplicate_pdfs": duplicate_pdfs
             },
             "services": {
                 "pdf_service": pdf_service_status,
                 "ollama": ollama_status
             },
             "vector_db": {
-                "total_chunks": sum(pdf.chunk_count or 0 for pdf in db.query(PDF).all())
-            }
+                "total_chunks": sum(
+                    pdf.chunk_count or 0 for pdf in db.query(PDF).filter(PDF.source_pdf_id.is_(None)).all()
+                )
+            },
+            "ingest_cost_model": cost_model.describe(),
+            "llm_lanes": lane_scheduler.stats()
         }
         
     except Exception as e:
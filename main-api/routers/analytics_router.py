@@ -30,7 +30,8 @@ async def get_analytics_overview(db: Session = Depends(get_db)):
         
         # Total chunks (handle potential missing column gracefully)
         try:
-            total_chunks = db.query(func.sum(PDF.chunk_count)).scalar() or 0
+            # Duplicate uploads share their source's chunks
+            total_chunks = db.query(func.sum(PDF.chunk_count)).filter(PDF.source_pdf_id.is_(None)).scalar() or 0
         except Exception:
             total_chunks = 0
         
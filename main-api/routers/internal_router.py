@@ -1,12 +1,19 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import Optional
+import httpx
+import logging
 
 from database import get_db
 from models import PDF
+from services.lane_scheduler import lane_scheduler
+from shared.content import LINKED_FIELDS
+from config import settings
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 @router.patch("/internal/pdfs/{pdf_id}/status")
 async def update_pdf_status(
@@ -28,7 +35,42 @@ async def update_pdf_status(
             else:
                 setattr(pdf, field, value)
     
+    # Duplicate uploads linked to this PDF follow its processing results
+    linked = {field: value for field, value in update_data.items() if field in LINKED_FIELDS}
+    if linked:
+        db.query(PDF).filter(PDF.source_pdf_id == pdf_id).update(linked, synchronize_session=False)
+    
     db.commit()
     db.refresh(pdf)
     
     return {"status": "success", "pdf_id": pdf_id}
+
+@router.post("/internal/ollama/generate")
+async def ollama_generate(payload: dict, lane: str = "background"):
+    """Ollama /api/generate for other services, scheduled in a priority lane.
+    
+    Document processing sends its summaries here, in its SUMMARY_LANE
+    ("background" by default, behind user chat and any ingest-lane work), so
+    they never compete with chat. Responses are not streamed; the model
+    defaults to OLLAMA_MODEL.
+    """
+    if lane == "interactive":
+        raise HTTPException(status_code=400, detail="The interactive lane is reserved for user chat")
+    
+    payload = {**payload, "stream": False}
+    payload.setdefault("model", settings.OLLAMA_MODEL)
+    try:
+        async with lane_scheduler.slot(lane):
+            async with httpx.AsyncClient(timeout=settings.LLM_PROXY_TIMEOUT_SECONDS) as client:
+                response = await client.post(f"{settings.OLLAMA_URL}/api/generate", json=payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except httpx.HTTPError as e:
+        logger.error(f"Ollama request in lane {lane} failed: {e}")
+        raise HTTPException(status_code=502, detail=f"Ollama request failed: {e}")
+    
+    try:
+        content = response.json()
+    except ValueError:
+        content = {"error": response.text}
+    return JSONResponse(status_code=response.status_code, content=content)
@@ -10,6 +10,7 @@ from database import get_db
 from schemas import LLMRequest, LLMResponse
 from models import LLMInteraction
 from services.rag_service import rag_service
+from services.lane_scheduler import lane_scheduler
 from config import settings
 
 router = APIRouter()
@@ -66,7 +67,8 @@ async def llm_interact(
             try:
                 logger.debug(f"Establishing connection to Ollama")
                 
-                async with httpx.AsyncClient(timeout=180.0) as client:
+                # Chat runs in the interactive lane, ahead of any queued ingest work
+                async with lane_scheduler.slot("interactive"), httpx.AsyncClient(timeout=180.0) as client:
                     async with client.stream('POST', ollama_url, json=payload) as response:
                         logger.info(f"📡 Ollama response status: {response.status_code}")
                         if response.status_code != 200:
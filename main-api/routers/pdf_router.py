@@ -1,14 +1,26 @@
-from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, Query, Request
+from starlette.requests import ClientDisconnect
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 import os
 import httpx
-from typing import List
+import asyncio
+import zipfile
+import contextlib
+from typing import Dict, List, Optional, Tuple
 import logging
 
 from database import get_db
 from models import PDF
-from schemas import PDFResponse, PDFListResponse, SystemStatus
+from schemas import PDFResponse, PDFListResponse, SystemStatus, UploadSessionCreate
+from services.ingest_queue import ingest_queue
+from services.cost_model import cost_model
+from services.content_store import (
+    UploadTooLarge, InvalidForm, ReceivedUpload, receive_file, receive_form_file, store_upload, content_path,
+    find_source, find_sources, link_to_source, discard_unused, release_content
+)
+from services import upload_sessions
+from services.upload_sessions import OffsetMismatch, SessionBusy, SessionGone
 from config import settings
 
 router = APIRouter()
@@ -17,87 +29,425 @@ logger = logging.getLogger(__name__)
 def allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() == "pdf"
 
-async def notify_pdf_service(pdf_id: int, filename: str, filepath: str):
-    """Notify the PDF processing service about a new file."""
+async def queue_for_processing(
+    pdf_id: int, filename: str, filepath: str, pages: int = 1, predicted: float = None
+):
+    """Put a new file on the shared ingest queue for any document worker to claim."""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{settings.PDF_SERVICE_URL}/process",
-                json={
-                    "pdf_id": pdf_id,
-                    "filename": filename,
-                    "filepath": filepath
-                },
-                timeout=30.0
-            )
-            if response.status_code != 200:
-                logger.error(f"PDF service returned status {response.status_code}")
+        await ingest_queue.enqueue(pdf_id, filepath, filename, pages, predicted)
     except Exception as e:
-        logger.error(f"Failed to notify PDF service: {e}")
+        logger.error(f"Failed to queue PDF {pdf_id} for processing: {e}")
 
-@router.post("/pdfs/upload", response_model=dict)
-async def upload_pdf(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db)
-):
-    """Upload a PDF document for processing."""
-    
-    if not file.filename:
+async def admit_upload(pages: int):
+    """Turn an upload away before it is stored when the ingest queue is full."""
+    try:
+        load = await ingest_queue.load(pages)
+    except Exception as e:
+        logger.error(f"Ingest queue unavailable: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Document processing is unavailable. Please try again shortly.",
+            headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)}
+        )
+    if not load["accepting"]:
+        raise HTTPException(
+            status_code=429,
+            detail=f"{load['reason']}. Please retry in {load['retry_after']} seconds.",
+            headers={"Retry-After": str(load["retry_after"])}
+        )
+
+# Single-file upload endpoints read their multipart body themselves (see
+# receive_pdf); this documents the form they expect in /docs
+PDF_UPLOAD_FORM = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"]
+        }}}
+    }
+}
+
+def check_pdf_filename(filename: str):
+    if not filename:
         raise HTTPException(status_code=400, detail="No file selected")
-    
-    if not allowed_file(file.filename):
+    if not allowed_file(filename):
         raise HTTPException(status_code=400, detail="Invalid file type. Only PDF files are allowed.")
+
+async def receive_pdf(request: Request) -> Tuple[str, ReceivedUpload]:
+    """Stream the request's "file" form field to disk as it arrives; returns (filename, upload).
     
-    # Check file size
-    content = await file.read()
-    if len(content) > settings.MAX_FILE_SIZE:
+    The file is rejected by name before any of it is written, and as soon as
+    it crosses MAX_FILE_SIZE.
+    """
+    try:
+        return await receive_form_file(request, "file", check_pdf_filename)
+    except UploadTooLarge:
         raise HTTPException(
             status_code=400, 
             detail=f"File too large. Maximum size is {settings.MAX_FILE_SIZE // (1024*1024)}MB"
         )
+    except InvalidForm as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ClientDisconnect:
+        raise HTTPException(status_code=400, detail="Client disconnected")
+
+@router.get("/load", response_model=dict)
+async def get_load():
+    """Ingest load against the upload limits; clients back off while accepting is false."""
+    try:
+        return await ingest_queue.load()
+    except Exception as e:
+        logger.error(f"Ingest queue unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Ingest queue is not available")
+
+@router.post("/pdfs/upload", response_model=dict, openapi_extra=PDF_UPLOAD_FORM)
+async def upload_pdf(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Upload a PDF document for processing."""
     
+    # Stream to a temporary file, checking type and size and hashing on the way
+    filename, upload = await receive_pdf(request)
     try:
-        # Ensure upload directory exists
-        os.makedirs(settings.UPLOAD_FOLDER, exist_ok=True)
+        return await register_upload(db, filename, upload)
+    finally:
+        upload.discard()
+
+async def register_upload(db: Session, filename: str, upload: ReceivedUpload) -> dict:
+    """Store a received upload and create its PDF record, queueing it unless its content is known.
+    
+    The upload's temporary file is left in place if it is turned away.
+    """
+    digest, pages = upload.digest, upload.pages
+    
+    # Content already processed (or on its way) is linked to, not queued again
+    source = find_source(db, digest)
+    if source is None:
+        await admit_upload(pages)
+    
+    filepath = content_path(digest)
+    stored_before = os.path.exists(filepath)
+    try:
+        # Save file under its content hash
+        store_upload(upload)
+        
+        if source is not None:
+            pdf = PDF(
+                filename=filename,
+                filepath=filepath,
+                content_hash=digest,
+                file_size=upload.size
+            )
+            link_to_source(pdf, source)
+            db.add(pdf)
+            db.commit()
+            db.refresh(pdf)
+            
+            return {
+                "status": "success",
+                "filename": filename,
+                "pdf_id": pdf.id,
+                "processing_status": pdf.processing_status,
+                "duplicate_of": source.id,
+                "message": f"Same content as {source.filename}; its processed chunks are reused."
+            }
         
-        # Save file
-        filepath = os.path.join(settings.UPLOAD_FOLDER, file.filename)
-        with open(filepath, "wb") as f:
-            f.write(content)
+        # Predict the processing time; the queue runs the shortest jobs first
+        cost_model.refresh(db)
+        predicted, _ = cost_model.predict(pages, upload.size)
         
         # Create PDF record
         pdf = PDF(
-            filename=file.filename,
+            filename=filename,
             filepath=filepath,
+            content_hash=digest,
             processing_status='pending',
-            file_size=len(content)
+            file_size=upload.size,
+            predicted_duration=predicted
         )
         db.add(pdf)
         db.commit()
         db.refresh(pdf)
         
-        # Notify PDF service for processing
-        background_tasks.add_task(notify_pdf_service, pdf.id, file.filename, filepath)
+        # Queue for the document workers
+        await queue_for_processing(pdf.id, filename, filepath, pages, predicted)
         
         return {
             "status": "success",
-            "filename": file.filename,
+            "filename": filename,
             "pdf_id": pdf.id,
             "processing_status": "pending",
+            "predicted_duration": round(predicted, 1),
             "message": "File uploaded successfully. Processing started in background."
         }
         
     except Exception as e:
-        # Clean up file if database operation fails
-        if os.path.exists(filepath):
-            try:
-                os.remove(filepath)
-            except:
-                pass
+        db.rollback()
+        # Clean up the file if storing the record failed, unless it was already stored
+        if not stored_before:
+            discard_unused(db, filepath)
         logger.error(f"Upload failed: {e}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+def receive_batch(files: List[UploadFile]) -> List[Tuple[str, Optional[ReceivedUpload], Optional[str]]]:
+    """Stream each PDF of a batch, unpacking zip archives, to its own temporary file.
+    
+    Returns (filename, upload, error) per PDF; blocking, so run it off the event loop.
+    """
+    entries = []
+    total_size = 0
+    
+    def receive(name: str, open_source):
+        nonlocal total_size
+        if len(entries) >= settings.BATCH_MAX_FILES:
+            entries.append((name, None, f"Batch limit of {settings.BATCH_MAX_FILES} files reached"))
+            return
+        if total_size >= settings.BATCH_MAX_SIZE:
+            entries.append((name, None, f"Batch limit of {settings.BATCH_MAX_SIZE // (1024*1024)}MB reached"))
+            return
+        try:
+            with open_source() as source:
+                upload = receive_file(source)
+        except UploadTooLarge:
+            entries.append((name, None, f"File too large. Maximum size is {settings.MAX_FILE_SIZE // (1024*1024)}MB"))
+            return
+        except (zipfile.BadZipFile, RuntimeError, NotImplementedError) as e:
+            # Corrupt, encrypted or unsupported zip entry
+            entries.append((name, None, f"Could not read from archive: {e}"))
+            return
+        total_size += upload.size
+        entries.append((name, upload, None))
+    
+    for file in files:
+        name = file.filename or ""
+        if name.lower().endswith(".zip"):
+            try:
+                archive = zipfile.ZipFile(file.file)
+            except zipfile.BadZipFile:
+                entries.append((name, None, "Not a valid zip archive"))
+                continue
+            with archive:
+                for info in archive.infolist():
+                    entry_name = os.path.basename(info.filename)
+                    if info.is_dir() or not allowed_file(entry_name):
+                        continue
+                    receive(entry_name, lambda info=info: archive.open(info))
+        elif allowed_file(name):
+            # The request keeps its own file open; only the copy is closed here
+            receive(name, lambda file=file: contextlib.nullcontext(file.file))
+        else:
+            entries.append((name, None, "Invalid file type. Only PDF files and zip archives of them are allowed."))
+    return entries
+
+@router.post("/pdfs/batch", response_model=dict)
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db)
+):
+    """Upload many PDFs, or zip archives of them, in one request.
+    
+    Every PDF is streamed to disk and deduplicated like a single upload, but
+    the new rows are inserted together, committed once and queued in one
+    Redis round trip. Admission is decided for the batch as a whole; each
+    file's outcome is listed under "files".
+    """
+    entries = await asyncio.to_thread(receive_batch, files)
+    results = [
+        {"filename": name, "status": "rejected", "error": error} if upload is None else {"filename": name}
+        for name, upload, error in entries
+    ]
+    received = [(index, name, upload) for index, (name, upload, _) in enumerate(entries) if upload is not None]
+    if not received:
+        return {"status": "success", "received": 0, "queued": 0, "duplicates": 0, "rejected": len(results), "files": results}
+    
+    stored: List[str] = []
+    try:
+        # Content already known, or repeated within the batch, is linked to, not queued again
+        sources = find_sources(db, {upload.digest for _, _, upload in received})
+        new: Dict[str, Tuple[int, str, ReceivedUpload]] = {}
+        for index, name, upload in received:
+            if upload.digest not in sources and upload.digest not in new:
+                new[upload.digest] = (index, name, upload)
+        if new:
+            await admit_upload(sum(upload.pages for _, _, upload in new.values()))
+        
+        try:
+            for _, _, upload in received:
+                filepath = content_path(upload.digest)
+                if not os.path.exists(filepath):
+                    stored.append(filepath)
+                store_upload(upload)
+            
+            cost_model.refresh(db)
+            owners: Dict[str, PDF] = {}
+            for digest, (index, name, upload) in new.items():
+                predicted, _ = cost_model.predict(upload.pages, upload.size)
+                owners[digest] = PDF(
+                    filename=name,
+                    filepath=content_path(digest),
+                    content_hash=digest,
+                    processing_status='pending',
+                    file_size=upload.size,
+                    predicted_duration=predicted
+                )
+            # Inserted in one multi-row statement, so duplicates can link to the new ids
+            db.add_all(owners.values())
+            db.flush()
+            
+            rows: Dict[int, PDF] = {new[digest][0]: pdf for digest, pdf in owners.items()}
+            for index, name, upload in received:
+                if index in rows:
+                    continue
+                pdf = PDF(
+                    filename=name,
+                    filepath=content_path(upload.digest),
+                    content_hash=upload.digest,
+                    file_size=upload.size
+                )
+                link_to_source(pdf, sources.get(upload.digest) or owners[upload.digest])
+                rows[index] = pdf
+            db.add_all(pdf for pdf in rows.values() if pdf.id is None)
+            db.flush()
+            
+            # Read back before committing expires the rows
+            jobs = [
+                {
+                    "pdf_id": pdf.id,
+                    "filename": pdf.filename,
+                    "filepath": pdf.filepath,
+                    "pages": new[digest][2].pages,
+                    "predicted": pdf.predicted_duration
+                }
+                for digest, pdf in owners.items()
+            ]
+            for index, pdf in rows.items():
+                result = results[index]
+                result["pdf_id"] = pdf.id
+                if pdf.source_pdf_id is not None:
+                    result["status"] = "duplicate"
+                    result["duplicate_of"] = pdf.source_pdf_id
+                else:
+                    result["status"] = "queued"
+                    result["predicted_duration"] = round(pdf.predicted_duration, 1)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            # Files this batch stored and no PDF record refers to
+            for filepath in stored:
+                discard_unused(db, filepath)
+            logger.error(f"Batch upload failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Batch upload failed: {str(e)}")
+    finally:
+        for _, _, upload in received:
+            upload.discard()
+    
+    # One round trip to the ingest queue for the whole batch
+    try:
+        queued = await ingest_queue.enqueue_many(jobs) if jobs else 0
+    except Exception as e:
+        logger.error(f"Failed to queue batch of {len(jobs)} PDFs for processing: {e}")
+        queued = 0
+    
+    return {
+        "status": "success",
+        "received": len(received),
+        "queued": queued,
+        "duplicates": sum(1 for result in results if result["status"] == "duplicate"),
+        "rejected": len(results) - len(received),
+        "files": results
+    }
+
+# Resumable uploads: create a session, PUT the file in chunks at increasing
+# offsets (asking for the offset after a dropped connection), then complete it
+
+def get_upload_session(upload_id: str) -> upload_sessions.UploadSession:
+    session = upload_sessions.get_session(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload session not found or expired")
+    return session
+
+@router.post("/pdfs/uploads", response_model=dict)
+async def create_upload_session(request: UploadSessionCreate):
+    """Start a resumable upload of `size` bytes."""
+    if not allowed_file(request.filename):
+        raise HTTPException(status_code=400, detail="Invalid file type. Only PDF files are allowed.")
+    if request.size <= 0:
+        raise HTTPException(status_code=400, detail="File is empty")
+    if request.size > settings.MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"File too large. Maximum size is {settings.MAX_FILE_SIZE // (1024*1024)}MB"
+        )
+    return upload_sessions.create_session(request.filename, request.size).to_dict()
+
+@router.get("/pdfs/uploads/{upload_id}", response_model=dict)
+async def get_upload_session_status(upload_id: str):
+    """Where a resumable upload stands; resume by sending the bytes from `offset` on."""
+    return get_upload_session(upload_id).to_dict()
+
+@router.put("/pdfs/uploads/{upload_id}", response_model=dict)
+async def upload_chunk(upload_id: str, request: Request, offset: int = Query(...)):
+    """Append the request body at `offset`, writing it to disk as it arrives."""
+    session = get_upload_session(upload_id)
+    try:
+        new_offset = await upload_sessions.write_chunk(session, offset, request.stream())
+    except OffsetMismatch as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload is at offset {e.offset}, not {offset}",
+            headers={"Upload-Offset": str(e.offset)}
+        )
+    except SessionBusy:
+        raise HTTPException(status_code=409, detail="Another chunk of this upload is being written, or it is being completed")
+    except SessionGone:
+        raise HTTPException(status_code=404, detail="Upload session not found or expired")
+    except UploadTooLarge:
+        raise HTTPException(status_code=400, detail=f"Chunk runs past the declared size of {session.size} bytes")
+    except ClientDisconnect:
+        logger.info(f"Upload {upload_id} interrupted at offset {session.offset}")
+        raise HTTPException(status_code=400, detail="Client disconnected")
+    return {"upload_id": upload_id, "offset": new_offset, "size": session.size}
+
+@router.post("/pdfs/uploads/{upload_id}/complete", response_model=dict)
+async def complete_upload_session(upload_id: str, db: Session = Depends(get_db)):
+    """Finish a resumable upload and hand it on like a regular upload.
+    
+    When the upload is turned away (429/503) the session is kept, so completing
+    can simply be retried.
+    """
+    session = get_upload_session(upload_id)
+    try:
+        # Held until the session is gone, so a concurrent complete (or chunk) is turned away
+        async with upload_sessions.lock_session(session):
+            if session.offset != session.size:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Upload is incomplete: {session.offset} of {session.size} bytes received",
+                    headers={"Upload-Offset": str(session.offset)}
+                )
+            upload = await upload_sessions.receive_session(session)
+            try:
+                response = await register_upload(db, session.filename, upload)
+            except Exception as e:
+                # Anything but a temporary refusal may have moved or removed the data file
+                if not (isinstance(e, HTTPException) and e.status_code in (429, 503)):
+                    upload_sessions.discard_session(session)
+                raise
+            upload_sessions.discard_session(session)
+            return response
+    except SessionBusy:
+        raise HTTPException(status_code=409, detail="This upload is being written or completed by another request")
+    except SessionGone:
+        raise HTTPException(status_code=404, detail="Upload session not found or expired")
+
+@router.delete("/pdfs/uploads/{upload_id}")
+async def cancel_upload_session(upload_id: str):
+    upload_sessions.discard_session(get_upload_session(upload_id))
+    return {"status": "success", "message": "Upload cancelled"}
+
 @router.get("/pdfs", response_model=PDFListResponse)
 async def list_pdfs(
     page: int = 1,
@@ -141,12 +491,152 @@ async def list_pdfs(
 
 @router.get("/pdfs/{pdf_id}/status", response_model=PDFResponse)
 async def get_pdf_status(pdf_id: int, db: Session = Depends(get_db)):
-    """Get processing status for a specific PDF."""
+    """Get processing status for a specific PDF, with an ETA while it is queued or running."""
+    pdf = db.query(PDF).filter(PDF.id == pdf_id).first()
+    if not pdf:
+        raise HTTPException(status_code=404, detail="PDF not found")
+    
+    response = PDFResponse.from_orm(pdf)
+    if pdf.processing_status in ("pending", "processing"):
+        try:
+            response.eta_seconds = await ingest_queue.eta(pdf_id)
+        except Exception as e:
+            logger.warning(f"Could not estimate ETA for PDF {pdf_id}: {e}")
+    return response
+
+@router.post("/pdfs/{pdf_id}/revision", response_model=dict, openapi_extra=PDF_UPLOAD_FORM)
+async def revise_pdf(
+    pdf_id: int,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Replace a PDF with a revised version, keeping its id and its unchanged chunks.
+    
+    Chunk ids are derived from chunk content, so the document workers embed
+    only the chunks that changed and drop the ones that disappeared. The PDF
+    keeps its status and chunks until the revision has been processed; a
+    failed revision only records its error.
+    """
     pdf = db.query(PDF).filter(PDF.id == pdf_id).first()
     if not pdf:
         raise HTTPException(status_code=404, detail="PDF not found")
     
-    return PDFResponse.from_orm(pdf)
+    if pdf.processing_status in ("pending", "processing"):
+        raise HTTPException(status_code=409, detail="PDF is still being processed. Try again once it has finished.")
+    
+    if db.query(PDF).filter(PDF.source_pdf_id == pdf_id).first():
+        raise HTTPException(
+            status_code=409,
+            detail="Other uploads share this PDF's content. Upload the revision as a new document instead."
+        )
+    
+    filename, upload = await receive_pdf(request)
+    digest, pages = upload.digest, upload.pages
+    if digest == pdf.content_hash:
+        upload.discard()
+        return {
+            "status": "success",
+            "pdf_id": pdf.id,
+            "processing_status": pdf.processing_status,
+            "message": "Revision is identical to the current version; nothing to do."
+        }
+    
+    try:
+        await admit_upload(pages)
+    except HTTPException:
+        upload.discard()
+        raise
+    
+    filepath = content_path(digest)
+    stored_before = os.path.exists(filepath)
+    try:
+        store_upload(upload)
+        
+        cost_model.refresh(db)
+        predicted, _ = cost_model.predict(pages, upload.size)
+        
+        # Checked again under the row lock; the upload may have raced processing
+        pdf = db.query(PDF).filter(PDF.id == pdf_id).with_for_update().first()
+        if not pdf:
+            raise HTTPException(status_code=404, detail="PDF not found")
+        if pdf.processing_status in ("pending", "processing"):
+            raise HTTPException(status_code=409, detail="PDF is still being processed. Try again once it has finished.")
+        
+        previous_filepath = pdf.filepath
+        pdf.filename = filename
+        pdf.filepath = filepath
+        pdf.content_hash = digest
+        pdf.file_size = upload.size
+        # A duplicate upload becomes a document in its own right
+        pdf.source_pdf_id = None
+        pdf.processing_error = None
+        pdf.predicted_duration = predicted
+        
+        # Queued while the row is locked, so a revision still in flight turns this one away
+        queued = await ingest_queue.enqueue(
+            pdf.id, filepath, filename, pages, predicted, mode="revision"
+        )
+        if not queued:
+            raise HTTPException(
+                status_code=409, detail="An earlier revision is still being processed. Try again once it has finished."
+            )
+        db.commit()
+        
+        # The previous version's file and page text go, unless another PDF uses them
+        if previous_filepath != filepath:
+            release_content(db, pdf, previous_filepath)
+        
+        return {
+            "status": "success",
+            "filename": filename,
+            "pdf_id": pdf.id,
+            "processing_status": pdf.processing_status,
+            "predicted_duration": round(predicted, 1),
+            "message": "Revision uploaded. Only changed content will be re-embedded."
+        }
+        
+    except Exception as e:
+        db.rollback()
+        upload.discard()
+        # Clean up the file if the revision was not recorded, unless it was already stored
+        if not stored_before:
+            discard_unused(db, filepath)
+        if isinstance(e, HTTPException):
+            raise
+        logger.error(f"Revision of PDF {pdf_id} failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Revision failed: {str(e)}")
+
+async def hand_over_chunks(pdf: PDF, linked: List[PDF]) -> bool:
+    """Make the oldest duplicate of a PDF being deleted the owner of its content.
+    
+    Returns False when the PDF had no finished chunks to hand over; the
+    successor is then queued for processing in its own right.
+    """
+    successor, others = linked[0], linked[1:]
+    successor.source_pdf_id = None
+    for other in others:
+        other.source_pdf_id = successor.id
+    
+    if pdf.processing_status != "completed":
+        for duplicate in linked:
+            duplicate.processing_status = "pending"
+        await queue_for_processing(
+            successor.id, successor.filename, successor.filepath,
+            successor.page_count or 1, pdf.predicted_duration
+        )
+        return False
+    
+    try:
+        async with httpx.AsyncClient() as client:
+            response = await client.post(
+                f"{settings.PDF_SERVICE_URL}/documents/{pdf.id}/reassign",
+                json={"pdf_id": successor.id, "filename": successor.filename},
+                timeout=30.0
+            )
+            response.raise_for_status()
+    except Exception as e:
+        logger.warning(f"Failed to hand chunks of PDF {pdf.id} over to PDF {successor.id}: {e}")
+    return True
 
 @router.delete("/pdfs/{pdf_id}")
 async def delete_pdf(pdf_id: int, db: Session = Depends(get_db)):
@@ -156,19 +646,24 @@ async def delete_pdf(pdf_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="PDF not found")
     
     try:
-        # Delete file from filesystem
-        if os.path.exists(pdf.filepath):
-            os.remove(pdf.filepath)
+        # Delete file from filesystem, unless a duplicate upload shares it
+        release_content(db, pdf)
         
-        # Notify PDF service to delete chunks
-        try:
-            async with httpx.AsyncClient() as client:
-                await client.delete(
-                    f"{settings.PDF_SERVICE_URL}/documents/{pdf_id}",
-                    timeout=30.0
-                )
-        except Exception as e:
-            logger.warning(f"Failed to notify PDF service about deletion: {e}")
+        # A duplicate upload has no chunks of its own; duplicates linked to
+        # this PDF keep its chunks, the oldest taking them over
+        linked = [] if pdf.source_pdf_id else db.query(PDF).filter(
+            PDF.source_pdf_id == pdf_id
+        ).order_by(PDF.id).all()
+        if pdf.source_pdf_id is None and not (linked and await hand_over_chunks(pdf, linked)):
+            # Notify PDF service to delete chunks
+            try:
+                async with httpx.AsyncClient() as client:
+                    await client.delete(
+                        f"{settings.PDF_SERVICE_URL}/documents/{pdf_id}",
+                        timeout=30.0
+                    )
+            except Exception as e:
+                logger.warning(f"Failed to notify PDF service about deletion: {e}")
         
         # Delete from database
         db.delete(pdf)
@@ -17,6 +17,10 @@ class PDFResponse(PDFBase):
     processing_error: Optional[str] = None
     extraction_method: Optional[str] = None
     processing_duration: Optional[float] = None
+    predicted_duration: Optional[float] = None
+    eta_seconds: Optional[float] = None  # Until processing is expected to finish, while queued or running
+    content_hash: Optional[str] = None
+    source_pdf_id: Optional[int] = None  # Set when the upload duplicates an already processed PDF
     file_size: Optional[int] = None
     page_count: Optional[int] = None
     text_length: Optional[int] = None
@@ -28,6 +32,13 @@ class PDFListResponse(BaseModel):
     pdfs: List[PDFResponse]
     pagination: dict
 
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int  # Total bytes the client will send
+
+class ReprocessJobCreate(BaseModel):
+    rate_per_minute: Optional[float] = None  # Documents queued per minute; 0 means no cap
+
 from config import settings
 
 class LLMRequest(BaseModel):
@@ -0,0 +1,219 @@
+import os
+import asyncio
+import hashlib
+import logging
+import tempfile
+from typing import BinaryIO, Callable, Dict, Optional, Tuple
+
+from multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from models import PDF
+from services.ingest_queue import PageEstimator
+from shared.content import LINKED_FIELDS, source_conditions
+from config import settings
+# Written by the document workers next to each upload
+from shared.page_text import page_text_path
+
+logger = logging.getLogger(__name__)
+
+class UploadTooLarge(Exception):
+    """The upload crossed MAX_FILE_SIZE; what was received of it has been removed."""
+
+class InvalidForm(Exception):
+    """The request body is not a multipart form carrying the expected file."""
+
+class ReceivedUpload:
+    """An upload written to a temporary file, with its SHA-256, size and estimated pages."""
+    
+    def __init__(self, path: str, digest: str, size: int, pages: int):
+        self.path = path
+        self.digest = digest
+        self.size = size
+        self.pages = pages
+    
+    def discard(self):
+        """Remove the temporary file unless it has been stored."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def content_path(digest: str) -> str:
+    """Where the bytes with this SHA-256 are stored; the upload's filename is kept only in the database."""
+    return os.path.join(settings.UPLOAD_FOLDER, f"{digest}.pdf")
+
+class UploadWriter:
+    """Writes an upload to a temporary file block by block, hashing it and estimating its pages on the way.
+    
+    The file is never held in memory whole; UploadTooLarge is raised as soon
+    as MAX_FILE_SIZE is crossed. Blocking; run it off the event loop.
+    """
+    
+    def __init__(self):
+        os.makedirs(settings.UPLOAD_FOLDER, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=settings.UPLOAD_FOLDER, suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+        self._digest = hashlib.sha256()
+        self._estimator = PageEstimator()
+    
+    def write(self, block: bytes):
+        if self._estimator.size + len(block) > settings.MAX_FILE_SIZE:
+            raise UploadTooLarge()
+        self._digest.update(block)
+        self._estimator.feed(block)
+        self._file.write(block)
+    
+    def finish(self) -> ReceivedUpload:
+        self._file.close()
+        return ReceivedUpload(self.path, self._digest.hexdigest(), self._estimator.size, self._estimator.pages)
+    
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def receive_file(source: BinaryIO) -> ReceivedUpload:
+    """Copy a file object to a temporary file in UPLOAD_BLOCK_SIZE blocks (see UploadWriter)."""
+    writer = UploadWriter()
+    try:
+        while True:
+            block = source.read(settings.UPLOAD_BLOCK_SIZE)
+            if not block:
+                break
+            writer.write(block)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.finish()
+
+async def receive_form_file(
+    request: Request, field: str = "file", check_filename: Optional[Callable[[str], None]] = None
+) -> Tuple[str, ReceivedUpload]:
+    """The file in a multipart/form-data request's `field`, written to a temporary file as the body arrives.
+    
+    Unlike an UploadFile, the body is not spooled before the handler sees
+    it: MAX_FILE_SIZE applies while reading, with or without a
+    Content-Length, and the file is written to disk once. check_filename may
+    reject the upload by raising before any of its bytes are written. Other
+    form fields are ignored. Returns (filename, upload).
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise InvalidForm("Expected a multipart/form-data upload")
+    
+    # The parser reports through callbacks; events are handled after each
+    # write so the file can be written off the event loop
+    events = []
+    header_field, header_value, headers = bytearray(), bytearray(), {}
+    
+    def on_header_end():
+        headers[bytes(header_field).lower()] = bytes(header_value)
+        header_field.clear()
+        header_value.clear()
+    
+    def on_headers_finished():
+        events.append(("part", dict(headers)))
+        headers.clear()
+    
+    parser = MultipartParser(boundary, {
+        "on_header_field": lambda data, start, end: header_field.extend(data[start:end]),
+        "on_header_value": lambda data, start, end: header_value.extend(data[start:end]),
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": lambda data, start, end: events.append(("data", data[start:end])),
+        "on_part_end": lambda: events.append(("end", None))
+    })
+    
+    filename, writer, upload = None, None, None
+    reading = False  # The part being parsed is the file
+    pending = bytearray()
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for kind, value in events:
+                if kind == "part" and writer is None:
+                    _, options = parse_options_header(value.get(b"content-disposition", b""))
+                    if options.get(b"name") == field.encode() and b"filename" in options:
+                        filename = options[b"filename"].decode("utf-8", "replace")
+                        if check_filename is not None:
+                            check_filename(filename)
+                        writer = await asyncio.to_thread(UploadWriter)
+                        reading = True
+                elif kind == "data" and reading:
+                    pending.extend(value)
+                elif kind == "end" and reading:
+                    reading = False
+                    await asyncio.to_thread(writer.write, bytes(pending))
+                    pending.clear()
+                    upload = await asyncio.to_thread(writer.finish)
+            events.clear()
+            if len(pending) >= settings.UPLOAD_BLOCK_SIZE:
+                await asyncio.to_thread(writer.write, bytes(pending))
+                pending.clear()
+        parser.finalize()
+    except BaseException:
+        if upload is not None:
+            upload.discard()
+        elif writer is not None:
+            writer.abort()
+        raise
+    
+    if upload is None:
+        if writer is not None:
+            writer.abort()
+        raise InvalidForm(f"No file was sent in the '{field}' form field")
+    return filename, upload
+
+def store_upload(upload: ReceivedUpload) -> str:
+    """Move a received upload under its SHA-256 unless a copy is already there; returns the path.
+    
+    The rename is atomic, so an existing copy is never partially overwritten.
+    """
+    path = content_path(upload.digest)
+    if os.path.exists(path):
+        upload.discard()
+    else:
+        os.replace(upload.path, path)
+    return path
+
+def find_source(db: Session, digest: str) -> Optional[PDF]:
+    """The PDF whose chunks serve this content, unless it has only ever failed."""
+    return db.query(PDF).filter(PDF.content_hash == digest, *source_conditions(PDF)).order_by(PDF.id).first()
+
+def find_sources(db: Session, digests) -> Dict[str, PDF]:
+    """find_source for many hashes in one query, keyed by hash."""
+    sources: Dict[str, PDF] = {}
+    if not digests:
+        return sources
+    for pdf in db.query(PDF).filter(PDF.content_hash.in_(list(digests)), *source_conditions(PDF)).order_by(PDF.id):
+        sources.setdefault(pdf.content_hash, pdf)
+    return sources
+
+def link_to_source(pdf: PDF, source: PDF):
+    """Make `pdf` reuse the chunks and embeddings of `source` instead of being processed."""
+    pdf.source_pdf_id = source.id
+    for field in LINKED_FIELDS:
+        setattr(pdf, field, getattr(source, field))
+
+def discard_unused(db: Session, path: str):
+    """Remove a stored file that no PDF record refers to, e.g. after a failed upload."""
+    try:
+        in_use = db.query(PDF.id).filter(PDF.filepath == path).first()
+        if in_use is None and os.path.exists(path):
+            os.remove(path)
+    except Exception as e:
+        logger.warning(f"Could not clean up {path}: {e}")
+
+def release_content(db: Session, pdf: PDF, filepath: Optional[str] = None):
+    """Remove the stored file and page text of a PDF being deleted, unless another PDF still uses them.
+    
+    `filepath` names a previous version of a revised PDF instead of its current file.
+    """
+    filepath = filepath or pdf.filepath
+    in_use = db.query(PDF).filter(PDF.filepath == filepath, PDF.id != pdf.id).first()
+    if in_use is not None:
+        return
+    for path in (filepath, page_text_path(filepath)):
+        if os.path.exists(path):
+            os.remove(path)
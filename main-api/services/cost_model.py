@@ -0,0 +1,107 @@
+import math
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from models import PDF
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class CostModel:
+    """Predicts how long a PDF will take to ingest, from past processing runs.
+    
+    For each extraction method (text, ocr, mixed) a least-squares fit of
+    processing_duration ~ 1 + page_count + file size (MB) is made over recent
+    completed PDFs. A new upload is assigned the method whose typical
+    bytes-per-page is closest to its own, since scans are far denser than
+    born-digital text. Methods with too little history use the pooled fit, and
+    with no history at all the prediction is SCHEDULER_DEFAULT_SECONDS_PER_PAGE
+    per page.
+    """
+    
+    def __init__(self):
+        self.coefficients: Dict[str, np.ndarray] = {}  # method (or "all") -> [intercept, per page, per MB]
+        self.density: Dict[str, float] = {}  # method -> median log(bytes per page)
+        self.samples = 0
+        self.fitted_at = 0.0
+    
+    def refresh(self, db: Session):
+        """Refit from the database when the current fit is older than COST_MODEL_REFIT_SECONDS."""
+        if time.time() - self.fitted_at < settings.COST_MODEL_REFIT_SECONDS:
+            return
+        try:
+            self.fit(db)
+        except Exception as e:
+            # Keep predicting from the previous fit (or the defaults)
+            logger.warning(f"Could not refit ingest cost model: {e}")
+            self.fitted_at = time.time()
+    
+    def fit(self, db: Session):
+        rows = db.query(
+            PDF.extraction_method, PDF.page_count, PDF.file_size, PDF.processing_duration
+        ).filter(
+            PDF.processing_status == "completed",
+            PDF.processing_duration.isnot(None),
+            PDF.page_count > 0,
+            PDF.file_size > 0
+        ).order_by(PDF.processing_end_time.desc()).limit(settings.COST_MODEL_HISTORY).all()
+        
+        by_method: Dict[str, List[Tuple[int, int, float]]] = {}
+        for method, pages, size, duration in rows:
+            by_method.setdefault(method or "text", []).append((pages, size, duration))
+            by_method.setdefault("all", []).append((pages, size, duration))
+        
+        coefficients, density = {}, {}
+        for method, samples in by_method.items():
+            if len(samples) < settings.COST_MODEL_MIN_SAMPLES:
+                continue
+            data = np.array(samples, dtype=float)
+            features = np.column_stack([np.ones(len(data)), data[:, 0], data[:, 1] / (1024 * 1024)])
+            coefficients[method], *_ = np.linalg.lstsq(features, data[:, 2], rcond=None)
+            if method != "all":
+                density[method] = float(np.median(np.log(data[:, 1] / data[:, 0])))
+        
+        self.coefficients, self.density = coefficients, density
+        self.samples = len(rows)
+        self.fitted_at = time.time()
+        logger.info(f"Fitted ingest cost model on {len(rows)} PDFs: {self.describe()['methods']}")
+    
+    def likely_method(self, page_count: int, file_size: int) -> Optional[str]:
+        """Extraction method whose typical bytes-per-page is closest to this PDF's."""
+        if not self.density or page_count <= 0 or file_size <= 0:
+            return None
+        density = math.log(file_size / page_count)
+        return min(self.density, key=lambda method: abs(self.density[method] - density))
+    
+    def predict(self, page_count: int, file_size: int) -> Tuple[float, Optional[str]]:
+        """Predicted processing seconds and the extraction method it assumes."""
+        page_count = max(1, page_count)
+        method = self.likely_method(page_count, file_size)
+        coefficients = self.coefficients.get(method, self.coefficients.get("all"))
+        if coefficients is None:
+            return page_count * settings.SCHEDULER_DEFAULT_SECONDS_PER_PAGE, method
+        
+        seconds = float(coefficients @ np.array([1.0, page_count, file_size / (1024 * 1024)]))
+        # A fit on few or noisy samples can go negative for small documents
+        return max(seconds, settings.COST_MODEL_MIN_SECONDS), method
+    
+    def describe(self) -> dict:
+        return {
+            "samples": self.samples,
+            "fitted_at": self.fitted_at or None,
+            "methods": {
+                method: {
+                    "intercept_seconds": round(float(coefficients[0]), 3),
+                    "seconds_per_page": round(float(coefficients[1]), 3),
+                    "seconds_per_mb": round(float(coefficients[2]), 3),
+                    "bytes_per_page": round(math.exp(self.density[method])) if method in self.density else None
+                }
+                for method, coefficients in self.coefficients.items()
+            }
+        }
+
+cost_model = CostModel()
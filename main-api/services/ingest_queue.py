@@ -0,0 +1,154 @@
+import re
+import time
+import logging
+from typing import List, Optional
+
+import redis.asyncio as redis
+
+from config import settings
+# Key layout, enqueue script and scheduling rules shared with the document workers, which claim these jobs
+from shared.ingest_queue import (
+    QUEUE_KEY, DELAYED_KEY, PROCESSING_KEY, JOB_KEY, PAGES_KEY,
+    ENQUEUE_SCRIPT, enqueue_args, worker_stats, admission_load
+)
+
+logger = logging.getLogger(__name__)
+
+# Page objects in an uncompressed page tree; PDFs that keep it in compressed
+# object streams fall back to a size-based guess
+PAGE_OBJECT_PATTERN = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+ESTIMATED_BYTES_PER_PAGE = 100 * 1024
+
+class PageEstimator:
+    """estimate_page_count over a file fed in blocks, as it is received."""
+    
+    # Longest match of PAGE_OBJECT_PATTERN worth carrying across a block boundary
+    OVERLAP = 64
+    
+    def __init__(self):
+        self.size = 0
+        self.page_objects = 0
+        self._tail = b""
+        self._at_end = 0  # A match at the very end, which the next block may still extend
+    
+    def feed(self, block: bytes):
+        if not block:
+            return
+        self.size += len(block)
+        data = self._tail + block
+        self._at_end = 0
+        for match in PAGE_OBJECT_PATTERN.finditer(data):
+            if match.end() == len(data):
+                self._at_end = 1
+            elif match.end() >= len(self._tail):
+                # Matches ending earlier were counted with the previous block
+                self.page_objects += 1
+        self._tail = data[-self.OVERLAP:]
+    
+    @property
+    def pages(self) -> int:
+        return (self.page_objects + self._at_end) or max(1, self.size // ESTIMATED_BYTES_PER_PAGE)
+
+def estimate_page_count(content: bytes) -> int:
+    """Cheap page count for admission, without parsing the PDF."""
+    estimator = PageEstimator()
+    estimator.feed(content)
+    return estimator.pages
+
+class IngestQueue:
+    """Puts uploaded PDFs straight onto the shared Redis ingest queue.
+    
+    Any number of document-processor workers claim from it, so uploads no
+    longer go through a single processor instance at PDF_SERVICE_URL.
+    """
+    
+    def __init__(self):
+        self.redis = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        self._enqueue = self.redis.register_script(ENQUEUE_SCRIPT)
+    
+    async def enqueue(
+        self, pdf_id: int, filepath: str, filename: str, pages: int = 1, predicted: Optional[float] = None,
+        mode: str = "process"
+    ) -> bool:
+        """Queue a PDF; returns False when it is already queued or being processed.
+        
+        `predicted` is the cost model's processing time in seconds, which sets
+        the job's place in the shortest-job-first queue.
+        """
+        added = await self._enqueue(
+            keys=[QUEUE_KEY, JOB_KEY.format(pdf_id), PAGES_KEY],
+            args=enqueue_args(settings, pdf_id, filepath, filename, pages, predicted, time.time(), mode)
+        )
+        return bool(added)
+    
+    async def enqueue_many(self, jobs: List[dict]) -> int:
+        """Queue several {"pdf_id", "filepath", "filename", "pages", "predicted", "mode"} jobs in one round trip.
+        
+        mode is "process" (the default), "reindex" or "revision"; see enqueue_args.
+        """
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for job in jobs:
+                await self._enqueue(
+                    keys=[QUEUE_KEY, JOB_KEY.format(job["pdf_id"]), PAGES_KEY],
+                    args=enqueue_args(
+                        settings, job["pdf_id"], job["filepath"], job["filename"],
+                        job.get("pages") or 1, job.get("predicted"), now, job.get("mode", "process")
+                    ),
+                    client=pipe
+                )
+            results = await pipe.execute()
+        return sum(1 for added in results if added)
+    
+    async def eta(self, pdf_id: int) -> Optional[float]:
+        """Seconds until the PDF is expected to finish processing, or None if it is not queued.
+        
+        A queued job waits for the predicted work of every job ahead of it in
+        the priority order, plus what is left of the running jobs, shared
+        across the worker slots; then it needs its own predicted time.
+        """
+        job = await self.redis.hgetall(JOB_KEY.format(pdf_id))
+        status = job.get("status")
+        if status not in ("queued", "running"):
+            return None
+        
+        now = time.time()
+        predicted = float(job.get("predicted") or 0)
+        if status == "running":
+            return max(0.0, predicted - (now - float(job.get("claimed_at") or now)))
+        
+        priority = float(job.get("priority") or job.get("enqueued_at") or now)
+        ahead = await self.redis.zrangebyscore(QUEUE_KEY, "-inf", f"({priority}")
+        running = await self.redis.zrange(PROCESSING_KEY, 0, -1)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for other in ahead + running:
+                pipe.hmget(JOB_KEY.format(other), "predicted", "claimed_at")
+            pipe.zscore(DELAYED_KEY, pdf_id)
+            *others, retry_at = await pipe.execute()
+        
+        work_ahead = 0.0
+        for other_predicted, claimed_at in others:
+            remaining = float(other_predicted or 0)
+            if claimed_at:
+                remaining -= now - float(claimed_at)
+            work_ahead += max(0.0, remaining)
+        
+        slots = sum(worker.get("concurrency", 1) for worker in (await worker_stats(self.redis)).values()) or 1
+        wait = work_ahead / slots
+        if retry_at is not None:
+            wait = max(wait, float(retry_at) - now)
+        return wait + predicted
+    
+    async def load(self, pages: int = 0) -> dict:
+        """Current ingest load, and whether one more job of `pages` pages is admitted."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zcard(QUEUE_KEY)
+            pipe.zcard(DELAYED_KEY)
+            pipe.zcard(PROCESSING_KEY)
+            pipe.get(PAGES_KEY)
+            queued, delayed, processing, queued_pages = await pipe.execute()
+        return admission_load(
+            settings, queued + delayed + processing, max(0, int(queued_pages or 0)), pages, await worker_stats(self.redis)
+        )
+
+ingest_queue = IngestQueue()
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict
+
+import redis.asyncio as redis
+
+from config import settings
+from shared.lanes import INTERACTIVE_SIGNAL_KEY
+
+logger = logging.getLogger(__name__)
+
+# Highest priority first
+LANES = ("interactive", "ingest", "background")
+
+class LaneScheduler:
+    """Priority lanes in front of Ollama.
+    
+    At most LLM_MAX_CONCURRENCY requests reach Ollama at once, and each lane
+    is further capped by its own share (LLM_<LANE>_CONCURRENCY). Whenever a
+    slot frees up it goes to the highest-priority lane with a request
+    waiting, so bulk summaries never queue ahead of chat. Requests are not
+    interrupted once started: low-priority work is preempted at request
+    boundaries, and keeping its share below LLM_MAX_CONCURRENCY leaves chat
+    a slot even while bulk jobs run.
+    """
+    
+    def __init__(self):
+        self.max_concurrency = max(1, settings.LLM_MAX_CONCURRENCY)
+        self.limits = {
+            "interactive": settings.LLM_INTERACTIVE_CONCURRENCY,
+            "ingest": settings.LLM_INGEST_CONCURRENCY,
+            "background": settings.LLM_BACKGROUND_CONCURRENCY
+        }
+        self._active: Dict[str, int] = {lane: 0 for lane in LANES}
+        self._waiting: Dict[str, Deque[asyncio.Future]] = {lane: deque() for lane in LANES}
+        self._completed: Dict[str, int] = {lane: 0 for lane in LANES}
+        self._redis = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        self._signalled = False
+    
+    def _can_start(self, lane: str) -> bool:
+        return (
+            sum(self._active.values()) < self.max_concurrency
+            and self._active[lane] < max(1, self.limits[lane])
+        )
+    
+    def _dispatch(self):
+        """Hand free slots to waiting requests, highest-priority lane first."""
+        for lane in LANES:
+            waiting = self._waiting[lane]
+            while waiting and self._can_start(lane):
+                future = waiting.popleft()
+                if not future.done():
+                    self._active[lane] += 1
+                    future.set_result(None)
+            if waiting:
+                # Lower lanes wait for this one, even if their own share has room
+                return
+    
+    @asynccontextmanager
+    async def slot(self, lane: str):
+        """Hold one Ollama slot in `lane` for the duration of the block."""
+        if lane not in self._waiting:
+            raise ValueError(f"Unknown lane: {lane}")
+        
+        ahead = any(self._waiting[other] for other in LANES[:LANES.index(lane) + 1])
+        if not ahead and self._can_start(lane):
+            self._active[lane] += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._waiting[lane].append(future)
+            await self._update_signal()
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Granted just as the caller gave up
+                    self._release(lane)
+                elif future in self._waiting[lane]:
+                    self._waiting[lane].remove(future)
+                await self._update_signal()
+                raise
+        
+        await self._update_signal()
+        try:
+            yield
+        finally:
+            self._completed[lane] += 1
+            self._release(lane)
+            await self._update_signal()
+    
+    def _release(self, lane: str):
+        self._active[lane] -= 1
+        self._dispatch()
+    
+    async def _update_signal(self):
+        busy = self._active["interactive"] > 0 or bool(self._waiting["interactive"])
+        if not busy and not self._signalled:
+            return
+        try:
+            if busy:
+                # Expires on its own if this process dies mid-request
+                await self._redis.set(INTERACTIVE_SIGNAL_KEY, 1, ex=settings.LANE_SIGNAL_TTL_SECONDS)
+            else:
+                await self._redis.delete(INTERACTIVE_SIGNAL_KEY)
+            self._signalled = busy
+        except Exception as e:
+            logger.warning(f"Could not update interactive lane signal: {e}")
+    
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "lanes": {
+                lane: {
+                    "limit": self.limits[lane],
+                    "active": self._active[lane],
+                    "waiting": len(self._waiting[lane]),
+                    "completed": self._completed[lane]
+                }
+                for lane in LANES
+            }
+        }
+
+lane_scheduler = LaneScheduler()
@@ -0,0 +1,322 @@
+import time
+import asyncio
+import logging
+import secrets
+from datetime import datetime
+from typing import List, Optional
+
+import redis.asyncio as redis
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import PDF
+from services.cost_model import cost_model
+from services.ingest_queue import ingest_queue
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+JOB_KEY = "reprocess:job:{}"
+JOBS_KEY = "reprocess:jobs"  # Job ids by creation time
+ACTIVE_KEY = "reprocess:active"  # The running or paused job; there is at most one
+LEASE_KEY = "reprocess:lease"  # Held by the main-api process dispatching the active job
+
+# Delete a key only while it still holds ARGV[1] (a lease token or job id)
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Write a new job and make it the active one, unless another job is active;
+# returns the id of the active job. ARGV: job_id, created_at, then field/value pairs
+CREATE_SCRIPT = """
+local active = redis.call('GET', KEYS[1])
+if active then
+    return active
+end
+redis.call('HSET', KEYS[2], unpack(ARGV, 3))
+redis.call('ZADD', KEYS[3], ARGV[2], ARGV[1])
+redis.call('SET', KEYS[1], ARGV[1])
+return ARGV[1]
+"""
+
+RENEW_SCRIPT = """
+local holder = redis.call('GET', KEYS[1])
+if holder == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+if not holder then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+class ReprocessJobExists(Exception):
+    """Another reprocess job is still running or paused."""
+    
+    def __init__(self, job_id: str):
+        super().__init__(f"Reprocess job {job_id} is still active")
+        self.job_id = job_id
+
+def _candidates(db: Session, mode: str = "process"):
+    """PDFs a reprocess job queues, never those linked to the PDF they duplicate.
+    
+    A "process" job takes the PDFs never processed, a "reindex" job the completed ones.
+    """
+    query = db.query(PDF).filter(PDF.source_pdf_id.is_(None))
+    if mode == "reindex":
+        return query.filter(PDF.processing_status == "completed")
+    return query.filter(PDF.processed == False)
+
+class ReprocessJobs:
+    """Reprocessing of unprocessed PDFs, or re-indexing of processed ones, as a job that survives restarts.
+    
+    A job walks the candidates in id order (keyset pagination), queueing at
+    most rate_per_minute documents a minute and holding back while the ingest
+    queue is over its admission limits. Its state lives in Redis: after every
+    page the id of the last PDF queued is checkpointed, so a job interrupted
+    by a restart continues after that id. Whichever main-api process holds
+    the job's lease dispatches it; the others only read and change its state.
+    """
+    
+    def __init__(self):
+        self.redis = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        self._release = self.redis.register_script(RELEASE_SCRIPT)
+        self._create = self.redis.register_script(CREATE_SCRIPT)
+        self._renew = self.redis.register_script(RENEW_SCRIPT)
+        self._token = secrets.token_hex(8)
+        self._task: Optional[asyncio.Task] = None
+    
+    async def create(self, db: Session, rate_per_minute: Optional[float] = None, mode: str = "process") -> dict:
+        """Start a job in `mode`: "process" queues unprocessed PDFs, "reindex" rebuilds the chunks of completed ones."""
+        active = await self.get_active()
+        if active is not None:
+            raise ReprocessJobExists(active)
+        total = _candidates(db, mode).count()
+        job_id = secrets.token_hex(8)
+        now = time.time()
+        job = {
+            "job_id": job_id,
+            "mode": mode,
+            "status": "running",
+            "rate_per_minute": settings.REPROCESS_RATE_PER_MINUTE if rate_per_minute is None else rate_per_minute,
+            "total": total,
+            "cursor": 0,
+            "dispatched": 0,
+            "already_queued": 0,
+            "created_at": now,
+            "updated_at": now,
+            "finished_at": "",
+            "error": ""
+        }
+        # The job and the active pointer are written together, so neither exists without the other
+        fields = [value for pair in job.items() for value in pair]
+        active = await self._create(keys=[ACTIVE_KEY, JOB_KEY.format(job_id), JOBS_KEY], args=[job_id, now] + fields)
+        if active != job_id:
+            raise ReprocessJobExists(active)
+        logger.info(f"Created reprocess job {job_id} for {job['total']} PDFs")
+        return await self.get(job_id)
+    
+    async def get_active(self) -> Optional[str]:
+        """The id of the running or paused job; an id left without its job record is cleared."""
+        job_id = await self.redis.get(ACTIVE_KEY)
+        if job_id is None or await self.redis.exists(JOB_KEY.format(job_id)):
+            return job_id
+        logger.warning(f"Clearing active reprocess job {job_id}, which has no job record")
+        await self._release(keys=[ACTIVE_KEY], args=[job_id])
+        return None
+    
+    async def get(self, job_id: str) -> Optional[dict]:
+        job = await self.redis.hgetall(JOB_KEY.format(job_id))
+        if not job:
+            return None
+        for field in ("total", "cursor", "dispatched", "already_queued"):
+            job[field] = int(job[field])
+        for field in ("rate_per_minute", "created_at", "updated_at"):
+            job[field] = float(job[field])
+        job["finished_at"] = float(job["finished_at"]) if job["finished_at"] else None
+        job["error"] = job["error"] or None
+        job.setdefault("mode", "process")
+        return job
+    
+    async def list_jobs(self) -> List[dict]:
+        jobs = []
+        for job_id in await self.redis.zrevrange(JOBS_KEY, 0, -1):
+            job = await self.get(job_id)
+            if job is not None:
+                jobs.append(job)
+        return jobs
+    
+    def progress(self, db: Session, job: dict) -> dict:
+        """The job with what became of the PDFs it queued and how many are left.
+        
+        A re-index leaves no finishing time on the PDFs it rebuilds, so a
+        "reindex" job reports no completed and failed counts.
+        """
+        started = datetime.utcfromtimestamp(job["created_at"])
+        finished = dict(
+            db.query(PDF.processing_status, func.count(PDF.id)).filter(
+                PDF.id <= job["cursor"],
+                PDF.source_pdf_id.is_(None),
+                PDF.processing_end_time >= started
+            ).group_by(PDF.processing_status).all()
+        ) if job["cursor"] and job["mode"] == "process" else {}
+        remaining = _candidates(db, job["mode"]).filter(PDF.id > job["cursor"]).count() if job["status"] in ("running", "paused") else 0
+        eta = None
+        if job["status"] == "running" and job["rate_per_minute"] > 0:
+            eta = remaining * 60 / job["rate_per_minute"]
+        reports = job["mode"] == "process"
+        return {
+            **job,
+            "completed": finished.get("completed", 0) if reports else None,
+            "failed": finished.get("failed", 0) if reports else None,
+            "remaining": remaining,
+            "dispatch_eta_seconds": eta
+        }
+    
+    async def _set_status(self, job_id: str, status: str, allowed_from, **fields) -> Optional[dict]:
+        job = await self.get(job_id)
+        if job is None or job["status"] not in allowed_from:
+            return job
+        fields.update({"status": status, "updated_at": time.time()})
+        if status in ("completed", "cancelled"):
+            fields["finished_at"] = fields["updated_at"]
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(JOB_KEY.format(job_id), mapping=fields)
+            if status in ("completed", "cancelled"):
+                pipe.delete(ACTIVE_KEY)
+            await pipe.execute()
+        logger.info(f"Reprocess job {job_id} {status}")
+        return await self.get(job_id)
+    
+    async def pause(self, job_id: str) -> Optional[dict]:
+        return await self._set_status(job_id, "paused", ("running",))
+    
+    async def resume(self, job_id: str, rate_per_minute: Optional[float] = None) -> Optional[dict]:
+        fields = {} if rate_per_minute is None else {"rate_per_minute": rate_per_minute}
+        return await self._set_status(job_id, "running", ("paused", "running"), **fields)
+    
+    async def cancel(self, job_id: str) -> Optional[dict]:
+        return await self._set_status(job_id, "cancelled", ("running", "paused"))
+    
+    def _dispatch_page(self, job: dict, limit: int) -> List[dict]:
+        """Mark the next `limit` candidates after the cursor pending; returns their queue jobs.
+        
+        Re-indexed PDFs stay completed and searchable, so a "reindex" job
+        leaves their rows alone. Blocking; run it off the event loop.
+        """
+        mode = job["mode"]
+        db = SessionLocal()
+        try:
+            pdfs = _candidates(db, mode).filter(PDF.id > job["cursor"]).order_by(PDF.id).limit(limit).all()
+            if mode == "process":
+                cost_model.refresh(db)
+            jobs = []
+            for pdf in pdfs:
+                pages = pdf.page_count or 1
+                if mode == "reindex":
+                    predicted = pages * settings.REINDEX_SECONDS_PER_PAGE
+                else:
+                    predicted, _ = cost_model.predict(pages, pdf.file_size or 0)
+                jobs.append({
+                    "pdf_id": pdf.id,
+                    "filename": pdf.filename,
+                    "filepath": pdf.filepath,
+                    "pages": pages,
+                    "predicted": predicted,
+                    "mode": mode
+                })
+                # Queued or running already: a worker owns its status
+                if mode == "process" and pdf.processing_status not in ("pending", "processing"):
+                    pdf.processing_status = "pending"
+                    pdf.predicted_duration = predicted
+            db.commit()
+            return jobs
+        finally:
+            db.close()
+    
+    async def _hold_lease(self) -> bool:
+        return bool(await self._renew(
+            keys=[LEASE_KEY], args=[self._token, int(settings.REPROCESS_LEASE_SECONDS * 1000)]
+        ))
+    
+    async def _drive(self, job_id: str):
+        """Dispatch the job while it is running and this process holds the lease."""
+        page_size = max(1, settings.REPROCESS_PAGE_SIZE)
+        allowance, last = 1.0, time.monotonic()  # The first document goes right away
+        while await self._hold_lease():
+            job = await self.get(job_id)
+            if job is None or job["status"] != "running":
+                return
+            
+            # Token bucket: rate_per_minute documents a minute, at most a page at once
+            rate = job["rate_per_minute"]
+            now = time.monotonic()
+            allowance = page_size if rate <= 0 else min(page_size, allowance + (now - last) * rate / 60)
+            last = now
+            if allowance < 1:
+                await asyncio.sleep(min(settings.REPROCESS_POLL_SECONDS, (1 - allowance) * 60 / rate))
+                continue
+            if not (await ingest_queue.load())["accepting"]:
+                await asyncio.sleep(settings.REPROCESS_POLL_SECONDS)
+                continue
+            
+            jobs = await asyncio.to_thread(self._dispatch_page, job, int(allowance))
+            if not jobs:
+                await self._set_status(job_id, "completed", ("running",))
+                return
+            queued = await ingest_queue.enqueue_many(jobs)
+            allowance -= len(jobs)
+            # Checkpoint: a restart continues after the last PDF queued
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(JOB_KEY.format(job_id), mapping={
+                    "cursor": jobs[-1]["pdf_id"], "updated_at": time.time(), "error": ""
+                })
+                pipe.hincrby(JOB_KEY.format(job_id), "dispatched", queued)
+                pipe.hincrby(JOB_KEY.format(job_id), "already_queued", len(jobs) - queued)
+                await pipe.execute()
+    
+    async def _run(self):
+        while True:
+            job_id = None
+            try:
+                job_id = await self.get_active()
+                if job_id is not None:
+                    await self._drive(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Retried from the last checkpoint on the next poll
+                logger.error(f"Reprocess job {job_id} dispatch failed: {e}")
+                if job_id is not None:
+                    try:
+                        await self.redis.hset(JOB_KEY.format(job_id), "error", str(e))
+                    except Exception:
+                        pass
+            finally:
+                try:
+                    await self._release(keys=[LEASE_KEY], args=[self._token])
+                except Exception:
+                    pass  # Expires on its own
+            await asyncio.sleep(settings.REPROCESS_POLL_SECONDS)
+    
+    def start(self):
+        """Look for an active job every REPROCESS_POLL_SECONDS and dispatch it when free to."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+reprocess_jobs = ReprocessJobs()
@@ -0,0 +1,202 @@
+import os
+import re
+import json
+import time
+import fcntl
+import asyncio
+import hashlib
+import logging
+import secrets
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, BinaryIO, Optional
+
+from services.content_store import ReceivedUpload, UploadTooLarge
+from services.ingest_queue import PageEstimator
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+class OffsetMismatch(Exception):
+    """A chunk was sent for an offset other than where the upload stands."""
+    
+    def __init__(self, offset: int):
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+class SessionBusy(Exception):
+    """Another request is writing to or completing the same upload."""
+
+class SessionGone(Exception):
+    """The upload was completed or removed while the request waited for it."""
+
+def sessions_dir() -> str:
+    return os.path.join(settings.UPLOAD_FOLDER, "sessions")
+
+def _session_path(upload_id: str, extension: str) -> str:
+    return os.path.join(sessions_dir(), upload_id + extension)
+
+class UploadSession:
+    """A resumable upload: the bytes received so far plus a small JSON record.
+    
+    Both live under UPLOAD_FOLDER/sessions, so a session survives restarts
+    and can be continued through any main-api process sharing the volume.
+    The offset is always the size of the data file, so whatever reached the
+    disk before a connection dropped counts. A session expires after
+    UPLOAD_SESSION_TTL_HOURS without new data.
+    """
+    
+    def __init__(self, upload_id: str, filename: str, size: int, created_at: float):
+        self.upload_id = upload_id
+        self.filename = filename
+        self.size = size
+        self.created_at = created_at
+    
+    @property
+    def data_path(self) -> str:
+        return _session_path(self.upload_id, ".part")
+    
+    @property
+    def record_path(self) -> str:
+        return _session_path(self.upload_id, ".json")
+    
+    @property
+    def offset(self) -> int:
+        try:
+            return os.path.getsize(self.data_path)
+        except OSError:
+            return 0
+    
+    @property
+    def expires_at(self) -> float:
+        try:
+            last_write = os.path.getmtime(self.data_path)
+        except OSError:
+            last_write = self.created_at
+        return max(self.created_at, last_write) + settings.UPLOAD_SESSION_TTL_HOURS * 3600
+    
+    def to_dict(self) -> dict:
+        return {
+            "upload_id": self.upload_id,
+            "filename": self.filename,
+            "size": self.size,
+            "offset": self.offset,
+            "chunk_size": settings.UPLOAD_CHUNK_SIZE,
+            "expires_at": self.expires_at
+        }
+
+def create_session(filename: str, size: int) -> UploadSession:
+    expire_sessions()
+    os.makedirs(sessions_dir(), exist_ok=True)
+    session = UploadSession(secrets.token_hex(16), filename, size, time.time())
+    # Record first: a data file without one is an abandoned session
+    with open(session.record_path, "w") as f:
+        json.dump({"filename": filename, "size": size, "created_at": session.created_at}, f)
+    open(session.data_path, "wb").close()
+    return session
+
+def get_session(upload_id: str) -> Optional[UploadSession]:
+    if not UPLOAD_ID_PATTERN.match(upload_id):
+        return None
+    try:
+        with open(_session_path(upload_id, ".json")) as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    session = UploadSession(upload_id, record["filename"], record["size"], record["created_at"])
+    if session.expires_at < time.time():
+        discard_session(session)
+        return None
+    return session
+
+def _open_locked(path: str) -> BinaryIO:
+    f = open(path, "r+b")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        raise SessionBusy()
+    return f
+
+@asynccontextmanager
+async def lock_session(session: UploadSession):
+    """Hold the session's lock, so one request at a time writes or completes the upload; yields its data file.
+    
+    The lock is an flock on the data file, so it holds across main-api
+    processes sharing the volume. Raises SessionBusy when another request
+    holds it and SessionGone when the session ended before it was acquired.
+    """
+    try:
+        f = await asyncio.to_thread(_open_locked, session.data_path)
+    except FileNotFoundError:
+        raise SessionGone()
+    try:
+        if not os.path.exists(session.record_path):
+            raise SessionGone()
+        yield f
+    finally:
+        f.close()
+
+async def write_chunk(session: UploadSession, offset: int, blocks: AsyncIterator[bytes]) -> int:
+    """Append a chunk arriving as `blocks` at `offset`; returns the new offset.
+    
+    Blocks go to disk in UPLOAD_BLOCK_SIZE pieces, off the event loop, and
+    whatever arrived before a dropped connection is kept. A chunk that would
+    run past the declared size raises UploadTooLarge, keeping what came
+    before it.
+    """
+    async with lock_session(session) as f:
+        current = os.fstat(f.fileno()).st_size
+        if offset != current:
+            raise OffsetMismatch(current)
+        f.seek(current)
+        written, pending = current, bytearray()
+        try:
+            async for block in blocks:
+                if written + len(pending) + len(block) > session.size:
+                    raise UploadTooLarge()
+                pending.extend(block)
+                if len(pending) >= settings.UPLOAD_BLOCK_SIZE:
+                    await asyncio.to_thread(f.write, bytes(pending))
+                    written += len(pending)
+                    pending.clear()
+        finally:
+            if pending:
+                await asyncio.to_thread(f.write, bytes(pending))
+                written += len(pending)
+        return written
+
+def _digest_file(path: str):
+    digest = hashlib.sha256()
+    estimator = PageEstimator()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(settings.UPLOAD_BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+            estimator.feed(block)
+    return digest.hexdigest(), estimator
+
+async def receive_session(session: UploadSession) -> ReceivedUpload:
+    """The completed upload, hashed from disk block by block."""
+    digest, estimator = await asyncio.to_thread(_digest_file, session.data_path)
+    return ReceivedUpload(session.data_path, digest, estimator.size, estimator.pages)
+
+def discard_session(session: UploadSession):
+    for path in (session.data_path, session.record_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+def expire_sessions():
+    """Remove expired sessions and data files left without a session record."""
+    if not os.path.isdir(sessions_dir()):
+        return
+    upload_ids = {os.path.splitext(name)[0] for name in os.listdir(sessions_dir())}
+    for upload_id in upload_ids:
+        if UPLOAD_ID_PATTERN.match(upload_id) and get_session(upload_id) is None:
+            for extension in (".part", ".json"):
+                if os.path.exists(_session_path(upload_id, extension)):
+                    os.remove(_session_path(upload_id, extension))
+            logger.info(f"Removed expired upload session {upload_id}")
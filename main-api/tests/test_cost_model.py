@@ -0,0 +1,50 @@
+import math
+
+import numpy as np
+import pytest
+
+from config import settings
+from services.cost_model import CostModel
+
+MB = 1024 * 1024
+
+def test_predict_without_history_uses_default_rate():
+    model = CostModel()
+    seconds, method = model.predict(10, 2 * MB)
+    assert seconds == pytest.approx(10 * settings.SCHEDULER_DEFAULT_SECONDS_PER_PAGE)
+    assert method is None
+
+def test_predict_counts_at_least_one_page():
+    seconds, _ = CostModel().predict(0, 0)
+    assert seconds == pytest.approx(settings.SCHEDULER_DEFAULT_SECONDS_PER_PAGE)
+
+def test_predict_uses_pooled_fit():
+    model = CostModel()
+    model.coefficients = {"all": np.array([3.0, 0.5, 2.0])}
+    seconds, method = model.predict(20, 4 * MB)
+    assert seconds == pytest.approx(3.0 + 20 * 0.5 + 4 * 2.0)
+    assert method is None
+
+def test_predict_picks_method_by_bytes_per_page():
+    model = CostModel()
+    model.coefficients = {
+        "text": np.array([1.0, 0.2, 0.0]),
+        "ocr": np.array([5.0, 4.0, 0.0]),
+        "all": np.array([2.0, 1.0, 0.0])
+    }
+    model.density = {"text": math.log(30 * 1024), "ocr": math.log(600 * 1024)}
+    
+    assert model.predict(10, 10 * 40 * 1024) == (pytest.approx(1.0 + 10 * 0.2), "text")
+    assert model.predict(10, 10 * 500 * 1024) == (pytest.approx(5.0 + 10 * 4.0), "ocr")
+
+def test_predict_falls_back_to_pooled_fit_for_unfitted_method():
+    model = CostModel()
+    model.coefficients = {"all": np.array([2.0, 1.0, 0.0])}
+    model.density = {"mixed": math.log(100 * 1024)}
+    assert model.predict(10, MB) == (pytest.approx(12.0), "mixed")
+
+def test_predict_never_goes_below_minimum():
+    model = CostModel()
+    model.coefficients = {"all": np.array([-50.0, 1.0, 0.0])}
+    seconds, _ = model.predict(1, MB)
+    assert seconds == settings.COST_MODEL_MIN_SECONDS
@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services.ingest_queue import PageEstimator, estimate_page_count, ESTIMATED_BYTES_PER_PAGE
+from shared.ingest_queue import admission_load, enqueue_args, priority_score
+
+LIMITS = SimpleNamespace(
+    ADMISSION_MAX_JOBS=10,
+    ADMISSION_MAX_PAGES=100,
+    ADMISSION_RETRY_AFTER_SECONDS=30,
+    ADMISSION_MAX_RETRY_AFTER_SECONDS=600,
+    SCHEDULER_AGING_RATE=1.0,
+    SCHEDULER_DEFAULT_SECONDS_PER_PAGE=2.0
+)
+
+def workers(pages_per_second: float) -> dict:
+    return {"w1": {"stages": {"extract": {"units_per_second": pages_per_second}}}}
+
+def test_priority_prefers_shorter_jobs():
+    assert priority_score(1000.0, 5.0, 1.0) < priority_score(1000.0, 50.0, 1.0)
+
+def test_priority_ages_waiting_jobs():
+    # A 60s job queued 100s ago runs before a 10s job queued now
+    assert priority_score(900.0, 60.0, 1.0) < priority_score(1000.0, 10.0, 1.0)
+    # but not before one that arrived within 50s of it
+    assert priority_score(900.0, 60.0, 1.0) > priority_score(920.0, 10.0, 1.0)
+
+def test_priority_without_aging_is_shortest_job_first():
+    assert priority_score(0.0, 5.0, 0.0) < priority_score(1000.0, 6.0, 0.0)
+
+def test_enqueue_args_default_prediction():
+    args = enqueue_args(LIMITS, 7, "/up/a.pdf", "a.pdf", 0, None, 1000.0)
+    assert args == [7, "/up/a.pdf", "a.pdf", 1000.0, 1, 2.0, 1002.0, "process"]
+
+def test_admission_accepts_below_limits():
+    load = admission_load(LIMITS, 3, 40, 10, {})
+    assert load["accepting"]
+    assert load["reason"] is None
+    assert load["retry_after"] == 0
+
+def test_admission_rejects_too_many_jobs():
+    load = admission_load(LIMITS, 10, 40, 1, {})
+    assert not load["accepting"]
+    assert load["reason"] == "Too many documents in the ingest queue"
+    assert load["retry_after"] == LIMITS.ADMISSION_RETRY_AFTER_SECONDS
+
+def test_admission_rejects_too_many_pages():
+    load = admission_load(LIMITS, 3, 90, 20, {})
+    assert not load["accepting"]
+    assert load["reason"] == "Too many pages in the ingest queue"
+
+def test_admission_lets_a_large_document_into_an_empty_queue():
+    assert admission_load(LIMITS, 0, 0, 500, {})["accepting"]
+
+def test_admission_limits_of_zero_are_disabled():
+    limits = SimpleNamespace(**{**vars(LIMITS), "ADMISSION_MAX_JOBS": 0, "ADMISSION_MAX_PAGES": 0})
+    assert admission_load(limits, 1000, 10 ** 6, 10 ** 6, {})["accepting"]
+
+def test_admission_retry_after_follows_worker_throughput():
+    # 10 pages over the budget drain at 0.1 pages/s: 100s, above the 30s floor
+    load = admission_load(LIMITS, 3, 90, 20, workers(0.1))
+    assert load["pages_per_second"] == pytest.approx(0.1)
+    assert load["retry_after"] == 100
+
+def test_admission_retry_after_is_capped():
+    load = admission_load(LIMITS, 3, 90, 20, workers(0.001))
+    assert load["retry_after"] == LIMITS.ADMISSION_MAX_RETRY_AFTER_SECONDS
+
+def test_page_count_counts_page_objects():
+    content = b"%PDF-1.4 /Type /Pages /Kids [] /Type /Page /Type/Page /Type /Page>>"
+    assert estimate_page_count(content) == 3
+
+def test_page_count_falls_back_to_size():
+    assert estimate_page_count(b"\0" * (5 * ESTIMATED_BYTES_PER_PAGE)) == 5
+
+@pytest.mark.parametrize("block_size", [1, 3, 7, 64, 1000])
+def test_page_estimator_blocks_match_whole_file(block_size):
+    content = (b"obj << /Type /Page >> endobj " * 40) + b"<< /Type /Pages >> /Type /Page"
+    estimator = PageEstimator()
+    for start in range(0, len(content), block_size):
+        estimator.feed(content[start:start + block_size])
+    assert estimator.pages == estimate_page_count(content) == 41
+    assert estimator.size == len(content)
+
+def test_page_estimator_match_extended_by_next_block():
+    estimator = PageEstimator()
+    estimator.feed(b"x" * 100 + b"/Type /Page")
+    assert estimator.pages == 1
+    # The same bytes turn out to be "/Type /Pages"
+    estimator.feed(b"s >>")
+    assert estimator.page_objects == 0
+    assert estimator.pages == 1  # Falls back to the size-based guess
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from services.lane_scheduler import LaneScheduler
+from shared.lanes import INTERACTIVE_SIGNAL_KEY
+
+class FakeRedis:
+    """The interactive signal, kept in memory."""
+    
+    def __init__(self):
+        self.values = {}
+    
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+    
+    async def delete(self, key):
+        self.values.pop(key, None)
+
+def make_scheduler(max_concurrency: int, interactive: int = 2, ingest: int = 1, background: int = 1) -> LaneScheduler:
+    scheduler = LaneScheduler()
+    scheduler._redis = FakeRedis()
+    scheduler.max_concurrency = max_concurrency
+    scheduler.limits = {"interactive": interactive, "ingest": ingest, "background": background}
+    return scheduler
+
+async def hold(scheduler: LaneScheduler, lane: str, served: list, release: asyncio.Event = None):
+    async with scheduler.slot(lane):
+        served.append(lane)
+        if release is not None:
+            await release.wait()
+
+def test_free_slot_goes_to_highest_priority_lane():
+    async def scenario():
+        scheduler = make_scheduler(max_concurrency=1)
+        served, release = [], asyncio.Event()
+        tasks = [asyncio.create_task(hold(scheduler, "ingest", served, release))]
+        await asyncio.sleep(0)
+        # Queued lowest priority first
+        for lane in ("background", "ingest", "interactive"):
+            tasks.append(asyncio.create_task(hold(scheduler, lane, served)))
+            await asyncio.sleep(0)
+        assert served == ["ingest"]
+        
+        release.set()
+        await asyncio.gather(*tasks)
+        return served
+    
+    assert asyncio.run(scenario()) == ["ingest", "interactive", "ingest", "background"]
+
+def test_lane_is_capped_at_its_share():
+    async def scenario():
+        scheduler = make_scheduler(max_concurrency=2, background=1)
+        served, release = [], asyncio.Event()
+        tasks = [asyncio.create_task(hold(scheduler, "background", served, release)) for _ in range(2)]
+        await asyncio.sleep(0)
+        # The second background request waits although a slot is free; chat gets it
+        tasks.append(asyncio.create_task(hold(scheduler, "interactive", served, release)))
+        await asyncio.sleep(0)
+        stats = scheduler.stats()["lanes"]
+        assert (stats["background"]["active"], stats["background"]["waiting"]) == (1, 1)
+        assert stats["interactive"]["active"] == 1
+        
+        release.set()
+        await asyncio.gather(*tasks)
+        return scheduler.stats()["lanes"]
+    
+    lanes = asyncio.run(scenario())
+    assert lanes["background"]["completed"] == 2
+    assert lanes["interactive"]["completed"] == 1
+
+def test_lower_lane_waits_behind_blocked_higher_lane():
+    async def scenario():
+        scheduler = make_scheduler(max_concurrency=2, ingest=1)
+        served = []
+        release_ingest, release_chat = asyncio.Event(), asyncio.Event()
+        first = asyncio.create_task(hold(scheduler, "ingest", served, release_ingest))
+        chat = asyncio.create_task(hold(scheduler, "interactive", served, release_chat))
+        await asyncio.sleep(0)
+        queued = [asyncio.create_task(hold(scheduler, lane, served)) for lane in ("ingest", "background")]
+        await asyncio.sleep(0)
+        
+        # The freed slot cannot go to ingest (at its share), and background may not pass it
+        release_chat.set()
+        await chat
+        await asyncio.sleep(0)
+        assert scheduler.stats()["lanes"]["background"]["waiting"] == 1
+        
+        release_ingest.set()
+        await asyncio.gather(first, *queued)
+        return served
+    
+    assert asyncio.run(scenario()) == ["ingest", "interactive", "ingest", "background"]
+
+def test_interactive_signal_set_while_chat_runs():
+    async def scenario():
+        scheduler = make_scheduler(max_concurrency=1)
+        async with scheduler.slot("interactive"):
+            assert INTERACTIVE_SIGNAL_KEY in scheduler._redis.values
+        assert INTERACTIVE_SIGNAL_KEY not in scheduler._redis.values
+    
+    asyncio.run(scenario())
+
+def test_unknown_lane_is_rejected():
+    async def scenario():
+        async with make_scheduler(max_concurrency=1).slot("bulk"):
+            pass
+    
+    with pytest.raises(ValueError):
+        asyncio.run(scenario())
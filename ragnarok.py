@@ -85,6 +85,22 @@ def test():
             print(f"❌ {name} not responding")
     print("🏁 Test complete!")
 
+def benchmark():
+    """Benchmark text extractors on uploaded PDFs (or the paths given)."""
+    print("⏱️  Benchmarking text extractors...")
+    args = " ".join(sys.argv[2:])
+    run_cmd(f'docker-compose exec document-processor python benchmark_extractors.py {args}')
+
+def ingest():
+    """Bulk-load a directory of PDFs straight into the database and vector store."""
+    if len(sys.argv) < 3 or not os.path.isdir(sys.argv[2]):
+        print("Usage: python ragnarok.py ingest <directory> [--workers N] [--batch-size N]")
+        return
+    directory = os.path.abspath(sys.argv[2])
+    args = " ".join(sys.argv[3:])
+    print(f"📚 Ingesting PDFs from {directory} (interrupt and rerun to resume)...")
+    run_cmd(f'docker-compose run --rm -v "{directory}:/ingest:ro" document-processor python bulk_ingest.py /ingest {args}')
+
 def main():
     if len(sys.argv) < 2:
         print("🔥 RAGnarok Management")
@@ -97,6 +113,8 @@ def main():
         print("  rebuild  - Restart with code changes (rebuilds)")
         print("  logs     - View logs")
         print("  test     - Test all services")
+        print("  benchmark [paths] - Compare text extractors (pick TEXT_EXTRACTOR)")
+        print("  ingest <dir> - Bulk-load a directory of PDFs without the upload API")
         return
 
     cmd = sys.argv[1]
@@ -115,6 +133,10 @@ def main():
         logs()
     elif cmd == 'test':
         test()
+    elif cmd == 'benchmark':
+        benchmark()
+    elif cmd == 'ingest':
+        ingest()
     else:
         print(f"❌ Unknown command: {cmd}")
         print("Run 'python ragnarok.py' to see available commands")
@@ -0,0 +1,7 @@
+"""Code shared by main-api and the document processor.
+
+Both images copy this package to /app/shared (docker-compose mounts it there
+for development), so it is imported as `shared` from either service. Only
+the standard library may be imported here; each service passes in its own
+settings.
+"""
@@ -0,0 +1,27 @@
+"""Content-addressed storage rules for the pdfs table.
+
+A PDF whose content hash matches a PDF that was (or is being) processed is
+linked to it through source_pdf_id instead of being processed again.
+"""
+
+# Processing results a duplicate shares with the PDF that was processed
+LINKED_FIELDS = (
+    "processed", "chunk_count", "processing_status", "processing_error",
+    "extraction_method", "page_methods", "page_ocr_stats", "page_count",
+    "text_length", "summary", "key_topics", "content_preview"
+)
+
+def source_conditions(columns, completed_only: bool = False) -> list:
+    """Filters for PDFs a duplicate may be linked to, on the PDF model or a pdfs Table's `.c`.
+    
+    A source is never itself a duplicate, and one that has only ever failed
+    is not reused. Online uploads may link to a source still being processed,
+    since its status updates are copied to its duplicates as they arrive;
+    writers that bypass main-api must pass completed_only=True.
+    """
+    conditions = [columns.source_pdf_id.is_(None)]
+    if completed_only:
+        conditions.append(columns.processing_status == "completed")
+    else:
+        conditions.append(columns.processing_status != "failed")
+    return conditions
@@ -0,0 +1,112 @@
+"""The Redis ingest queue's layout, enqueue script and scheduling rules.
+
+main-api enqueues uploads and the document-processor's workers claim them,
+so both sides use these definitions. The claim, lease and retry scripts
+belong to the workers (document-processor/services/job_queue.py).
+"""
+
+import json
+import math
+from typing import List, Optional
+
+QUEUE_KEY = "ingest:queue"            # ZSET pdf_id -> priority of runnable jobs (lowest runs first)
+DELAYED_KEY = "ingest:delayed"        # ZSET pdf_id -> time a job waiting to retry becomes runnable
+PROCESSING_KEY = "ingest:processing"  # ZSET pdf_id -> lease expiry of the worker holding it
+DEAD_LETTER_KEY = "ingest:dead"       # LIST of JSON records for jobs out of attempts
+JOB_KEY = "ingest:job:{}"             # HASH per pdf_id: filepath, filename, status, attempts, predicted, ...
+STATS_KEY = "ingest:stats:{}"         # Pipeline stats published by each worker
+PAGES_KEY = "ingest:pages"            # Counter of pages in queued and running jobs
+
+# Enqueue is idempotent per pdf_id: a job that is already queued or running is
+# left alone, anything else (new, done, dead) is (re)queued from attempt 0.
+# The job's pages count towards PAGES_KEY until it is done or dead.
+# KEYS: QUEUE_KEY, the job's JOB_KEY, PAGES_KEY; ARGV: see enqueue_args
+ENQUEUE_SCRIPT = """
+local status = redis.call('HGET', KEYS[2], 'status')
+if status == 'queued' or status == 'running' then
+    return 0
+end
+redis.call('DEL', KEYS[2])
+redis.call('HSET', KEYS[2],
+    'pdf_id', ARGV[1], 'filepath', ARGV[2], 'filename', ARGV[3],
+    'status', 'queued', 'attempts', 0, 'enqueued_at', ARGV[4], 'pages', ARGV[5],
+    'predicted', ARGV[6], 'priority', ARGV[7], 'mode', ARGV[8])
+redis.call('ZADD', KEYS[1], ARGV[7], ARGV[1])
+redis.call('INCRBY', KEYS[3], ARGV[5])
+return 1
+"""
+
+def priority_score(enqueued_at: float, predicted_seconds: float, aging_rate: float) -> float:
+    """Queue priority for shortest-expected-job-first with aging; lowest runs first.
+    
+    Ordering by predicted_seconds - aging_rate * seconds_waited is the same
+    as ordering by this fixed score, so the queue never needs rescoring:
+    every second a job waits counts as aging_rate seconds off its predicted
+    run time, and a long job is overtaken only by shorter jobs that arrive
+    within predicted_seconds / aging_rate of it.
+    """
+    return aging_rate * enqueued_at + predicted_seconds
+
+def enqueue_args(
+    settings, pdf_id: int, filepath: str, filename: str, pages: int, predicted: Optional[float],
+    now: float, mode: str = "process"
+) -> List:
+    """ENQUEUE_SCRIPT's ARGV for a job; without a prediction it is costed at SCHEDULER_DEFAULT_SECONDS_PER_PAGE.
+    
+    mode is "process"; "reindex", which rebuilds chunks from the stored page
+    text instead of extracting the PDF again; or "revision", which processes a
+    replaced file without touching the PDF's status unless it succeeds.
+    """
+    pages = max(1, pages)
+    if predicted is None:
+        predicted = pages * settings.SCHEDULER_DEFAULT_SECONDS_PER_PAGE
+    priority = priority_score(now, predicted, settings.SCHEDULER_AGING_RATE)
+    return [pdf_id, filepath, filename, now, pages, predicted, priority, mode]
+
+async def worker_stats(client) -> dict:
+    """The stats each live worker last published under STATS_KEY, by worker id."""
+    workers = {}
+    async for key in client.scan_iter(match=STATS_KEY.format("*")):
+        value = await client.get(key)
+        if value:
+            workers[key.split(":", 2)[2]] = json.loads(value)
+    return workers
+
+def admission_load(settings, jobs: int, queued_pages: int, pages: int, workers: dict) -> dict:
+    """Admission decision for one more job of `pages` pages given the current backlog.
+    
+    `settings` supplies the ADMISSION_* limits; `workers` are the stats the
+    workers publish under STATS_KEY, whose extract throughput sets how long
+    a turned-away client is told to wait.
+    """
+    max_jobs, max_pages = settings.ADMISSION_MAX_JOBS, settings.ADMISSION_MAX_PAGES
+    over_jobs = max_jobs > 0 and jobs >= max_jobs
+    # A single document larger than the page budget is still let in when the queue is empty
+    over_pages = max_pages > 0 and queued_pages > 0 and queued_pages + pages > max_pages
+    
+    load = {
+        "jobs_in_flight": jobs,
+        "max_jobs": max_jobs,
+        "queued_pages": queued_pages,
+        "max_pages": max_pages,
+        "pages_per_second": sum(
+            worker.get("stages", {}).get("extract", {}).get("units_per_second", 0.0)
+            for worker in workers.values()
+        ),
+        "accepting": not (over_jobs or over_pages),
+        "reason": None,
+        "retry_after": 0
+    }
+    if load["accepting"]:
+        return load
+    
+    load["reason"] = "Too many documents in the ingest queue" if over_jobs else "Too many pages in the ingest queue"
+    # Pages that must drain before this job fits, at the rate the workers are going
+    drain_pages = queued_pages + pages - max_pages if over_pages else 0
+    if over_jobs and jobs:
+        drain_pages = max(drain_pages, queued_pages * (jobs - max_jobs + 1) / jobs)
+    retry_after = settings.ADMISSION_RETRY_AFTER_SECONDS
+    if load["pages_per_second"] > 0:
+        retry_after = max(retry_after, drain_pages / load["pages_per_second"])
+    load["retry_after"] = math.ceil(min(retry_after, settings.ADMISSION_MAX_RETRY_AFTER_SECONDS))
+    return load
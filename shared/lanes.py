@@ -0,0 +1,5 @@
+"""Contract between main-api's LLM lanes and the document workers."""
+
+# Set by main-api's lane scheduler while interactive requests are running or
+# waiting, so the document workers can hold back their CPU-heavy embedding
+INTERACTIVE_SIGNAL_KEY = "lanes:interactive"
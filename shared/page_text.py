@@ -0,0 +1,7 @@
+"""Where the document workers keep a document's extracted text, page by page."""
+
+import os
+
+def page_text_path(filepath: str) -> str:
+    """Per-page text artifact stored next to an upload; main-api's content_store removes it with the file."""
+    return os.path.splitext(filepath)[0] + ".pages.jsonl.gz"